@@ -11,8 +11,11 @@ from anypytools.macro_commands import (MacroCommand, Load, Dump,
                                        SaveData, OperationRun)
 
 from AnyWriter import AnyWriter
+from BVHCache import BVHCache
 from AnybodyResults import AnybodyResults
+from MotionFile import MotionFile
 from config.Configuration import env
+from resources.pymo.pymo.parsers import BVHReader
 
 
 class AnyPy:
@@ -42,20 +45,41 @@ class AnyPy:
         if env.args('any_interpol_files'):
             print('Using interpolation files from "{}"'.format(os.path.normpath(self.any_path + AnyPy.INTERPOL_DIR)))
 
+        # remove frames from start and end (cut)
+        cut = bool(env.config.start_frame or env.config.end_frame)
+        if cut:
+            start_frame = int(env.config.start_frame) - 1 if env.config.start_frame else 0
+            end_frame = int(env.config.end_frame) - 1 if 'end' not in env.config.end_frame.lower() else None
+
         if env.args('any_bvh_file'):
             print("Convert bvh file to anybody interpolation files")
-            from resources.pymo.pymo.parsers import BVHParser as Pymo_BVHParser
+            motion_file = MotionFile.is_motion_file(env.config.any_bvh_file)
+            if cut and not env.args('any_files_dir'):
+                if motion_file:
+                    # only the frames between start and end frame are taken from the memory mapped motion
+                    bvh_data = MotionFile.read(env.config.any_bvh_file)
+                    bvh_data.set_motion(bvh_data.motion[start_frame:end_frame],
+                                        bvh_data.time_index[start_frame:end_frame], bvh_data.columns)
+                else:
+                    # only the lines of the frames between start and end frame are read and parsed
+                    with BVHReader(env.config.any_bvh_file, persist_index=True) as bvh_reader:
+                        bvh_data = bvh_reader.read_frames(start_frame, end_frame)
+                print("Extracted values between frame {} and {} from {}".format(
+                    start_frame + 1, start_frame + len(bvh_data.motion), env.config.any_bvh_file))
+                cut = False
+            elif motion_file:
+                bvh_data = MotionFile.read(env.config.any_bvh_file)
+            else:
+                bvh_data = BVHCache().parse(env.config.any_bvh_file)
             any_writer = AnyWriter(template_directory='config/anybody_templates/',
-                                   output_directory=os.path.normpath(self.any_path + AnyPy.INTERPOL_DIR) + '/')
-            any_writer.write(Pymo_BVHParser().parse(env.config.any_bvh_file))
+                                   output_directory=os.path.normpath(self.any_path + AnyPy.INTERPOL_DIR) + '/',
+                                   hand=AnyWriter.hand_of(bvh_data))
+            any_writer.write(bvh_data)
 
         if env.args('any_files_dir'):
             self.copy_files()
 
-        # remove frames from start and end (cut)
-        if env.config.start_frame or env.config.end_frame:
-            start_frame = int(env.config.start_frame) - 1 if env.config.start_frame else 0
-            end_frame = int(env.config.end_frame) - 1 if 'end' not in env.config.end_frame.lower() else None
+        if cut:
             any_writer = AnyWriter(output_directory=os.path.normpath(self.any_path + AnyPy.INTERPOL_DIR) + '/')
             any_writer.extract_frames(start_frame, end_frame)
             any_writer.extract_frame_timeseries(start_frame, end_frame)
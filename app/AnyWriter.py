@@ -5,40 +5,44 @@ import numpy as np
 
 
 class AnyWriter:
-    def __init__(self, template_directory='config/anybody_templates/', output_directory='../output/Anybody/'):
+    def __init__(self, template_directory='config/anybody_templates/', output_directory='../output/Anybody/',
+                 hand='right'):
         self._template_directory = template_directory
         self._output_directory = output_directory
+        # the joint angles of the (mirrored) left hand are mirrored back to the anatomical angles of the right hand
+        self._side = 'Right' if hand == 'right' else 'Left'
+        self._mirror = hand == 'left'
         self.mapping = {
-            'Finger1': {'joint_leap': 'RightHandThumb',
+            'Finger1': {'joint_leap': self._side + 'HandThumb',
                         'joint_any': ['CMCFLEXION', 'CMCABDUCTION', 'CMCDEVIATION', 'MCPFLEXION', 'MCPABDUCTION',
                                       'MCPDEVIATION', 'DIPFLEXION', 'DIPABDUCTION', 'DIPDEVIATION'],
                         'template': 'Thumb.template',
                         'function': ['negative']},
-            'Finger2': {'joint_leap': 'RightHandIndex',
+            'Finger2': {'joint_leap': self._side + 'HandIndex',
                         'joint_any': ['MCPFLEXION', 'MCPABDUCTION', 'MCPDEVIATION', 'PIPFLEXION', 'PIPABDUCTION',
                                       'PIPDEVIATION', 'DIPFLEXION', 'DIPABDUCTION', 'DIPDEVIATION'],
                         'template': 'Finger.template',
                         'function': ['negative']},
-            'Finger3': {'joint_leap': 'RightHandMiddle',
+            'Finger3': {'joint_leap': self._side + 'HandMiddle',
                         'joint_any': ['MCPFLEXION', 'MCPABDUCTION', 'MCPDEVIATION', 'PIPFLEXION', 'PIPABDUCTION',
                                       'PIPDEVIATION', 'DIPFLEXION', 'DIPABDUCTION', 'DIPDEVIATION'],
                         'template': 'Finger.template',
                         'function': ['negative']},
-            'Finger4': {'joint_leap': 'RightHandRing',
+            'Finger4': {'joint_leap': self._side + 'HandRing',
                         'joint_any': ['MCPFLEXION', 'MCPABDUCTION', 'MCPDEVIATION', 'PIPFLEXION', 'PIPABDUCTION',
                                       'PIPDEVIATION', 'DIPFLEXION', 'DIPABDUCTION', 'DIPDEVIATION'],
                         'template': 'Finger.template',
                         'function': ['negative']},
-            'Finger5': {'joint_leap': 'RightHandPinky',
+            'Finger5': {'joint_leap': self._side + 'HandPinky',
                         'joint_any': ['MCPFLEXION', 'MCPABDUCTION', 'MCPDEVIATION', 'PIPFLEXION', 'PIPABDUCTION',
                                       'PIPDEVIATION', 'DIPFLEXION', 'DIPABDUCTION', 'DIPDEVIATION'],
                         'template': 'Finger.template',
                         'function': ['negative']},
-            'Wrist': {'joint_leap': 'RightHand',
+            'Wrist': {'joint_leap': self._side + 'Hand',
                       'joint_any': ['WRISTFLEXION', 'WRISTABDUCTION', 'WRISTDEVIATION'],
                       'template': 'Wrist.template',
                       'function': ['negative']},
-            'Elbow': {'joint_leap': 'RightElbow',
+            'Elbow': {'joint_leap': self._side + 'Elbow',
                       'joint_any': ['ELBOWFLEXION','ELBOWABDUCTION', 'ELBOWPRONATION'],
                       'template': 'Elbow.template',
                       'function': ['correct_pronation']}}
@@ -46,6 +50,11 @@ class AnyWriter:
         self.regex_find = re.compile(r'{(((\s*-?\d+\.\d+),?)+)};')
         self.regex_replace = re.compile(r'(((\s*-?\d+\.\d+),?)+)')
 
+    @staticmethod
+    def hand_of(data):
+        """'left' for the skeleton of a left hand (LeapData with hand='left'), 'right' otherwise"""
+        return 'left' if 'LeftHand' in data.skeleton else 'right'
+
     def write(self, data):
         self.write_joints(data)
         self.write_timeseries(data)
@@ -57,9 +66,12 @@ class AnyWriter:
         for finger_name, joint_mapping in self.mapping.items():
             finger_values[finger_name] = {}
             for joint_name in joint_mapping['joint_any']:
-                finger_values[finger_name][joint_name] = np.asarray(
-                    data.values[joint_mapping['joint_leap']
-                                + self._joint2channel(finger_name, joint_name)].values)
+                channel = self._joint2channel(finger_name, joint_name)
+                # i.e. RightHandIndex + 2_Xrotation -> (RightHandIndex2, Xrotation)
+                joint, channel = (joint_mapping['joint_leap'] + channel).rsplit('_', 1)
+                finger_values[finger_name][joint_name] = np.asarray(data.channel(joint, channel))
+                if self._mirror and channel.endswith(('Yrotation', 'Zrotation')):
+                    finger_values[finger_name][joint_name] = np.negative(finger_values[finger_name][joint_name])
 
         np.set_printoptions(formatter={'float': '{: 0.2f}'.format}, threshold=np.inf)
 
@@ -86,7 +98,7 @@ class AnyWriter:
         # threshold: workaround for printing more than 1000 values
         np.set_printoptions(formatter={'float': '{: 0.5f}'.format}, threshold=np.inf)
 
-        entries = data.values.shape[0]
+        entries = data.motion.shape[0]
         template_dict = {'TIMESERIES': self._format2outputarray(np.linspace(0, 1, num=entries))}
         template_string = open(self._template_directory + 'TimeSeries.template', 'r').read().format(**template_dict)
 
@@ -99,15 +111,17 @@ class AnyWriter:
         # use offsets value from bvh to scale finger lengths in AnyBody
         for joint_name, joint_value in data.skeleton.items():
             finger_length = np.linalg.norm(np.array(joint_value['offsets'])) / 1000
-            template_dict[joint_name] = finger_length
+            # the template uses the joint names of the right hand
+            template_dict[joint_name.replace(self._side, 'Right', 1)] = finger_length
 
         # hand length, hand breadth
+        middle = self._side + 'HandMiddle'
         hand_length = np.linalg.norm(
-            np.array(data.skeleton['RightHandMiddle1']['offsets']) +
-            np.array(data.skeleton['RightHandMiddle2']['offsets']) +
-            np.array(data.skeleton['RightHandMiddle3']['offsets']) +
-            np.array(data.skeleton['RightHandMiddle4']['offsets']) +
-            np.array(data.skeleton['RightHandMiddle4_Nub']['offsets'])
+            np.array(data.skeleton[middle + '1']['offsets']) +
+            np.array(data.skeleton[middle + '2']['offsets']) +
+            np.array(data.skeleton[middle + '3']['offsets']) +
+            np.array(data.skeleton[middle + '4']['offsets']) +
+            np.array(data.skeleton[middle + '4_Nub']['offsets'])
         ) / 1000
         template_dict['HANDLENGTH'] = hand_length
 
@@ -26,19 +26,19 @@ class BVHAnimation:
         axcolor = 'lightgoldenrodyellow'
         axframe = plt.axes([0.25, 0.1, 0.65, 0.03], facecolor=axcolor)
 
-        bvh_number_frames = positions.values.shape[0]
+        bvh_number_frames = positions.motion.shape[0]
         sframe = Slider(axframe, 'Frame', 1, bvh_number_frames, valinit=1, valstep=1)
 
         joints_to_draw = positions.skeleton.keys()
         lines = []
         points = []
 
-        df = positions.values
+        # (frames, 3) positions of every joint
+        joint_positions = {joint: positions.joint_values(joint, ('Xposition', 'Yposition', 'Zposition'))
+                           for joint in joints_to_draw}
 
         for joint in joints_to_draw:
-            parent_x = df['%s_Xposition' % joint][0]
-            parent_y = df['%s_Yposition' % joint][0]
-            parent_z = df['%s_Zposition' % joint][0]
+            parent_x, parent_y, parent_z = joint_positions[joint][0]
             # ^ In mocaps, Y is the up-right axis
 
             points.append(ax.plot([parent_x],
@@ -49,9 +49,7 @@ class BVHAnimation:
             children_to_draw = [c for c in positions.skeleton[joint]['children'] if c in joints_to_draw]
 
             for c in children_to_draw:
-                child_x = df['%s_Xposition' % c][0]
-                child_y = df['%s_Yposition' % c][0]
-                child_z = df['%s_Zposition' % c][0]
+                child_x, child_y, child_z = joint_positions[c][0]
                 # ^ In mocaps, Y is the up-right axis
 
                 lines.append(
@@ -64,9 +62,7 @@ class BVHAnimation:
             index2 = 0
 
             for up_joint in joints_to_draw:
-                up_parent_x = df['%s_Xposition' % up_joint][frame]
-                up_parent_y = df['%s_Yposition' % up_joint][frame]
-                up_parent_z = df['%s_Zposition' % up_joint][frame]
+                up_parent_x, up_parent_y, up_parent_z = joint_positions[up_joint][frame]
                 # ^ In mocaps, Y is the up-right axis
 
                 points[index1][0].set_data(np.array([up_parent_x]), np.array([up_parent_y]))
@@ -76,9 +72,7 @@ class BVHAnimation:
                 up_children_to_draw = [c for c in positions.skeleton[up_joint]['children'] if c in joints_to_draw]
 
                 for c in up_children_to_draw:
-                    up_child_x = df['%s_Xposition' % c][frame]
-                    up_child_y = df['%s_Yposition' % c][frame]
-                    up_child_z = df['%s_Zposition' % c][frame]
+                    up_child_x, up_child_y, up_child_z = joint_positions[c][frame]
                     # ^ In mocaps, Y is the up-right axis
 
                     lines[index2][0].set_data(np.array([[up_parent_x, up_child_x], [up_parent_y, up_child_y]]))
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from resources.pymo.pymo.data import MocapData
+from resources.pymo.pymo.parsers import BVHParser as Pymo_BVHParser
+
+# index of the cache: content hash of every known BVH file (by path, size and modification time)
+# and the entries with their size in bytes and time of the last use
+INDEX_FILE = 'index.json'
+# version 1: header.json (skeleton, channels), motion.npy (float64 frames x channels), time.npy (int64 ns)
+VERSION = 1
+# seconds after which the directory of an entry which is not in the index is removed
+SWEEP_AGE = 60
+
+
+class BVHCache:
+    """
+    Cache of parsed BVH files (BVHParser.parse) on disk
+
+    Every entry is a directory named by the content hash of the BVH file, with the skeleton in a JSON header
+    and the motion matrix as .npy file, which is memory mapped when the entry is loaded again.
+    The content hash of a file is only computed again, when its path, size or modification time changed.
+    If the cache exceeds max_size bytes, the least recently used entries are removed. An entry that can not be
+    removed (i.e. its motion is still memory mapped on Windows) stays in the index, directories of entries
+    that are not in the index are removed when the cache is used again (if older than SWEEP_AGE, see _sweep).
+    If the cache can not be written (i.e. the disk is full), the file is parsed without caching it.
+    """
+
+    def __init__(self, directory='../output/Cache/BVH', max_size=1 << 30):
+        self.directory = directory
+        self.max_size = max_size
+
+    def parse(self, filename):
+        """Returns the MocapData of the BVH file, from the cache if possible"""
+        index = self._load_index()
+        self._sweep(index)
+        key = self._key(filename, index)
+        entry = os.path.join(self.directory, key)
+
+        data = self._load(entry) if key in index['entries'] else None
+        if data is None:
+            data = Pymo_BVHParser().parse(filename)
+            # an incomplete entry is written again, the file is returned uncached if that fails
+            index['entries'].pop(key, None)
+            try:
+                index['entries'][key] = {'size': self._store(entry, data)}
+            except OSError as e:
+                print('"{}" not cached: {}'.format(filename, e))
+                shutil.rmtree(entry, ignore_errors=True)
+        if key in index['entries']:
+            index['entries'][key]['used'] = time.time()
+
+        self._evict(index, keep=key)
+        self._save_index(index)
+        return data
+
+    def _key(self, filename, index):
+        path = os.path.abspath(filename)
+        stat = os.stat(path)
+        known = index['paths'].get(path)
+        if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+            return known['hash']
+
+        content_hash = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                content_hash.update(block)
+        index['paths'][path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                                'hash': content_hash.hexdigest()}
+        return index['paths'][path]['hash']
+
+    @staticmethod
+    def _load(entry):
+        try:
+            with open(os.path.join(entry, 'header.json')) as f:
+                header = json.load(f)
+            if header['version'] != VERSION:
+                return None
+            # copy-on-write, the values can be changed without changing the cache
+            motion = np.load(os.path.join(entry, 'motion.npy'), mmap_mode='c')
+            frame_times = np.load(os.path.join(entry, 'time.npy'))
+        except (OSError, ValueError, KeyError):
+            return None
+
+        data = MocapData()
+        data.skeleton = header['skeleton']
+        data.channel_names = [tuple(channel) for channel in header['channel_names']]
+        data.root_name = header['root_name']
+        data.framerate = header['framerate']
+        data.set_motion(motion, pd.to_timedelta(frame_times, unit='ns'), header['columns'])
+        return data
+
+    @staticmethod
+    def _store(entry, data):
+        """Writes the entry, returns its size in bytes"""
+        os.makedirs(entry, exist_ok=True)
+        np.save(os.path.join(entry, 'motion.npy'), np.ascontiguousarray(data.motion, dtype=np.float64))
+        np.save(os.path.join(entry, 'time.npy'), np.asarray(data.time_index).astype('timedelta64[ns]').astype(np.int64))
+        # the header is written last, an entry without header is incomplete and parsed again
+        with open(os.path.join(entry, 'header.json'), 'w') as f:
+            json.dump({'version': VERSION,
+                       'skeleton': data.skeleton,
+                       'channel_names': data.channel_names,
+                       'columns': data.columns,
+                       'root_name': data.root_name,
+                       'framerate': data.framerate}, f)
+        return sum(os.path.getsize(os.path.join(entry, name)) for name in os.listdir(entry))
+
+    def _evict(self, index, keep):
+        entries = index['entries']
+        size = sum(entry['size'] for entry in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k]['used']):
+            if size <= self.max_size:
+                break
+            if key == keep:
+                continue
+            try:
+                shutil.rmtree(os.path.join(self.directory, key))
+            except FileNotFoundError:
+                pass
+            except OSError:
+                # still in use, the entry is kept and removed later
+                continue
+            size -= entries.pop(key)['size']
+            index['paths'] = {path: known for path, known in index['paths'].items() if known['hash'] != key}
+
+    def _sweep(self, index):
+        """
+        Removes the directories of entries which are not in the index (i.e. failed removals)
+
+        The index is read and written without a lock, so another process may just be writing an entry which
+        is not yet in the index read here, or its update of the index was overwritten by another process.
+        Only directories which were not changed for SWEEP_AGE seconds are removed, a lost entry is parsed again.
+        """
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if name not in index['entries'] and os.path.isdir(path):
+                try:
+                    if time.time() - os.path.getmtime(path) < SWEEP_AGE:
+                        continue
+                except OSError:
+                    continue
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _load_index(self):
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'paths': {}, 'entries': {}}
+
+    def _save_index(self, index):
+        filename = os.path.join(self.directory, INDEX_FILE)
+        # written by every process to its own file and replaced at once, so that the index is never read
+        # half written
+        temporary = '{}.{}.tmp'.format(filename, os.getpid())
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temporary, 'w') as f:
+                json.dump(index, f)
+            os.replace(temporary, filename)
+        except OSError as e:
+            print('Index of the BVH cache not saved: {}'.format(e))
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
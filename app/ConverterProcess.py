@@ -0,0 +1,66 @@
+import queue
+import time
+from multiprocessing import Process, Queue
+from multiprocessing.connection import wait
+from threading import Thread
+
+
+class ConverterProcess:
+    """
+    Runs the frame conversion (LeapData.add_frame) in a separate process, so that the rotation math
+    does not compete with the Leap Motion listener callbacks for the GIL
+
+    The frames are read from a FrameRing, finish() returns the LeapData of the converter process
+    with all converted frames (LeapData.parse() returns the MocapData).
+    trace = LatencyTrace -> the conversion of every frame is traced, the trace is returned in trace after finish()
+    """
+
+    def __init__(self, leap_data, frame_ring, trace=None):
+        self.frame_ring = frame_ring
+        self.trace = trace
+        self._results = Queue()
+        self._process = Process(target=ConverterProcess.convert,
+                                args=(leap_data, frame_ring, trace, self._results))
+
+    def start(self):
+        self._process.start()
+        Thread(target=self._watch, daemon=True).start()
+
+    def _watch(self):
+        # a waiting producer would block forever, if the converter process exits unexpectedly
+        wait([self._process.sentinel])
+        self.frame_ring.close()
+
+    def finish(self):
+        """Close the ring, wait until the remaining frames are converted and return the LeapData"""
+        self.frame_ring.close()
+        while True:
+            try:
+                # the result has to be received before joining, otherwise the process can not exit
+                leap_data, self.trace = self._results.get(timeout=1)
+                break
+            except queue.Empty:
+                if not self._process.is_alive():
+                    raise Exception('Converter process exited with code {}'.format(self._process.exitcode))
+        self._process.join()
+        return leap_data
+
+    @staticmethod
+    def convert(leap_data, frame_ring, trace, results):
+        while True:
+            # blocks until a frame arrives, returns None after the ring was closed and drained
+            frame = frame_ring.get()
+            if frame is None:
+                break
+            if trace is None:
+                leap_data.add_frame(frame)
+                continue
+            started = time.perf_counter_ns()
+            leap_data.add_frame(frame)
+            trace.convert(frame['id'], leap_data.hand, started, time.perf_counter_ns())
+
+        # the file of the stream can not be handed back to the recording process
+        if leap_data.stream:
+            leap_data.stream.close()
+        frame_ring.release()
+        results.put((leap_data, trace))
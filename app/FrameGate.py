@@ -0,0 +1,50 @@
+import LeapFrame
+
+
+class FrameGate:
+    """
+    Decimation of the Leap Motion frames to the selected frame rate (see LeapRecord)
+
+    A frame passes the gate, if it is more than one frame interval after the last passed frame with a recorded
+    hand. Frames without a recorded hand pass as well (for the status messages of LeapData), but do not take
+    the slot of the frame interval, so that the next frame with a hand is not discarded.
+    The frames are either received one by one (due) or polled from the history of the controller (history_frame),
+    both ways pass the same frames.
+    """
+
+    def __init__(self, frames_per_second, hands):
+        # minimum time delta between two recorded frames in microseconds (Leap Motion timestamps)
+        self.frame_interval = int(1000000 / frames_per_second)
+        self.hands = hands
+        # timestamp of the last passed frame with a recorded hand and of the last passed frame
+        self.last_time = 0
+        self.last_passed = 0
+
+    def due(self, timestamp):
+        """True if a frame with this timestamp passes the gate"""
+        return timestamp - self.last_time > self.frame_interval
+
+    def passed(self, record):
+        """Call for every frame (snapshot record) which passed the gate"""
+        timestamp = int(record['timestamp'])
+        self.last_passed = timestamp
+        if any(LeapFrame.has_hand(record, hand) for hand in self.hands):
+            self.last_time = timestamp
+
+    def history_frame(self, controller):
+        """
+        Return the oldest frame from the controller history which passes the gate and was not passed before,
+        None if there is no such frame yet
+        """
+        target_time = max(self.last_time + self.frame_interval, self.last_passed)
+        frame = controller.frame()
+        if not frame.is_valid or frame.timestamp <= target_time:
+            return None
+
+        # the SDK keeps a history of 60 frames
+        for history in range(1, 60):
+            previous_frame = controller.frame(history)
+            if not previous_frame.is_valid or previous_frame.timestamp <= target_time:
+                break
+            frame = previous_frame
+        return frame
@@ -0,0 +1,87 @@
+from collections import deque
+from threading import Condition, Lock
+
+
+class FrameQueue:
+    """
+    A bounded, blocking queue between the Leap Motion listener callbacks (producer)
+    and the frame processing thread (consumer)
+
+    When the queue is full, the overflow policy decides which frame is discarded:
+    'drop_oldest' -> the oldest queued frame is discarded to make room for the new one
+    'drop_newest' -> the new frame is discarded
+    'block' -> the producer waits until there is room again (no frame is lost, i.e. for replays)
+    """
+
+    DROP_OLDEST = 'drop_oldest'
+    DROP_NEWEST = 'drop_newest'
+    BLOCK = 'block'
+
+    def __init__(self, maxsize=256, overflow=DROP_OLDEST):
+        if overflow not in (FrameQueue.DROP_OLDEST, FrameQueue.DROP_NEWEST, FrameQueue.BLOCK):
+            raise ValueError('Choose a correct overflow policy:\n'
+                             '-> "{}" for discarding the oldest queued frame\n'
+                             '-> "{}" for discarding the incoming frame\n'
+                             '-> "{}" for waiting until the queue has room again'
+                             .format(FrameQueue.DROP_OLDEST, FrameQueue.DROP_NEWEST, FrameQueue.BLOCK))
+        if maxsize < 1:
+            raise ValueError('The queue size must be greater or equal than 1')
+
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.dropped = 0
+        self.processed = 0
+
+        self._queue = deque()
+        self._closed = False
+        lock = Lock()
+        self._not_empty = Condition(lock)
+        self._not_full = Condition(lock)
+
+    def __len__(self):
+        return len(self._queue)
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def put(self, frame):
+        """Add a frame, only blocks the caller with the 'block' overflow policy"""
+        with self._not_empty:
+            if self.overflow == FrameQueue.BLOCK:
+                while len(self._queue) >= self.maxsize and not self._closed:
+                    self._not_full.wait()
+            if self._closed:
+                return False
+            if len(self._queue) >= self.maxsize:
+                self.dropped += 1
+                if self.overflow == FrameQueue.DROP_NEWEST:
+                    return False
+                self._queue.popleft()
+            self._queue.append(frame)
+            self._not_empty.notify()
+        return True
+
+    def get(self, timeout=None):
+        """
+        Wait until a frame is available and return it
+
+        Returns None when the queue was closed and all remaining frames were consumed,
+        or when the timeout expired
+        """
+        with self._not_empty:
+            while not self._queue:
+                if self._closed:
+                    return None
+                if not self._not_empty.wait(timeout) and timeout is not None:
+                    return None
+            self.processed += 1
+            self._not_full.notify()
+            return self._queue.popleft()
+
+    def close(self):
+        """Stop accepting frames and wake up the consumer, queued frames can still be consumed"""
+        with self._not_empty:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
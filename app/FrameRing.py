@@ -0,0 +1,170 @@
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from FrameQueue import FrameQueue
+from LeapFrame import FRAME_DTYPE
+
+# counters in front of the slots: frames consumed by the converter process, frames written by the producer
+_COUNTERS = 2
+_PROCESSED = 0
+_WRITTEN = 1
+_HEADER_SIZE = 64
+
+
+class FrameRing:
+    """
+    A bounded ring buffer of snapshot records (see LeapFrame) in shared memory, between the Leap Motion
+    listener callbacks (producer) and a converter process (consumer, see ConverterProcess)
+
+    Same interface as FrameQueue, but the frame is copied into a preallocated slot instead of being queued
+    as object. The producer cannot discard queued frames of the other process, when the ring is full:
+    'drop_newest' -> the new frame is discarded
+    'block' -> the producer waits until there is room again (no frame is lost, i.e. for replays)
+
+    close() releases one more permit of the filled slots: a waiting consumer wakes up, drains the remaining
+    frames and gets None once all written frames are consumed. A waiting producer is woken up by a permit of
+    the free slots. A frame is either written completely before the ring is closed or not at all (lock).
+    """
+
+    DROP_NEWEST = FrameQueue.DROP_NEWEST
+    BLOCK = FrameQueue.BLOCK
+
+    def __init__(self, capacity=256, overflow=DROP_NEWEST):
+        if overflow not in (FrameRing.DROP_NEWEST, FrameRing.BLOCK):
+            raise ValueError('Choose a correct overflow policy:\n'
+                             '-> "{}" for discarding the incoming frame\n'
+                             '-> "{}" for waiting until the ring has room again'
+                             .format(FrameRing.DROP_NEWEST, FrameRing.BLOCK))
+        if capacity < 1:
+            raise ValueError('The ring capacity must be greater or equal than 1')
+
+        self.capacity = capacity
+        self.overflow = overflow
+        self.dropped = 0
+
+        self._memory = shared_memory.SharedMemory(create=True,
+                                                  size=_HEADER_SIZE + capacity * FRAME_DTYPE.itemsize)
+        # only the creating process frees the shared memory (a forked process has the same attributes)
+        self._owner_pid = os.getpid()
+        self._filled = multiprocessing.Semaphore(0)
+        self._free = multiprocessing.Semaphore(capacity)
+        self._closed = multiprocessing.Event()
+        self._lock = multiprocessing.Lock()
+        # position of the next slot, every process keeps its own (only one producer and one consumer)
+        self._index = 0
+        self._written = 0
+        self._processed = 0
+        self._attach()
+        self._counters[:] = 0
+
+    def __getstate__(self):
+        # the shared memory is attached again by name in the converter process
+        return {'capacity': self.capacity, 'overflow': self.overflow, 'dropped': self.dropped,
+                'name': self._memory.name, 'owner_pid': self._owner_pid,
+                'filled': self._filled, 'free': self._free, 'closed': self._closed, 'lock': self._lock}
+
+    def __setstate__(self, state):
+        self.capacity = state['capacity']
+        self.overflow = state['overflow']
+        self.dropped = state['dropped']
+        self._memory = shared_memory.SharedMemory(name=state['name'])
+        self._owner_pid = state['owner_pid']
+        self._filled = state['filled']
+        self._free = state['free']
+        self._closed = state['closed']
+        self._lock = state['lock']
+        self._index = 0
+        self._written = 0
+        self._processed = 0
+        self._attach()
+
+    def _attach(self):
+        self._counters = np.ndarray((_COUNTERS,), dtype=np.int64, buffer=self._memory.buf)
+        self._slots = np.ndarray((self.capacity,), dtype=FRAME_DTYPE, buffer=self._memory.buf, offset=_HEADER_SIZE)
+
+    def __len__(self):
+        return self.written - self.processed
+
+    @property
+    def closed(self):
+        return self._closed.is_set()
+
+    @property
+    def processed(self):
+        if self._memory is None:
+            return self._processed
+        return int(self._counters[_PROCESSED])
+
+    @property
+    def written(self):
+        if self._memory is None:
+            return self._written
+        return int(self._counters[_WRITTEN])
+
+    def put(self, frame):
+        """Copy a frame into the next free slot, only blocks the caller with the 'block' overflow policy"""
+        if self._closed.is_set():
+            return False
+        if self.overflow == FrameRing.BLOCK:
+            # woken up by a consumed frame or by close()
+            self._free.acquire()
+        elif not self._free.acquire(False):
+            self.dropped += 1
+            return False
+
+        with self._lock:
+            if self._closed.is_set():
+                self._free.release()
+                return False
+            self._slots[self._index] = frame
+            self._index = (self._index + 1) % self.capacity
+            self._counters[_WRITTEN] += 1
+            self._filled.release()
+        return True
+
+    def get(self, timeout=None):
+        """
+        Wait until a frame is available and return a copy of it (zero-dimensional record)
+
+        Returns None when the ring was closed and all remaining frames were consumed,
+        or when the timeout expired
+        """
+        if not self._filled.acquire(timeout=timeout):
+            return None
+        # the permits of the frames and of close() are alike, the written frames are drained first
+        if self.processed == self.written:
+            # closed and drained, the permit of close() is kept for the next call
+            self._filled.release()
+            return None
+
+        frame = self._slots[self._index, ...].copy()
+        self._index = (self._index + 1) % self.capacity
+        self._counters[_PROCESSED] += 1
+        self._free.release()
+        return frame
+
+    def close(self):
+        """Stop accepting frames, queued frames can still be consumed"""
+        with self._lock:
+            if self._closed.is_set():
+                return
+            self._closed.set()
+            # wake up the consumer and a producer waiting for a free slot
+            self._filled.release()
+            self._free.release()
+
+    def release(self):
+        """Detach from the shared memory, the creating process also frees it"""
+        if self._memory is None:
+            return
+        self._processed = int(self._counters[_PROCESSED])
+        self._written = int(self._counters[_WRITTEN])
+        self._counters = None
+        self._slots = None
+        self._memory.close()
+        if self._owner_pid == os.getpid():
+            self._memory.unlink()
+        self._memory = None
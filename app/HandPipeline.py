@@ -0,0 +1,78 @@
+import time
+from threading import Thread
+
+from FrameQueue import FrameQueue
+from FrameRing import FrameRing
+from ConverterProcess import ConverterProcess
+
+
+class HandPipeline:
+    """
+    Conversion of the frames of one hand (see LeapData.hand)
+
+    The frames are queued and converted in a thread, or in a converter process through a ring buffer
+    in shared memory (convert_process = True). Every recorded hand has its own pipeline, so that the hands
+    are converted concurrently.
+    trace = LatencyTrace -> the conversion of every frame is traced (see LatencyTrace.convert)
+    """
+
+    def __init__(self, leap_data, queue_size=256, overflow=FrameQueue.DROP_OLDEST, convert_process=False,
+                 trace=None):
+        self.hand = leap_data.hand
+        self.leap_data = leap_data
+        self.trace = trace
+        self.converter = None
+        self.t = None
+
+        if convert_process:
+            self.frame_queue = FrameRing(capacity=queue_size,
+                                         overflow=FrameRing.BLOCK if overflow == FrameQueue.BLOCK
+                                         else FrameRing.DROP_NEWEST)
+            self.converter = ConverterProcess(leap_data, self.frame_queue, trace=trace)
+        else:
+            self.frame_queue = FrameQueue(maxsize=queue_size, overflow=overflow)
+
+    @property
+    def closed(self):
+        return self.frame_queue.closed
+
+    def start(self):
+        if self.converter:
+            self.converter.start()
+        else:
+            self.t = Thread(target=self.process_frame, args=(self,))
+            self.t.start()
+
+    def put(self, frame):
+        return self.frame_queue.put(frame)
+
+    def close(self):
+        self.frame_queue.close()
+
+    def finish(self):
+        """Wait until the queued frames are converted, returns the LeapData with all converted frames"""
+        self.frame_queue.close()
+        if self.converter:
+            # continue with the converted frames of the converter process
+            try:
+                self.leap_data = self.converter.finish()
+                self.trace = self.converter.trace
+            finally:
+                self.frame_queue.release()
+        else:
+            self.t.join()
+        return self.leap_data
+
+    @staticmethod
+    def process_frame(pipeline):
+        while True:
+            # blocks until a frame arrives, returns None after the queue was closed and drained
+            frame = pipeline.frame_queue.get()
+            if frame is None:
+                break
+            if pipeline.trace is None:
+                pipeline.leap_data.add_frame(frame)
+                continue
+            started = time.perf_counter_ns()
+            pipeline.leap_data.add_frame(frame)
+            pipeline.trace.convert(frame['id'], pipeline.hand, started, time.perf_counter_ns())
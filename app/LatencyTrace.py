@@ -0,0 +1,149 @@
+import json
+import os
+import time
+
+import numpy as np
+
+from LeapFrame import HANDS
+
+# enqueued frames: Leap Motion frame id and timestamp, capture latency (controller.now() - timestamp),
+# time of enqueueing (time.perf_counter_ns, comparable between processes) and queue depth before enqueueing
+ENQUEUE_DTYPE = np.dtype([
+    ('id', np.int64),
+    ('timestamp', np.int64),
+    ('capture_us', np.int64),
+    ('enqueued_ns', np.int64),
+    ('depth', np.int32)])
+
+# converted frames: start of the conversion and time when the sample was appended (LeapData.add_frame)
+CONVERT_DTYPE = np.dtype([
+    ('id', np.int64),
+    ('hand', np.int8),
+    ('started_ns', np.int64),
+    ('appended_ns', np.int64)])
+
+# bin edges of the latency histograms in milliseconds
+HISTOGRAM_EDGES_MS = [0, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+# maximum number of points of the queue depth series in the summary
+DEPTH_SERIES_POINTS = 1000
+
+
+class LatencyTrace:
+    """
+    Per-frame latency trace from the Leap Motion timestamp to the converted sample
+
+    The listener records the enqueued frames (enqueue, discard), every conversion pipeline records
+    its converted frames in its own trace (convert), which are merged at the end (merge).
+    write() stores a JSON summary with percentiles and histograms of the latencies and the queue depth.
+    """
+
+    def __init__(self, capacity=4096):
+        self.discarded = 0
+        self._enqueued = np.empty(capacity, dtype=ENQUEUE_DTYPE)
+        self._enqueued_size = 0
+        self._converted = np.empty(capacity, dtype=CONVERT_DTYPE)
+        self._converted_size = 0
+
+    @property
+    def enqueued(self):
+        return self._enqueued[:self._enqueued_size]
+
+    @property
+    def converted(self):
+        return self._converted[:self._converted_size]
+
+    def enqueue(self, frame_id, timestamp, now, depth):
+        """now: current time of the controller (same clock as the frame timestamp)"""
+        if self._enqueued_size == len(self._enqueued):
+            self._enqueued = LatencyTrace._grow(self._enqueued, self._enqueued_size)
+        self._enqueued[self._enqueued_size] = (frame_id, timestamp, now - timestamp, time.perf_counter_ns(), depth)
+        self._enqueued_size += 1
+
+    def discard(self, count=1):
+        """Frames which were not enqueued because of the frame rate (fps gate)"""
+        self.discarded += count
+
+    def convert(self, frame_id, hand, started, appended):
+        if self._converted_size == len(self._converted):
+            self._converted = LatencyTrace._grow(self._converted, self._converted_size)
+        self._converted[self._converted_size] = (frame_id, HANDS.index(hand), started, appended)
+        self._converted_size += 1
+
+    def merge(self, trace):
+        """Add the converted frames of the trace of a conversion pipeline"""
+        converted = trace.converted
+        while self._converted_size + len(converted) > len(self._converted):
+            self._converted = LatencyTrace._grow(self._converted, self._converted_size)
+        self._converted[self._converted_size:self._converted_size + len(converted)] = converted
+        self._converted_size += len(converted)
+
+    @staticmethod
+    def _grow(array, size):
+        grown = np.empty(max(1, 2 * len(array)), dtype=array.dtype)
+        grown[:size] = array[:size]
+        return grown
+
+    def summary(self):
+        enqueued = self.enqueued
+        converted = self.converted
+        summary = {'frames': {'enqueued': len(enqueued),
+                              'discarded_by_fps_gate': self.discarded,
+                              'converted': {}},
+                   'latency_ms': {'capture': LatencyTrace._statistics(enqueued['capture_us'] / 1e3)},
+                   'histogram_ms': {'edges': HISTOGRAM_EDGES_MS + [None],
+                                    'capture': LatencyTrace._histogram(enqueued['capture_us'] / 1e3)},
+                   'queue_depth': self._queue_depth(enqueued)}
+
+        # the enqueued frames are ordered by their id
+        for hand_index, hand in enumerate(HANDS):
+            frames = converted[converted['hand'] == hand_index]
+            if not len(frames) or not len(enqueued):
+                continue
+            position = np.minimum(np.searchsorted(enqueued['id'], frames['id']), len(enqueued) - 1)
+            matched = enqueued['id'][position] == frames['id']
+            frames = frames[matched]
+            sources = enqueued[position[matched]]
+
+            latencies = {'queue': (frames['started_ns'] - sources['enqueued_ns']) / 1e6,
+                         'conversion': (frames['appended_ns'] - frames['started_ns']) / 1e6}
+            latencies['total'] = sources['capture_us'] / 1e3 + latencies['queue'] + latencies['conversion']
+
+            summary['frames']['converted'][hand] = len(frames)
+            for name, latency in latencies.items():
+                summary['latency_ms'].setdefault(name, {})[hand] = LatencyTrace._statistics(latency)
+                summary['histogram_ms'].setdefault(name, {})[hand] = LatencyTrace._histogram(latency)
+        return summary
+
+    def write(self, filename):
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(filename, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+        print('"{}" written'.format(filename))
+
+    @staticmethod
+    def _statistics(values):
+        if not len(values):
+            return None
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {'p50': float(p50), 'p95': float(p95), 'p99': float(p99),
+                'mean': float(np.mean(values)), 'max': float(np.max(values))}
+
+    @staticmethod
+    def _histogram(values):
+        # the last bin counts all values above the last edge
+        counts, _ = np.histogram(np.clip(values, 0, None), bins=HISTOGRAM_EDGES_MS + [np.inf])
+        return counts.tolist()
+
+    @staticmethod
+    def _queue_depth(enqueued):
+        if not len(enqueued):
+            return None
+        depth = enqueued['depth']
+        seconds = (enqueued['enqueued_ns'] - enqueued['enqueued_ns'][0]) / 1e9
+        # maximum depth of evenly sized bins of frames
+        bins = np.array_split(np.arange(len(depth)), min(len(depth), DEPTH_SERIES_POINTS))
+        series = [[float(seconds[b[0]]), int(depth[b].max())] for b in bins]
+        p50, p95 = np.percentile(depth, [50, 95])
+        return {'p50': float(p50), 'p95': float(p95), 'max': int(depth.max()), 'series': series}
@@ -1,4 +1,3 @@
-import re
 import numpy as np
 import pandas
 import sys
@@ -6,27 +5,43 @@ import sys
 from config.Skeleton import Skeleton
 from config.AnybodyFirstFrame import AnybodyFirstFrame
 from config.BasisFirstFrame import BasisFirstFrame
+from config.JointTable import JointTable, CHANNEL_KIND, POINT_ELBOW, POINT_WRIST, POINT_PREV_JOINT, \
+    POINT_NEXT_JOINT, BASIS_ARM, BASIS_HAND, BASIS_BONE
 from resources.pymo.pymo.data import MocapData
-from RotationUtil import rot2eul, get_order
-from resources.LeapSDK.v53_python39 import Leap
+from RotationUtil import rot2eul_array, get_order, RAD_TO_DEG
+from LeapFrame import NUM_FINGERS, NUM_BONES
+from MotionBuffer import MotionBuffer
+
+# columns of the (joints, 6) values which change their sign when mirroring at the yz-plane (x -> -x)
+MIRROR_COLUMNS = [CHANNEL_KIND['Xposition'], CHANNEL_KIND['Yrotation'], CHANNEL_KIND['Zrotation']]
 
 
 class LeapData:
     """
     A class to convert LeapMotion frames to PyMO data structure (MocapData)
 
-    Calculates translations (offsets) and rotation data for the joints
+    Calculates translations (offsets) and rotation data for the joints,
+    the frames are expected as snapshot records (see LeapFrame)
+
+    The left hand is mirrored (x -> -x) to a right hand for the calculation, so that the same reference
+    bases (config/*.json) can be used, the results are mirrored back to the skeleton of the left hand
     """
 
-    def __init__(self, channel_setting='rotation', frame_rate=0.033333, anybody_basis=True):
+    def __init__(self, channel_setting='rotation', frame_rate=0.033333, anybody_basis=True, keep_motion=True,
+                 hand='right'):
         self._skeleton = {}
-        self._setting = Skeleton(channel_setting)
+        self._setting = Skeleton(channel_setting, hand)
+        self.hand = hand
+        self._mirror = hand == 'left'
         self._motion_channels = []
-        self._motions = []
+        self._motions = None
         self._root_name = ''
         self.data = MocapData()
 
         self.first_frame = None
+        # initial bases of all joints and transposed initial bases of their parents, set with the first frame
+        self._initial_basis = None
+        self._parent_initial_basis_t = None
         self.anybody_first_frame = AnybodyFirstFrame()
         self.basis_first_frame = BasisFirstFrame()
         # anybody_reference = True -> Use Anybody basis from config/*.json (see AnybodyFirstFrame)
@@ -34,6 +49,10 @@ class LeapData:
         self.anybody_basis = anybody_basis
         self.status = 0
         self._frame_rate = frame_rate
+        # stream = BVHStreamWriter -> every frame is written to the stream as soon as it is converted
+        # keep_motion = False -> the frames are only streamed, parse() returns no motion data
+        self.stream = None
+        self.keep_motion = keep_motion
 
         self._skeleton = self._setting.skeleton
         # fill channels into skeleton in selected order (i.e. xyz)
@@ -46,15 +65,25 @@ class LeapData:
             for channel in joint_value['channels']:
                 self._motion_channels.append((joint_name, channel))
 
+        # resolve all joint names once, the per-frame code only indexes arrays
+        self.joint_table = JointTable(self._skeleton, self._root_name)
+        # channel values of all frames, one row per frame in the order of _motion_channels
+        self._motions = MotionBuffer(len(self._motion_channels))
+
     def parse(self):
+        if self.first_frame is None:
+            sys.exit("No data was recorded - will terminate now!")
+        self._header()
+        self._set_motion()
+
+        return self.data
+
+    def _header(self):
+        """MocapData without motion values (skeleton with offsets, channels, root and frame rate)"""
         self.data.skeleton = self._skeleton
         self.data.channel_names = self._motion_channels
-        if not self.first_frame:
-            sys.exit("No data was recorded - will terminate now!")
-        self.data.values = self._motion2dataframe()
         self.data.root_name = self._root_name
         self.data.framerate = self._frame_rate
-
         return self.data
 
     def _check_frame(self, frame):
@@ -63,30 +92,30 @@ class LeapData:
         """
         status_no_hand = 1
         status_no_finger = 2
-        status_left_hand = 3
+        status_other_hand = 3
         status_valid = 4
 
-        if frame.hands.is_empty:
+        if frame['hands'] == 0:
             if self.status != status_no_hand:
                 print("-- No hand found. --")
                 self.status = status_no_hand
             return False
 
-        # Get the first hand
-        hand = frame.hands[0]
+        # Get the hand of the recorded side
+        hand = frame[self.hand]
 
-        if hand.is_left:
-            if self.status != status_left_hand:
-                print("-- Please use your right hand. --")
-                self.status = status_left_hand
+        if not hand['is_' + self.hand]:
+            if self.status != status_other_hand:
+                print("-- Please use your {} hand. --".format(self.hand))
+                self.status = status_other_hand
             return False
 
-        if not hand.is_right and not hand.is_valid:
+        # an invalid hand of the recorded side is not converted (as LeapFrame.has_hand for the decimation)
+        if not hand['is_valid']:
             return False
 
         # Check if the hand has any fingers
-        fingers = hand.fingers
-        if fingers.is_empty:
+        if hand['fingers'] == 0:
             if self.status != status_no_finger:
                 print("-- No valid fingers found. --")
                 self.status = status_no_finger
@@ -94,7 +123,7 @@ class LeapData:
 
         # frame_number = 0 if not self.first_frame else frame.id - self.first_frame.id
         if self.status != status_valid:
-            print("-- Valid right hand found, recording data. --")
+            print("-- Valid {} hand found, recording data. --".format(self.hand))
             self.status = status_valid
         return True
 
@@ -102,130 +131,139 @@ class LeapData:
         if not self._check_frame(frame):
             return None
 
-        # Get the first hand
-        hand = frame.hands[0]
-        if not self.first_frame:
-            self.first_frame = frame
+        hand = frame[self.hand]
+        if self.first_frame is None:
+            self.first_frame = frame.copy()
+            self._cache_initial_bases()
             channel_values = self._get_channel_values(hand, firstframe=True)
-            self._motions.append((0, channel_values))
+            if self.stream:
+                # the offsets are fixed with the first frame, so the hierarchy can be written
+                self.stream.begin(self._header())
+            self._append(0, channel_values)
             return
 
         channel_values = self._get_channel_values(hand)
-        self._motions.append((frame.timestamp - self.first_frame.timestamp, channel_values))
+        self._append(frame['timestamp'] - self.first_frame['timestamp'], channel_values)
         return frame
 
+    def _append(self, timestamp, channel_values):
+        if self.keep_motion:
+            self._motions.append(timestamp, channel_values)
+        if self.stream:
+            self.stream.write_frame(channel_values)
+
     def _get_channel_values(self, hand, firstframe=False):
-        channel_values = []
-        # export_basis = {}
-        for joint_name, joint_value in self._skeleton.items():
-            # motion data with rotations
-            if joint_name == self._root_name:
-                x_pos, y_pos, z_pos = LeapData._get_root_offset()
-            elif joint_name == 'RightElbow':
-                x_pos, y_pos, z_pos = LeapData._get_elbow_offset(hand)
-            elif joint_name == 'RightHand':
-                x_pos, y_pos, z_pos = LeapData._get_wrist_offset(hand)
-            else:
-                x_pos, y_pos, z_pos = LeapData._get_finger_offset(joint_name, hand)
-
-            x_rot, y_rot, z_rot = self._calculate_euler_angles(hand, joint_name)
-
-            x_rot *= Leap.RAD_TO_DEG
-            y_rot *= Leap.RAD_TO_DEG
-            z_rot *= Leap.RAD_TO_DEG
-
-            # if joint_name == 'RightHand':
-            #     print(x_rot, y_rot, z_rot)
-
-            if firstframe:
-                if self.anybody_basis:
-                    x_pos, y_pos, z_pos = self._calculate_offset(joint_name, [x_pos, y_pos, z_pos])
-                joint_value['offsets'] = [x_pos, y_pos, z_pos]
-
-                # # dump the basis of leap motion bones
-                # if 'End' not in joint_name and 'Root' not in joint_name:
-                #     export_basis[joint_name] = np.ndarray.tolist(self._get_basis(hand, joint_name))
+        """Returns the values of all motion channels (see JointTable.channel_names) of a frame"""
+        table = self.joint_table
 
-            for channel in joint_value['channels']:
-                if channel == 'Xposition':
-                    channel_values.append((joint_name, channel, x_pos))
-                if channel == 'Yposition':
-                    channel_values.append((joint_name, channel, y_pos))
-                if channel == 'Zposition':
-                    channel_values.append((joint_name, channel, z_pos))
-                if channel == 'Xrotation':
-                    channel_values.append((joint_name, channel, x_rot))
-                if channel == 'Yrotation':
-                    channel_values.append((joint_name, channel, y_rot))
-                if channel == 'Zrotation':
-                    channel_values.append((joint_name, channel, z_rot))
+        # positions (offsets to the parent joint) and rotations of all joints, shape (joints, 6)
+        joint_values = np.empty((len(table), 6))
+        points = self._get_points(hand)
+        joint_values[:, :3] = points[table.offset_head] - points[table.offset_tail]
+        joint_values[:, 3:] = self._calculate_euler_angles(hand) * RAD_TO_DEG
+
+        if firstframe and self.anybody_basis:
+            for joint_index, joint_name in enumerate(table.names):
+                joint_values[joint_index, :3] = self._calculate_offset(joint_name, joint_values[joint_index, :3])
+
+        if self._mirror:
+            # mirror back to the left hand: Xposition, Yrotation and Zrotation change their sign
+            joint_values[:, MIRROR_COLUMNS] *= -1
+
+        if firstframe:
+            for joint_index, joint_value in enumerate(self._skeleton.values()):
+                joint_value['offsets'] = joint_values[joint_index, :3].tolist()
 
         # # dump the basis of leap motion bones
         # if firstframe:
         #     import json
         #     import datetime
+        #     export_basis = {joint_name: np.ndarray.tolist(self._get_bases(hand)[table.basis_index[joint_index]])
+        #                     for joint_index, joint_name in enumerate(table.names)
+        #                     if 'End' not in joint_name and 'Root' not in joint_name}
         #     with open('../output/{}basis.json'.format(datetime.datetime.today().strftime('%Y%m%d_%H%M%S')), 'w') as o:
         #         json.dump(export_basis, o)
 
-        return channel_values
+        return joint_values[table.channel_joint, table.channel_kind]
 
-    def _calculate_euler_angles(self, hand, joint_name):
-        initial_hand = self.first_frame.hands[0]
+    def _calculate_euler_angles(self, hand):
+        """Returns the euler angles (in radians) of the local rotation of all joints, shape (joints, 3)"""
+        table = self.joint_table
+        bases = self._get_bases(hand)
+        basis = bases[table.basis_index]
+        parent_basis = bases[table.parent_basis_index]
 
+        # calculation of local rotation matrix for all joints - important!!!
+        # rot = initial_basis * basis^T * (parent_initial_basis * parent_basis^T)^T
+        #     = initial_basis * basis^T * parent_basis * parent_initial_basis^T
+        rot = np.einsum('jab,jcb,jcd,jde->jae', self._initial_basis, basis, parent_basis,
+                        self._parent_initial_basis_t)
+
+        euler_angles = rot2eul_array(rot)
         # special case for root and finger tip
-        if joint_name == self._root_name or not self._skeleton[joint_name]['children']:
-            return 0.0, 0.0, 0.0
+        euler_angles[~table.rotation_mask] = 0.0
+        return euler_angles
 
+    def _cache_initial_bases(self):
+        """Precompute the initial bases, which do not change during a recording"""
+        table = self.joint_table
         if self.anybody_basis:
             # compare basis to anybody basis
-            parent_initial_basis = self._get_basis_first_frame(self._skeleton[joint_name]['parent'])
-            initial_basis = self._get_basis_first_frame(joint_name)
+            initial_basis = np.tile(np.identity(3), (len(table), 1, 1))
+            parent_initial_basis = np.tile(np.identity(3), (len(table), 1, 1))
+            for joint_index, joint_name in enumerate(table.names):
+                if table.rotation_mask[joint_index]:
+                    initial_basis[joint_index] = self._get_basis_first_frame(joint_name)
+                    parent_initial_basis[joint_index] = \
+                        self._get_basis_first_frame(self._skeleton[joint_name]['parent'])
         else:
             # compare basis to first frame from Leap Motion
-            parent_initial_basis = self._get_basis(initial_hand, self._skeleton[joint_name]['parent'])
-            initial_basis = self._get_basis(initial_hand, joint_name)
-
-        parent_basis = self._get_basis(hand, self._skeleton[joint_name]['parent'])
-        basis = self._get_basis(hand, joint_name)
-
-        # if joint_name == 'RightHand':
-        #     print(basis)
-
-        # calculation of local rotation matrix - important!!!
-        rot = np.matmul(
-                np.matmul(
-                    initial_basis, np.transpose(basis)
-                ),
-                np.transpose(
-                    np.matmul(
-                        parent_initial_basis, np.transpose(parent_basis)
-                    )
-                )
-        )
-        return rot2eul(rot)
-
-    def _get_basis(self, hand, joint_name):
-        if joint_name == self._root_name:
-            return np.array([[1, 0, 0],
-                             [0, 1, 0],
-                             [0, 0, 1]])
-        if joint_name == 'RightElbow':
-            return LeapData._basismatrix(hand.arm.basis)
-        if joint_name == 'RightHand':
-            return LeapData._basismatrix(hand.basis)
+            initial_bases = self._get_bases(self.first_frame[self.hand])
+            initial_basis = initial_bases[table.basis_index]
+            parent_initial_basis = initial_bases[table.parent_basis_index]
+
+        self._initial_basis = np.ascontiguousarray(initial_basis)
+        self._parent_initial_basis_t = np.ascontiguousarray(np.transpose(parent_initial_basis, (0, 2, 1)))
 
-        # else, return basis of the finger
-        finger, bone_number = LeapData._split_key(joint_name)
-        fingerlist = hand.fingers.finger_type(LeapData._get_finger_type(finger))
-        bone = fingerlist[0].bone(LeapData._get_bone_type(bone_number))
-        return LeapData._basismatrix(bone.basis)
+    def _get_bases(self, hand):
+        """
+        Stack all bases of a hand, shape (3 + fingers * bones, 3, 3):
+        root (identity), elbow (arm), hand, bones of the fingers (see LeapFrame.bone_index)
+        """
+        bases = np.empty((BASIS_BONE + NUM_FINGERS * NUM_BONES, 3, 3))
+        bases[0] = np.identity(3)
+        bases[BASIS_ARM] = hand['arm_basis']
+        bases[BASIS_HAND] = hand['basis']
+        bases[BASIS_BONE:] = hand['bone_basis']
+        if self._mirror:
+            # the left-handed bases of the left hand become the right-handed bases of the mirrored hand
+            bases[BASIS_ARM:, 0, :] *= -1
+        return bases
+
+    def _get_points(self, hand):
+        """
+        Stack all points of a hand, shape (3 + 2 * fingers * bones, 3):
+        origin, elbow, wrist, previous and next joints of the finger bones (see config.JointTable)
+        """
+        points = np.zeros((POINT_NEXT_JOINT + NUM_FINGERS * NUM_BONES, 3))
+        points[POINT_ELBOW] = hand['elbow_position']
+        points[POINT_WRIST] = hand['wrist_position']
+        points[POINT_PREV_JOINT:POINT_NEXT_JOINT] = hand['prev_joint']
+        points[POINT_NEXT_JOINT:] = hand['next_joint']
+        if self._mirror:
+            points[:, 0] *= -1
+        return points
+
+    def _reference_name(self, joint_name):
+        """The reference values (config/*.json) are given for the joints of the right hand"""
+        return joint_name.replace('Left', 'Right', 1) if self._mirror else joint_name
 
     def _get_basis_first_frame(self, joint_name):
         if joint_name == self._root_name:
             return np.array([[1, 0, 0],
                              [0, 1, 0],
                              [0, 0, 1]])
-        return self.anybody_first_frame.get_basis(joint_name)
+        return self.anybody_first_frame.get_basis(self._reference_name(joint_name))
 
     def _calculate_offset(self, joint_name, leap_offset):
         if joint_name == self._root_name:
@@ -244,89 +282,7 @@ class LeapData:
     def _get_anybody_position(self, joint_name):
         if joint_name == self._root_name:
             return np.array([0, 0, 0])
-        return self.anybody_first_frame.get_position(joint_name)
-
-    @staticmethod
-    def _get_root_offset():
-        return 0, 0, 0
-
-    @staticmethod
-    def _get_elbow_offset(hand):
-        arm = hand.arm
-        return arm.elbow_position.x, arm.elbow_position.y, arm.elbow_position.z
-
-    @staticmethod
-    def _get_wrist_offset(hand):
-        arm = hand.arm
-        x_wrist = hand.wrist_position.x - arm.elbow_position.x
-        y_wrist = hand.wrist_position.y - arm.elbow_position.y
-        z_wrist = hand.wrist_position.z - arm.elbow_position.z
-
-        return x_wrist, y_wrist, z_wrist
-
-    @staticmethod
-    def _get_finger_offset(key, hand):
-        key, bone_number = LeapData._split_key(key)
-
-        fingerlist = hand.fingers.finger_type(LeapData._get_finger_type(key))
-
-        # vector between wrist and joint metacarpal proximal (length of carpals)
-        if bone_number == 1 or ('Thumb' in key and bone_number == 2):
-            bone = fingerlist[0].bone(LeapData._get_bone_type(bone_number))
-            return \
-                bone.prev_joint.x - hand.wrist_position.x, \
-                bone.prev_joint.y - hand.wrist_position.y, \
-                bone.prev_joint.z - hand.wrist_position.z
-
-        # vector for bones metacarpal, proximal, intermediate, distal
-        bone = fingerlist[0].bone(LeapData._get_bone_type(bone_number - 1))
-        return \
-            bone.next_joint.x - bone.prev_joint.x, \
-            bone.next_joint.y - bone.prev_joint.y, \
-            bone.next_joint.z - bone.prev_joint.z
-
-    @staticmethod
-    def _split_key(key):
-        key_split = re.split('(\d)', key)
-        key = key_split[0]
-        if key_split[-1] == '_Nub':
-            return key, 5
-        else:
-            return key, int(key_split[1])
-
-    @staticmethod
-    def _get_finger_type(key):
-        if key == 'RightHandThumb':
-            return Leap.Finger.TYPE_THUMB
-        if key == 'RightHandIndex':
-            return Leap.Finger.TYPE_INDEX
-        if key == 'RightHandMiddle':
-            return Leap.Finger.TYPE_MIDDLE
-        if key == 'RightHandRing':
-            return Leap.Finger.TYPE_RING
-        if key == 'RightHandPinky':
-            return Leap.Finger.TYPE_PINKY
-        else:
-            raise Exception('Key ({}) did not match'.format(key))
-
-    @staticmethod
-    def _get_bone_type(bone_number):
-        if bone_number == 4:
-            return Leap.Bone.TYPE_DISTAL
-        if bone_number == 3:
-            return Leap.Bone.TYPE_INTERMEDIATE
-        if bone_number == 2:
-            return Leap.Bone.TYPE_PROXIMAL
-        if bone_number == 1:
-            return Leap.Bone.TYPE_METACARPAL
-        else:
-            raise Exception('bone number ({}) did not match'.format(bone_number))
-
-    @staticmethod
-    def _basismatrix(basis):
-        return np.array([[basis.x_basis.x, basis.y_basis.x, basis.z_basis.x],
-                        [basis.x_basis.y, basis.y_basis.y, basis.z_basis.y],
-                        [basis.x_basis.z, basis.y_basis.z, basis.z_basis.z]])
+        return self.anybody_first_frame.get_position(self._reference_name(joint_name))
 
     def _get_channels(self, joint_name, channel_setting):
         if '_Nub' in joint_name:
@@ -348,12 +304,11 @@ class LeapData:
         for joint_name, joint_dict in self._skeleton.items():
             joint_dict['channels'] = self._get_channels(joint_name, channel_setting)
 
-    def _motion2dataframe(self):
-        """Returns all of the channels parsed from the LeapMotion sensor as a pandas DataFrame"""
+    def _set_motion(self):
+        """Sets all of the channels parsed from the LeapMotion sensor as the motion of the MocapData"""
 
-        time_index = pandas.to_timedelta([f[0] for f in self._motions], unit='s')
-        frames = [f[1] for f in self._motions]
-        channels = np.asarray([[channel[2] for channel in frame] for frame in frames])
+        time_index = pandas.to_timedelta(self._motions.timestamps, unit='s')
         column_names = ['%s_%s' % (c[0], c[1]) for c in self._motion_channels]
 
-        return pandas.DataFrame(data=channels, index=time_index, columns=column_names)
+        # no copy, the motion is the buffer of the recorded values
+        self.data.set_motion(self._motions.values, time_index, column_names)
@@ -0,0 +1,144 @@
+import numpy as np
+
+# Compact numeric snapshot of a Leap Motion frame
+#
+# All values needed for the conversion are copied out of the SWIG Leap.Frame in one pass,
+# so that the SDK frame can be released right after the on_frame callback.
+# Bases are stored as matrices with the x-, y- and z-basis as columns (see LeapData._basismatrix).
+# The bones of the fingers are stored in a fixed layout: index = finger type * NUM_BONES + bone type
+# finger type: 0 = thumb, 1 = index, 2 = middle, 3 = ring, 4 = pinky (Leap.Finger.TYPE_*)
+# bone type: 0 = metacarpal, 1 = proximal, 2 = intermediate, 3 = distal (Leap.Bone.TYPE_*)
+# The first right and the first left hand of the frame are stored in their own slot (see HANDS),
+# an empty slot is all zeros (is_right and is_left are False).
+
+NUM_FINGERS = 5
+NUM_BONES = 4
+# finger type of the finger names of the skeleton (see config.Skeleton)
+FINGER_TYPE = {'Thumb': 0, 'Index': 1, 'Middle': 2, 'Ring': 3, 'Pinky': 4}
+HANDS = ('right', 'left')
+
+HAND_DTYPE = np.dtype([
+    ('is_valid', np.bool_),
+    ('is_left', np.bool_),
+    ('is_right', np.bool_),
+    ('fingers', np.int8),
+    ('elbow_position', np.float32, (3,)),
+    ('wrist_position', np.float32, (3,)),
+    ('arm_basis', np.float32, (3, 3)),
+    ('basis', np.float32, (3, 3)),
+    ('prev_joint', np.float32, (NUM_FINGERS * NUM_BONES, 3)),
+    ('next_joint', np.float32, (NUM_FINGERS * NUM_BONES, 3)),
+    ('bone_basis', np.float32, (NUM_FINGERS * NUM_BONES, 3, 3))])
+
+FRAME_DTYPE = np.dtype([
+    ('id', np.int64),
+    ('timestamp', np.int64),
+    ('hands', np.int8),
+    ('right', HAND_DTYPE),
+    ('left', HAND_DTYPE)])
+
+
+def bone_index(finger_type, bone_type):
+    return finger_type * NUM_BONES + bone_type
+
+
+class RecordedFrame:
+    """Stand-in for a Leap.Frame which was already recorded as snapshot record (i.e. from a raw capture log)"""
+
+    def __init__(self, record):
+        self.record = record
+        self.id = int(record['id'])
+        self.timestamp = int(record['timestamp'])
+        self.is_valid = True
+
+    @staticmethod
+    def invalid():
+        frame = RecordedFrame.__new__(RecordedFrame)
+        frame.record = None
+        frame.id = 0
+        frame.timestamp = 0
+        frame.is_valid = False
+        return frame
+
+
+def has_hand(record, hand):
+    """True if the record contains a valid hand with fingers in the slot of the hand ('right' or 'left')"""
+    hand_record = record[hand]
+    return bool(hand_record['is_' + hand] and hand_record['is_valid'] and hand_record['fingers'] > 0)
+
+
+def snapshot(frame, record=None):
+    """
+    Copy the first right and the first left hand of a Leap.Frame into a FRAME_DTYPE record
+
+    A zero-dimensional record is created if none is given, an existing record (i.e. a slot of a
+    preallocated array) is overwritten.
+    """
+    if record is None:
+        record = np.zeros((), dtype=FRAME_DTYPE)
+
+    if isinstance(frame, RecordedFrame):
+        record[()] = frame.record
+        return record
+
+    record['id'] = frame.id
+    record['timestamp'] = frame.timestamp
+
+    hands = frame.hands
+    record['hands'] = len(hands)
+    record['right'] = np.zeros((), dtype=HAND_DTYPE)
+    record['left'] = np.zeros((), dtype=HAND_DTYPE)
+
+    for hand in hands:
+        side = 'left' if hand.is_left else 'right'
+        if record[side]['is_' + side]:
+            continue
+        _snapshot_hand(hand, record[side])
+    return record
+
+
+def _snapshot_hand(hand, record):
+    record['is_valid'] = hand.is_valid
+    record['is_left'] = hand.is_left
+    record['is_right'] = hand.is_right
+
+    arm = hand.arm
+    record['elbow_position'] = _vector(arm.elbow_position)
+    record['wrist_position'] = _vector(hand.wrist_position)
+    record['arm_basis'] = _basis(arm.basis)
+    record['basis'] = _basis(hand.basis)
+
+    prev_joint = np.zeros((NUM_FINGERS * NUM_BONES, 3), dtype=np.float32)
+    next_joint = np.zeros((NUM_FINGERS * NUM_BONES, 3), dtype=np.float32)
+    bone_basis = np.zeros((NUM_FINGERS * NUM_BONES, 3, 3), dtype=np.float32)
+
+    fingers = hand.fingers
+    record['fingers'] = len(fingers)
+    for finger_type in range(NUM_FINGERS):
+        fingerlist = fingers.finger_type(finger_type)
+        if fingerlist.is_empty:
+            continue
+        finger = fingerlist[0]
+        for bone_type in range(NUM_BONES):
+            bone = finger.bone(bone_type)
+            index = bone_index(finger_type, bone_type)
+            prev_joint[index] = _vector(bone.prev_joint)
+            next_joint[index] = _vector(bone.next_joint)
+            bone_basis[index] = _basis(bone.basis)
+
+    record['prev_joint'] = prev_joint
+    record['next_joint'] = next_joint
+    record['bone_basis'] = bone_basis
+
+
+def _vector(vector):
+    return vector.x, vector.y, vector.z
+
+
+def _basis(basis):
+    x_basis = basis.x_basis
+    y_basis = basis.y_basis
+    z_basis = basis.z_basis
+    return ((x_basis.x, y_basis.x, z_basis.x),
+            (x_basis.y, y_basis.y, z_basis.y),
+            (x_basis.z, y_basis.z, z_basis.z))
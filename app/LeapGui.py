@@ -6,7 +6,8 @@ import LeapRecord
 from AnyPy import AnyPy
 from config.Configuration import env
 from BVHAnimation import bvh_animation
-from resources.pymo.pymo.parsers import BVHParser as Pymo_BVHParser
+from BVHCache import BVHCache
+from MotionFile import MotionFile
 from gooey.gui import application
 from gooey.gui import processor
 from gooey.gui.containers import application as containers_application
@@ -106,6 +107,34 @@ class LeapGui:
                                     }
                                     )
 
+        settings_group.add_argument('hands',
+                                    metavar='Hands',
+                                    action='store',
+                                    default=stored_args.get(ACTION_RECORD, 'hands', 'right'),
+                                    widget='Dropdown',
+                                    help='Right: record the right hand (default)\n'
+                                         'Left: record the left hand (mirrored skeleton)\n'
+                                         'Both: record both hands, every hand is written to its own files',
+                                    choices=['right', 'left', 'both'],
+                                    gooey_options={
+                                        'validator': {
+                                            'test': 'user_input != "Select Option"',
+                                            'message': 'Choose the recorded hands'
+                                        }
+                                    })
+
+        settings_group.add_argument('-poll_frames',
+                                    metavar='Poll frames',
+                                    help='Pull frames from the controller at the selected frame rate\n'
+                                         'instead of receiving every frame from the Leap Motion service',
+                                    action='store_true')
+
+        settings_group.add_argument('-convert_process',
+                                    metavar='Convert in separate process',
+                                    help='Convert the frames in a separate process (shared memory ring buffer)\n'
+                                         'to keep the frame capture free of jitter',
+                                    action='store_true')
+
         settings_group.add_argument('-show_animation',
                                     metavar='Animate',
                                     help='Show motion animation after recording',
@@ -155,6 +184,40 @@ class LeapGui:
                                    }
                                })
 
+        # motion file Group
+        motion_group = record_parser.add_argument_group(
+            "Motion File",
+            gooey_options={
+                'show_border': True,
+                'columns': 1
+            }
+        )
+
+        motion_group.add_argument('-motion',
+                                  metavar='Write motion file',
+                                  help='Binary motion file (skeleton and motion matrix),\n'
+                                       'which loads much faster and is smaller than the BVH file',
+                                  action='store_true')
+
+        motion_group.add_argument('-motion_path',
+                                  metavar='Motion file',
+                                  action='store',
+                                  default=stored_args.get(
+                                      ACTION_RECORD, 'motion_path',
+                                      LeapGui.StoredArgs.path('../output/Motion/RightHand.motion')),
+                                  widget='FileSaver',
+                                  help='Choose location, where to save the motion file')
+
+        motion_group.add_argument('-motion_float64',
+                                  metavar='Full precision',
+                                  help='Store the values as float64 instead of float32',
+                                  action='store_true')
+
+        motion_group.add_argument('-motion_compress',
+                                  metavar='Compress',
+                                  help='Compress the motion matrix (zlib), the file is loaded without memory mapping',
+                                  action='store_true')
+
         # interpol Group
         interpol_group = record_parser.add_argument_group(
             "Interpolation Vector",
@@ -185,6 +248,71 @@ class LeapGui:
                                     widget='DirChooser',
                                     help='Output directory for interpolation files')
 
+        # raw capture Group
+        raw_group = record_parser.add_argument_group(
+            "Raw Capture",
+            gooey_options={
+                'show_border': True,
+                'columns': 1
+            }
+        )
+
+        raw_group.add_argument('-raw_log',
+                               metavar='Write raw capture log',
+                               help='Record the raw hand tracking data of every frame,\n'
+                                    'to convert it again later with other settings',
+                               action='store_true')
+
+        raw_group.add_argument('-raw_log_path',
+                               metavar='Raw capture log',
+                               action='store',
+                               default=stored_args.get(
+                                   ACTION_RECORD, 'raw_log_path', LeapGui.StoredArgs.path('../output/Raw/RightHand.rawlog')),
+                               widget='FileSaver',
+                               help='Choose location, where to save the raw capture log')
+
+        raw_group.add_argument('-replay',
+                               metavar='Replay raw capture log',
+                               help='Convert a raw capture log instead of recording with the Leap Motion Controller',
+                               action='store_true')
+
+        raw_group.add_argument('-replay_path',
+                               metavar='Replay source',
+                               action='store',
+                               default=stored_args.get(
+                                   ACTION_RECORD, 'replay_path', LeapGui.StoredArgs.path('../output/Raw/RightHand.rawlog')),
+                               widget='FileChooser',
+                               help='Choose the raw capture log to be replayed')
+
+        raw_group.add_argument('-replay_realtime',
+                               metavar='Replay in real time',
+                               help='Replay with the timing of the recording instead of as fast as possible',
+                               action='store_true')
+
+        # latency trace Group
+        trace_group = record_parser.add_argument_group(
+            "Latency Trace",
+            gooey_options={
+                'show_border': True,
+                'columns': 1
+            }
+        )
+
+        trace_group.add_argument('-latency_trace',
+                                 metavar='Trace latency',
+                                 help='Trace the latency of every frame from the Leap Motion timestamp\n'
+                                      'to the converted sample and write a summary at the end',
+                                 action='store_true')
+
+        trace_group.add_argument('-latency_trace_path',
+                                 metavar='Latency summary',
+                                 action='store',
+                                 default=stored_args.get(
+                                     ACTION_RECORD, 'latency_trace_path',
+                                     LeapGui.StoredArgs.path('../output/Trace/latency.json')),
+                                 widget='FileSaver',
+                                 help='Choose location, where to save the latency summary (JSON)')
+
         # # c3d Group
         # c3d_group = record_parser.add_argument_group(
         #     "C3D",
@@ -233,13 +361,14 @@ class LeapGui:
                                         action='store_true')
 
         anybody_file_group.add_argument('-any_bvh_file',
-                                        metavar='Source of the *.bvh file',
+                                        metavar='Source of the *.bvh (or *.motion) file',
                                         action='store',
                                         default=stored_args.get(
                                             ACTION_ANYBODY, 'any_bvh_file',
                                             LeapGui.StoredArgs.path('../output/BVH/RightHand.bvh')),
                                         widget='FileChooser',
-                                        help='Choose a bvh file to be converted to the interpolation vector files')
+                                        help='Choose a bvh (or motion) file to be converted to the interpolation '
+                                             'vector files')
 
         anybody_file_group.add_argument('-any_files_dir',
                                         metavar='Source (.any)',
@@ -372,13 +501,13 @@ class LeapGui:
         )
 
         converter_group.add_argument('bvh_file',
-                                     metavar='Source: *.bvh',
+                                     metavar='Source: *.bvh or *.motion',
                                      action='store',
                                      default=stored_args.get(
                                          ACTION_CONVERTER, 'bvh_file',
                                          LeapGui.StoredArgs.path('../output/BVH/RightHand.bvh')),
                                      widget='FileChooser',
-                                     help='Source bvh-file to convert')
+                                     help='Source bvh-file (or motion file) to convert')
 
         # converter_group.add_argument('-any_file',
         #                              metavar='Convert to .any files',
@@ -396,11 +525,16 @@ class LeapGui:
                                      widget='DirChooser',
                                      help='Directory to store the converted files')
 
+        converter_group.add_argument('-motion',
+                                     metavar='Write motion file',
+                                     help='Also write the bvh-file as binary motion file to the target directory',
+                                     action='store_true')
+
         # === bvh animation === #
         animation_parser = subs.add_parser(ACTION_ANIMATION, help='Show an animation for a BVH file')
         animation_group = animation_parser.add_argument_group(
             "Animation",
-            "Select a BVH file to be animated",
+            "Select a BVH (or motion) file to be animated",
             gooey_options={
                 'show_border': True,
                 'columns': 1
@@ -408,7 +542,7 @@ class LeapGui:
         )
 
         animation_group.add_argument('bvh_animation',
-                                     metavar='BVH file path',
+                                     metavar='BVH (or motion) file path',
                                      action='store',
                                      default=stored_args.get(
                                          ACTION_ANIMATION, 'bvh_animation',
@@ -453,12 +587,31 @@ class LeapGui:
                 self.stored_args[args.command] = vars(args)
                 json.dump(self.stored_args, data_file)
 
+    @staticmethod
+    def load_motion(filename):
+        """MocapData of a motion file (*.motion) or of a BVH file (through the BVH cache)"""
+        if MotionFile.is_motion_file(filename):
+            return MotionFile.read(filename)
+        return BVHCache().parse(filename)
+
     @staticmethod
     def run():
         """Open the Gooey GUI and then run the selected action with the chosen arguments"""
         LeapGui.parse_args()
 
         # Record, Anybody, Converter
+        if env.config.command == ACTION_RECORD and env.config.replay:
+            LeapRecord.start_recording()
+            print("End of replay\n")
+
+            if env.config.show_animation:
+                print("Loading the animation ...")
+                p = Process(target=bvh_animation.animate)
+                p.start()
+                # wait for bvh_animation to be closed
+                p.join()
+            return True
+
         if env.config.command == ACTION_RECORD:
             from GuiControl import GuiControl
             gui = GuiControl()
@@ -500,14 +653,22 @@ class LeapGui:
 
         if env.config.command == ACTION_CONVERTER:
             from AnyWriter import AnyWriter
+            bvh_data = LeapGui.load_motion(env.config.bvh_file)
             any_writer = AnyWriter(template_directory='config/anybody_templates/',
-                                   output_directory=env.config.file_dir + '/')
-            any_writer.write(Pymo_BVHParser().parse(env.config.bvh_file))
+                                   output_directory=env.config.file_dir + '/',
+                                   hand=AnyWriter.hand_of(bvh_data))
+            any_writer.write(bvh_data)
+            if env.args('motion') and MotionFile.is_motion_file(env.config.bvh_file):
+                print('The source is already a motion file, no motion file is written')
+            elif env.args('motion'):
+                motion_filename = os.path.splitext(os.path.basename(env.config.bvh_file))[0] + '.motion'
+                MotionFile.write(os.path.join(env.config.file_dir, motion_filename), bvh_data,
+                                 metadata={'source': os.path.normpath(env.config.bvh_file)})
             return True
 
         if env.config.command == ACTION_ANIMATION:
             print("Loading the animation ...")
-            bvh_animation.bvh_data = Pymo_BVHParser().parse(env.config.bvh_animation)
+            bvh_animation.bvh_data = LeapGui.load_motion(env.config.bvh_animation)
             bvh_animation.animate()
 
 
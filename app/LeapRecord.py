@@ -1,12 +1,20 @@
 import sys
 import os
-from collections import deque
+import time
 from threading import Thread
 
 from config.Configuration import env
+from FrameGate import FrameGate
+from FrameQueue import FrameQueue
+from HandPipeline import HandPipeline
+from LatencyTrace import LatencyTrace
+import LeapFrame
+from RawLog import RawLogWriter
+from LeapReplay import ReplayController
 from resources.LeapSDK.v53_python39 import Leap
 from LeapData import LeapData
-from resources.pymo.pymo.writers import BVHWriter as Pymo_BVHWriter
+from MotionFile import MotionFile
+from resources.pymo.pymo.writers import BVHStreamWriter as Pymo_BVHStreamWriter
 # from resources.b3d.bvh_reader import BVH as B3D_BVHReader
 # from resources.b3d.c3d_convertor import Convertor as B3D_C3DWriter
 from AnyWriter import AnyWriter
@@ -14,44 +22,106 @@ from BVHAnimation import bvh_animation
 
 # from resources.virb import Virb
 
-_LEAP_QUEUE = deque()
-
 
 class LeapRecord(Leap.Listener):
-    def __init__(self):
+    def __init__(self, queue_size=256, overflow=FrameQueue.DROP_OLDEST):
         super(LeapRecord, self).__init__()
         # Initialize Leap2DataFrame parser
         self.fps = int(env.config.frames_per_second)
+        # poll_frames = True -> pull frames at the target rate with Controller.frame(history)
+        # poll_frames = False -> receive every frame from the SDK and decimate in on_frame
+        self.poll_frames = True if env.args('poll_frames') else False
+        if self.poll_frames and env.args('replay'):
+            # the replay delivers every frame of the log through on_frame, faster than it could be polled
+            print('-poll_frames is ignored for the replay, the frames are decimated in on_frame')
+            self.poll_frames = False
         basis_setting = True if env.args('anybody_basis') else False
-        self.leap2bvh = LeapData(channel_setting=env.config.channels,
-                                 frame_rate=1 / self.fps,
-                                 anybody_basis=basis_setting)
-
+        # hands = 'both' -> the right and the left hand are recorded, each with its own pipeline and outputs
+        self.hands = list(LeapFrame.HANDS) if env.config.hands == 'both' else [env.config.hands]
+        # decimation to the selected frame rate, the same for received and polled frames
+        self.gate = FrameGate(self.fps, self.hands)
         self.bvh_write = env.config.bvh
+        self.anybody_write = env.config.anybody
+        self.motion_write = env.args('motion')
+        # the motion only has to be kept in memory for the export after recording
+        keep_motion = not self.bvh_write or self.anybody_write or self.motion_write or env.args('show_animation')
+
         if self.bvh_write:
             self.bvh_filename = os.path.normpath(
                 os.path.join(os.path.split(env.config.bvh_path)[0],
                              os.path.split(env.config.bvh_path)[1].replace(".bvh", "") + '.bvh'))
 
+        if self.motion_write:
+            self.motion_filename = os.path.normpath(
+                os.path.join(os.path.split(env.config.motion_path)[0],
+                             os.path.split(env.config.motion_path)[1].replace(".motion", "") + '.motion'))
+            self.motion_metadata = {'frames_per_second': self.fps,
+                                    'anybody_basis': basis_setting,
+                                    'channels': env.config.channels,
+                                    'source': os.path.normpath(env.config.replay_path) if env.args('replay')
+                                    else 'Leap Motion Controller'}
+
         # self.c3d_write = env.config.c3d
         # if self.c3d_write:
         #     self.c3d_filename = env.config.c3d_path + '\\' + env.config.c3d_filename + '.c3d'
 
-        self.anybody_write = env.config.anybody
         if self.anybody_write:
             self.anybody_template_path = env.config.anybody_template_path + '\\'
             self.anybody_output_path = env.config.anybody_output_path + '\\'
 
-        self.processing = True
-        self.t = None
-        self.last_time = 0
+        # raw_log = True -> write the snapshot of every frame from the device (before decimation)
+        self.raw_log = None
+        if env.args('raw_log') and not env.args('replay'):
+            raw_log_filename = os.path.normpath(
+                os.path.join(os.path.split(env.config.raw_log_path)[0],
+                             os.path.split(env.config.raw_log_path)[1].replace(".rawlog", "") + '.rawlog'))
+            self.raw_log = RawLogWriter(raw_log_filename,
+                                        metadata={'frames_per_second': self.fps,
+                                                  'anybody_basis': basis_setting,
+                                                  'channels': env.config.channels,
+                                                  'hands': env.config.hands})
+
+        # latency_trace = True -> trace the latency of every frame, a JSON summary is written at exit
+        self.trace = None
+        if env.args('latency_trace'):
+            self.trace = LatencyTrace()
+            self.trace_filename = os.path.normpath(
+                os.path.join(os.path.split(env.config.latency_trace_path)[0],
+                             os.path.split(env.config.latency_trace_path)[1].replace(".json", "") + '.json'))
+
+        # frames are handed over from the SDK callback thread to the processing thread of every hand
+        # convert_process = True -> to a converter process through a ring buffer in shared memory instead
+        self.pipelines = []
+        for hand in self.hands:
+            leap_data = LeapData(channel_setting=env.config.channels,
+                                 frame_rate=1 / self.fps,
+                                 anybody_basis=basis_setting,
+                                 keep_motion=keep_motion,
+                                 hand=hand)
+            if self.bvh_write:
+                # the BVH file is written while recording
+                leap_data.stream = Pymo_BVHStreamWriter(self._hand_filename(self.bvh_filename, hand))
+            self.pipelines.append(HandPipeline(leap_data, queue_size=queue_size, overflow=overflow,
+                                               convert_process=env.args('convert_process'),
+                                               trace=LatencyTrace() if self.trace else None))
+        self.t_poll = None
 
         # self.garmin = Virb(host=('192.168.137.34', 80))
 
+    def _hand_filename(self, filename, hand):
+        """Every hand is written to its own file, if both hands are recorded (i.e. RightHand_left.bvh)"""
+        if len(self.hands) == 1:
+            return filename
+        root, extension = os.path.splitext(filename)
+        return '{}_{}{}'.format(root, hand, extension)
+
     def on_init(self, controller):
-        self.t = Thread(target=self.process_frame, args=(self,))
         # self.garmin.start_recording()
-        self.t.start()
+        for pipeline in self.pipelines:
+            pipeline.start()
+        if self.poll_frames:
+            self.t_poll = Thread(target=self.poll_frame, args=(self, controller))
+            self.t_poll.start()
         print("Initialized")
 
     def on_connect(self, controller):
@@ -68,40 +138,103 @@ class LeapRecord(Leap.Listener):
         # self.garmin.stop_recording()
 
     def on_frame(self, controller):
+        if self.poll_frames and not self.raw_log:
+            return
+
         # Get the most recent frame
         frame = controller.frame()
-        _LEAP_QUEUE.append(frame)
+        record = None
+        if self.raw_log:
+            record = LeapFrame.snapshot(frame)
+            self.raw_log.write(record)
+
+        if self.poll_frames:
+            return
+        # decimate to the selected frame rate before the frame is queued
+        if not self.gate.due(frame.timestamp):
+            if self.trace:
+                self.trace.discard()
+            return
+        # only a numeric snapshot is queued, the SDK frame is released right away
+        if record is None:
+            record = LeapFrame.snapshot(frame)
+        self.gate.passed(record)
+        if self.trace:
+            self.trace_enqueue(controller, frame)
+        for pipeline in self.pipelines:
+            pipeline.put(record)
         # self.leap2bvh.add_frame(controller.frame())
 
     @staticmethod
-    def process_frame(listener):
-        while listener.processing:
-            try:
-                while True:
-                    frame = _LEAP_QUEUE.popleft()
-                    if frame.timestamp - listener.last_time > int(1000000 / listener.fps):
-                        added_frame = listener.leap2bvh.add_frame(frame)
-                        if added_frame:
-                            # print(added_frame.timestamp - listener.last_time)
-                            listener.last_time = added_frame.timestamp
-            except IndexError:
-                pass
+    def poll_frame(listener, controller):
+        """Pull frames from the controller at the selected frame rate instead of receiving every frame"""
+        next_poll = time.perf_counter()
+        while not listener.pipelines[0].closed:
+            next_poll += listener.gate.frame_interval / 1000000
+            time.sleep(max(0.0, next_poll - time.perf_counter()))
+
+            frame = listener.gate.history_frame(controller)
+            if frame:
+                record = LeapFrame.snapshot(frame)
+                listener.gate.passed(record)
+                if listener.trace:
+                    if len(listener.trace.enqueued):
+                        # the frames between two polled frames are skipped because of the frame rate
+                        listener.trace.discard(frame.id - int(listener.trace.enqueued['id'][-1]) - 1)
+                    listener.trace_enqueue(controller, frame)
+                for pipeline in listener.pipelines:
+                    pipeline.put(record)
+
+    def trace_enqueue(self, controller, frame):
+        depth = max(len(pipeline.frame_queue) for pipeline in self.pipelines)
+        self.trace.enqueue(frame.id, frame.timestamp, controller.now(), depth)
 
     def exit(self):
-        self.processing = False
-        self.t.join()
+        # the pipelines drain their queues concurrently
+        for pipeline in self.pipelines:
+            pipeline.close()
+        if self.t_poll:
+            self.t_poll.join()
+        for pipeline in self.pipelines:
+            pipeline.finish()
+        if self.raw_log:
+            self.raw_log.close()
+        for pipeline in self.pipelines:
+            print("Frames processed ({} hand): {}, dropped: {}".format(
+                pipeline.hand, pipeline.frame_queue.processed, pipeline.frame_queue.dropped))
+        if self.trace:
+            for pipeline in self.pipelines:
+                self.trace.merge(pipeline.trace)
+            self.trace.write(self.trace_filename)
         self.exit_actions()
 
     def exit_actions(self):
-        bvh_data = self.leap2bvh.parse()
-
+        # the streams are already closed, if the frames were converted in a separate process
         if self.bvh_write:
-            bvh_writer = Pymo_BVHWriter()
-            bvh_file = open(self.bvh_filename, 'w')
-            bvh_writer.write(bvh_data, bvh_file)
-            bvh_file.close()
-            print('"{}" written'.format(bvh_file.name))
+            for pipeline in self.pipelines:
+                stream = pipeline.leap_data.stream
+                stream.close()
+                if stream.frames:
+                    print('"{}" written ({} frames)'.format(stream.filename, stream.frames))
 
+        recorded = [pipeline for pipeline in self.pipelines if pipeline.leap_data.first_frame is not None]
+        animation_data = None
+        for pipeline in self.pipelines:
+            if recorded and pipeline not in recorded:
+                print("-- No data was recorded for the {} hand. --".format(pipeline.hand))
+                continue
+            bvh_data = pipeline.leap_data.parse()
+            if not pipeline.leap_data.keep_motion:
+                continue
+            self._export(bvh_data, pipeline.hand)
+            # the animation shows the first recorded hand
+            if animation_data is None:
+                animation_data = bvh_data
+
+        if animation_data is not None:
+            bvh_animation.bvh_data = animation_data
+
+    def _export(self, bvh_data, hand):
         # if self.c3d_write:
         #     # workaround, need bvh
         #     bvh_writer = Pymo_BVHWriter()
@@ -121,27 +254,45 @@ class LeapRecord(Leap.Listener):
         #     os.remove(bvh_file.name)
         #     print('"{}" deleted'.format(bvh_file.name))
 
+        if self.motion_write:
+            MotionFile.write(self._hand_filename(self.motion_filename, hand), bvh_data,
+                             dtype='float64' if env.args('motion_float64') else 'float32',
+                             compress=env.args('motion_compress'),
+                             metadata=dict(self.motion_metadata, hand=hand))
+
         if self.anybody_write:
+            # every hand is written to its own subdirectory, if both hands are recorded
+            anybody_output_path = self.anybody_output_path
+            if len(self.hands) > 1:
+                anybody_output_path = os.path.join(anybody_output_path, hand) + '\\'
+                os.makedirs(anybody_output_path, exist_ok=True)
             AnyWriter(template_directory=self.anybody_template_path,
-                      output_directory=self.anybody_output_path
+                      output_directory=anybody_output_path,
+                      hand=hand
                       ).write(bvh_data)
-            print('Anybody files written to "{}"'.format(self.anybody_output_path))
-
-        bvh_animation.bvh_data = bvh_data
+            print('Anybody files written to "{}"'.format(anybody_output_path))
 
 
 def start_recording():
     # Create a listener and controller
-    listener = LeapRecord()
-    controller = Leap.Controller()
-   
+    if env.args('replay'):
+        # replay a raw capture log, no frame may be dropped
+        listener = LeapRecord(overflow=FrameQueue.BLOCK)
+        controller = ReplayController(env.config.replay_path, realtime=env.args('replay_realtime'))
+    else:
+        listener = LeapRecord()
+        controller = Leap.Controller()
+
     # Have the listener receive events from the controller
     controller.add_listener(listener)
 
-    # Keep this process running until Enter is pressed
+    # Keep this process running until Enter is pressed (or the replay is finished)
     print("Listener added")
     try:
-        sys.stdin.readline()
+        if isinstance(controller, ReplayController):
+            controller.wait()
+        else:
+            sys.stdin.readline()
     except KeyboardInterrupt:
         pass
     finally:
@@ -0,0 +1,81 @@
+import time
+from threading import Event, Thread
+
+from LeapFrame import RecordedFrame
+from RawLog import RawLogReader
+
+
+class ReplayController:
+    """
+    Stand-in for Leap.Controller, which replays the frames of a raw capture log (see RawLog)
+
+    The listener callbacks (on_init, on_connect, on_frame, on_exit) are dispatched like from the SDK.
+    realtime = False -> the frames are replayed as fast as the listener accepts them
+    realtime = True -> the frames are replayed with the time deltas of the recording
+    """
+
+    # the SDK keeps a history of 60 frames
+    HISTORY = 60
+
+    def __init__(self, filename, realtime=False):
+        self.raw_log = RawLogReader(filename)
+        self.realtime = realtime
+        self.is_connected = True
+
+        self._index = -1
+        self._listener = None
+        self._thread = None
+        self._stop = Event()
+        self.finished = Event()
+
+    def add_listener(self, listener):
+        self._listener = listener
+        listener.on_init(self)
+        listener.on_connect(self)
+        self._thread = Thread(target=self._replay)
+        self._thread.start()
+        return True
+
+    def remove_listener(self, listener):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        listener.on_exit(self)
+        self._listener = None
+        return True
+
+    def wait(self, timeout=None):
+        """Wait until all frames were replayed"""
+        return self.finished.wait(timeout)
+
+    def frame(self, history=0):
+        index = self._index - history
+        if index < 0 or history >= ReplayController.HISTORY:
+            return RecordedFrame.invalid()
+        return RecordedFrame(self.raw_log[index])
+
+    def now(self):
+        """Current time in the clock of the recording (Leap Motion timestamps in microseconds)"""
+        if self._index < 0:
+            return 0
+        return int(self.raw_log[self._index]['timestamp'])
+
+    def _replay(self):
+        frames = self.raw_log.frames
+        start_time = time.perf_counter()
+        first_timestamp = int(frames[0]['timestamp']) if len(frames) else 0
+
+        for index in range(len(frames)):
+            if self._stop.is_set():
+                break
+            if self.realtime:
+                delay = (int(frames[index]['timestamp']) - first_timestamp) / 1000000 \
+                        - (time.perf_counter() - start_time)
+                if delay > 0:
+                    self._stop.wait(delay)
+            self._index = index
+            self._listener.on_frame(self)
+
+        print('Replay finished ({} of {} frames, {:.2f} s)'.format(
+            self._index + 1, len(frames), time.perf_counter() - start_time))
+        self.finished.set()
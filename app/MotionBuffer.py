@@ -0,0 +1,46 @@
+import numpy as np
+
+
+class MotionBuffer:
+    """
+    Growable, columnar buffer for the motion data of a recording
+
+    Holds one row of channel values (float64) and one timestamp per frame, the capacity is doubled
+    when the buffer is full. values and timestamps return views without copying the data.
+    """
+
+    def __init__(self, channels, capacity=1024):
+        self.channels = channels
+        self._size = 0
+        self._values = np.empty((capacity, channels), dtype=np.float64)
+        self._timestamps = np.empty(capacity, dtype=np.int64)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def values(self):
+        return self._values[:self._size]
+
+    @property
+    def timestamps(self):
+        return self._timestamps[:self._size]
+
+    def append(self, timestamp, values):
+        if self._size == self._values.shape[0]:
+            self._grow()
+        self._values[self._size] = values
+        self._timestamps[self._size] = timestamp
+        self._size += 1
+
+    def clear(self):
+        self._size = 0
+
+    def _grow(self):
+        capacity = max(1, 2 * self._values.shape[0])
+        values = np.empty((capacity, self.channels), dtype=np.float64)
+        values[:self._size] = self._values[:self._size]
+        timestamps = np.empty(capacity, dtype=np.int64)
+        timestamps[:self._size] = self._timestamps[:self._size]
+        self._values = values
+        self._timestamps = timestamps
@@ -0,0 +1,137 @@
+import datetime
+import json
+import os
+import struct
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from resources.pymo.pymo.data import MocapData
+
+# File layout of a motion file:
+#   MAGIC (8 bytes) | version (uint32) | header size (uint32) | JSON header, padded to the header size
+#   followed by the time of every frame (int64 ns, little-endian) and the motion matrix (frames x channels,
+#   little-endian float32 or float64), each aligned to 64 bytes. With compression, the motion matrix is stored
+#   as zlib compressed chunks of rows (offsets and sizes in the header).
+MAGIC = b'ROSEMOT\x00'
+VERSION = 1
+EXTENSION = '.motion'
+_PREFIX = struct.Struct('<8sII')
+_ALIGNMENT = 64
+
+
+class MotionFile:
+    """
+    Binary export and import of the motion (MocapData), with skeleton, channels and metadata in a JSON header
+
+    Uncompressed motion files are loaded through numpy.memmap without copying (copy-on-write),
+    so they open in constant time, independent of the length of the recording.
+    """
+
+    @staticmethod
+    def write(filename, data, dtype='float32', compress=False, metadata=None, chunk_frames=4096):
+        dtype = np.dtype(dtype).newbyteorder('<')
+        motion = np.ascontiguousarray(data.motion, dtype=dtype)
+        frame_times = np.asarray(data.time_index).astype('timedelta64[ns]').astype('<i8')
+
+        time_size = MotionFile._aligned(frame_times.nbytes)
+        chunks = []
+        if compress:
+            blocks = [zlib.compress(motion[start:start + chunk_frames].tobytes())
+                      for start in range(0, len(motion), chunk_frames)]
+            offset = time_size
+            for block in blocks:
+                chunks.append([offset, len(block)])
+                offset += len(block)
+
+        header = {'version': VERSION,
+                  'created': datetime.datetime.today().strftime('%Y-%m-%d %H:%M:%S'),
+                  'frames': len(motion),
+                  'dtype': dtype.str,
+                  'skeleton': data.skeleton,
+                  'channel_names': data.channel_names,
+                  'columns': data.columns,
+                  'root_name': data.root_name,
+                  'framerate': data.framerate,
+                  'compression': 'zlib' if compress else None,
+                  'chunk_frames': chunk_frames if compress else None,
+                  'chunks': chunks,
+                  'metadata': metadata or {}}
+        header_bytes = json.dumps(header).encode('utf-8')
+        header_size = MotionFile._aligned(_PREFIX.size + len(header_bytes))
+
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(filename, 'wb') as f:
+            f.write(_PREFIX.pack(MAGIC, VERSION, header_size))
+            f.write(header_bytes.ljust(header_size - _PREFIX.size, b' '))
+            f.write(frame_times.tobytes().ljust(time_size, b'\x00'))
+            if compress:
+                for block in blocks:
+                    f.write(block)
+            else:
+                f.write(motion.tobytes())
+        print('"{}" written ({} frames)'.format(os.path.normpath(filename), len(motion)))
+
+    @staticmethod
+    def is_motion_file(filename):
+        return os.path.splitext(filename)[1].lower() == EXTENSION
+
+    @staticmethod
+    def read_header(filename):
+        """Returns the JSON header (skeleton, channels, metadata) without loading the motion"""
+        with open(filename, 'rb') as f:
+            return MotionFile._read_header(f, filename)[1]
+
+    @staticmethod
+    def read(filename):
+        """Returns the MocapData of the motion file"""
+        with open(filename, 'rb') as f:
+            header_size, header = MotionFile._read_header(f, filename)
+
+            frames = header['frames']
+            columns = header['columns']
+            dtype = np.dtype(header['dtype'])
+            if frames == 0:
+                frame_times = np.zeros(0, dtype='<i8')
+                motion = np.zeros((0, len(columns)), dtype=dtype)
+            elif header['compression'] == 'zlib':
+                frame_times = np.memmap(f, dtype='<i8', mode='c', offset=header_size, shape=(frames,))
+                motion = np.empty((frames, len(columns)), dtype=dtype)
+                start = 0
+                for offset, size in header['chunks']:
+                    f.seek(header_size + offset)
+                    block = np.frombuffer(zlib.decompress(f.read(size)), dtype=dtype).reshape(-1, len(columns))
+                    motion[start:start + len(block)] = block
+                    start += len(block)
+            else:
+                frame_times = np.memmap(f, dtype='<i8', mode='c', offset=header_size, shape=(frames,))
+                motion = np.memmap(f, dtype=dtype, mode='c', shape=(frames, len(columns)),
+                                   offset=header_size + MotionFile._aligned(frame_times.nbytes))
+
+        data = MocapData()
+        data.skeleton = header['skeleton']
+        data.channel_names = [tuple(channel) for channel in header['channel_names']]
+        data.root_name = header['root_name']
+        data.framerate = header['framerate']
+        data.set_motion(motion, pd.to_timedelta(frame_times, unit='ns'), columns)
+        return data
+
+    @staticmethod
+    def _read_header(f, filename):
+        prefix = f.read(_PREFIX.size)
+        if len(prefix) < _PREFIX.size:
+            raise ValueError('"{}" is not a motion file'.format(filename))
+        magic, version, header_size = _PREFIX.unpack(prefix)
+        if magic != MAGIC:
+            raise ValueError('"{}" is not a motion file'.format(filename))
+        if version != VERSION:
+            raise ValueError('Motion file version {} is not supported (expected version {})'
+                             .format(version, VERSION))
+        return header_size, json.loads(f.read(header_size - _PREFIX.size).decode('utf-8'))
+
+    @staticmethod
+    def _aligned(size):
+        return size + -size % _ALIGNMENT
@@ -0,0 +1,141 @@
+import datetime
+import json
+import os
+import struct
+
+import numpy as np
+
+from LeapFrame import FRAME_DTYPE, HAND_DTYPE
+
+# File layout of a raw capture log:
+#   MAGIC (8 bytes) | version (uint32) | header size (uint32) | JSON header, padded to the header size
+#   followed by fixed-size frame records (FRAME_DTYPE, little-endian), appended while recording
+MAGIC = b'ROSERAW\x00'
+# version 2: frame records with a slot for the right and the left hand
+VERSION = 2
+_PREFIX = struct.Struct('<8sII')
+_ALIGNMENT = 64
+# version 1: frame records with the first hand of the frame (recorded right hand)
+_V1_FRAME_DTYPE = np.dtype([
+    ('id', np.int64),
+    ('timestamp', np.int64),
+    ('hands', np.int8),
+    ('hand', HAND_DTYPE)])
+# number of version 1 records converted at once while iterating
+_V1_CHUNK_SIZE = 4096
+
+
+class RawLogWriter:
+    """Append-only writer for the raw hand tracking data (snapshot records, see LeapFrame)"""
+
+    def __init__(self, filename, metadata=None, buffer_size=1 << 20):
+        self.filename = filename
+        self.frames = 0
+
+        header = {'version': VERSION,
+                  'created': datetime.datetime.today().strftime('%Y-%m-%d %H:%M:%S'),
+                  'dtype': FRAME_DTYPE.newbyteorder('<').descr,
+                  'record_size': FRAME_DTYPE.itemsize,
+                  'metadata': metadata or {}}
+        header_bytes = json.dumps(header).encode('utf-8')
+        header_size = _PREFIX.size + len(header_bytes)
+        header_size += -header_size % _ALIGNMENT
+        header_bytes = header_bytes.ljust(header_size - _PREFIX.size, b' ')
+
+        self._file = open(filename, 'wb', buffering=buffer_size)
+        self._file.write(_PREFIX.pack(MAGIC, VERSION, header_size))
+        self._file.write(header_bytes)
+
+    def write(self, record):
+        if self._file is None:
+            return
+        self._file.write(record.astype(FRAME_DTYPE.newbyteorder('<'), copy=False).tobytes())
+        self.frames += 1
+
+    def close(self):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        print('"{}" written ({} frames)'.format(os.path.normpath(self.filename), self.frames))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class RawLogReader:
+    """
+    Read a raw capture log through numpy.memmap, the frames are only loaded from disk when accessed
+
+    An incomplete last record (i.e. from an interrupted recording) is ignored.
+    The records of version 1 logs are converted to the current layout when accessed,
+    the recorded hand is put into the slot of the right hand.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+
+        with open(filename, 'rb') as f:
+            prefix = f.read(_PREFIX.size)
+            if len(prefix) < _PREFIX.size:
+                raise ValueError('"{}" is not a raw capture log'.format(filename))
+            magic, version, header_size = _PREFIX.unpack(prefix)
+            if magic != MAGIC:
+                raise ValueError('"{}" is not a raw capture log'.format(filename))
+            if version not in (1, VERSION):
+                raise ValueError('Raw capture log version {} is not supported (expected version {})'
+                                 .format(version, VERSION))
+            self.header = json.loads(f.read(header_size - _PREFIX.size).decode('utf-8'))
+
+        self.version = version
+        self.metadata = self.header['metadata']
+        self.dtype = np.dtype(RawLogReader._descr(self.header['dtype']))
+        if self.dtype != (FRAME_DTYPE if version == VERSION else _V1_FRAME_DTYPE).newbyteorder('<'):
+            raise ValueError('The record layout of "{}" does not match this version of RoSeMotion'.format(filename))
+
+        count = (os.path.getsize(filename) - header_size) // self.dtype.itemsize
+        if count > 0:
+            self.frames = np.memmap(filename, dtype=self.dtype, mode='r', offset=header_size, shape=(count,))
+        else:
+            self.frames = np.zeros(0, dtype=self.dtype)
+
+    def __len__(self):
+        return self.frames.shape[0]
+
+    def __getitem__(self, index):
+        if self.version == 1:
+            return RawLogReader._upgrade(self.frames[index])
+        return self.frames[index]
+
+    def __iter__(self):
+        if self.version == 1:
+            for start in range(0, len(self), _V1_CHUNK_SIZE):
+                yield from RawLogReader._upgrade(self.frames[start:start + _V1_CHUNK_SIZE])
+            return
+        yield from self.frames
+
+    @staticmethod
+    def _upgrade(records):
+        """Version 1 records (single hand) as FRAME_DTYPE records with the hand in the right slot"""
+        upgraded = np.zeros(np.shape(records), dtype=FRAME_DTYPE)
+        upgraded['id'] = records['id']
+        upgraded['timestamp'] = records['timestamp']
+        upgraded['hands'] = records['hands']
+        upgraded['right'] = records['hand']
+        return upgraded
+
+    @staticmethod
+    def _descr(descr):
+        """JSON turns the tuples of a numpy dtype description into lists, convert them back"""
+        if isinstance(descr, list) and descr and isinstance(descr[0], list):
+            return [RawLogReader._field(field) for field in descr]
+        return descr
+
+    @staticmethod
+    def _field(field):
+        field = [RawLogReader._descr(item) if isinstance(item, list) and item and isinstance(item[0], list)
+                 else tuple(item) if isinstance(item, list) else item for item in field]
+        return tuple(field)
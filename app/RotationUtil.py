@@ -1,7 +1,21 @@
 import numpy as np
 import math
 
-from resources.LeapSDK.v53_python39 import Leap
+# values of Leap.EPSILON and Leap.RAD_TO_DEG (single precision constants of the Leap Motion SDK),
+# the rotations do not depend on the SDK
+EPSILON = 1.1920928955078125e-07
+RAD_TO_DEG = 57.295780181884766
+
+##############
+#  i, j, k, n for all six rotation orders
+#  n = parity of axis permutation (even=False, odd=True)
+##############
+ORDERS = {'XYZ': [0, 1, 2, False],
+          'XZY': [0, 2, 1, True],
+          'YXZ': [1, 0, 2, True],
+          'YZX': [1, 2, 0, False],
+          'ZXY': [2, 0, 1, False],
+          'ZYX': [2, 1, 0, True]}
 
 
 def get_order():
@@ -39,7 +53,7 @@ def _rot2eulsimple(rotmat):
     return eul
 
 
-def _rot2eul(rotmat):
+def _rot2eul(rotmat, order=None):
     ##############
     #  i, j, k, n
     #  n = parity of axis permutation (even=False, odd=True)
@@ -53,7 +67,8 @@ def _rot2eul(rotmat):
     # order = [2, 0, 1, False]  # ZXY
     # order = [2, 1, 0, True] # ZYX
 
-    order = get_order()
+    if order is None:
+        order = get_order()
 
     i = int(order[2])
     j = int(order[1])
@@ -65,7 +80,7 @@ def _rot2eul(rotmat):
 
     cy = np.hypot(rotmat[i, i], rotmat[i, j])
 
-    if cy > Leap.EPSILON:
+    if cy > EPSILON:
         eul1[i] = math.atan2(rotmat[j, k], rotmat[k, k])
         eul1[j] = math.atan2(-rotmat[i, k], cy)
         eul1[k] = math.atan2(rotmat[i, j], rotmat[i, i])
@@ -92,6 +107,48 @@ def _rot2eul(rotmat):
     return eul1
 
 
+def rot2eul_array(rotmats, order=None):
+    """
+    Vectorized version of _rot2eul for a stack of rotation matrices, shape (..., 3, 3) -> (..., 3)
+
+    order: any rotation order of ORDERS, default get_order()
+    """
+    if order is None:
+        order = get_order()
+
+    i = int(order[2])
+    j = int(order[1])
+    k = int(order[0])
+    parity = order[3]
+
+    rotmats = np.asarray(rotmats, dtype=np.float64)
+    eul1 = np.zeros(rotmats.shape[:-2] + (3,))
+    eul2 = np.zeros(rotmats.shape[:-2] + (3,))
+
+    cy = np.hypot(rotmats[..., i, i], rotmats[..., i, j])
+    # gimbal lock, if not regular
+    regular = cy > EPSILON
+
+    eul1[..., i] = np.where(regular,
+                            np.arctan2(rotmats[..., j, k], rotmats[..., k, k]),
+                            np.arctan2(-rotmats[..., k, j], rotmats[..., j, j]))
+    eul1[..., j] = np.arctan2(-rotmats[..., i, k], cy)
+    eul1[..., k] = np.where(regular, np.arctan2(rotmats[..., i, j], rotmats[..., i, i]), 0.0)
+
+    eul2[..., i] = np.where(regular, np.arctan2(-rotmats[..., j, k], -rotmats[..., k, k]), eul1[..., i])
+    eul2[..., j] = np.where(regular, np.arctan2(-rotmats[..., i, k], -cy), eul1[..., j])
+    eul2[..., k] = np.where(regular, np.arctan2(-rotmats[..., i, j], -rotmats[..., i, i]), eul1[..., k])
+
+    #  parity of axis permutation (even=False, odd=True)
+    if not parity:
+        eul1 = np.negative(eul1)
+        eul2 = np.negative(eul2)
+
+    # return best, which is just the one with lowest values in it
+    use_eul2 = np.sum(np.absolute(eul1), axis=-1) > np.sum(np.absolute(eul2), axis=-1)
+    return np.where(use_eul2[..., np.newaxis], eul2, eul1)
+
+
 def quat2mat(quat):
     q0 = math.sqrt(2) * quat[0]
     q1 = math.sqrt(2) * quat[1]
@@ -133,9 +190,9 @@ def vec2quat(v1, v2):
 
     dot_p = np.dot(a, b)
 
-    if dot_p < -1 + Leap.EPSILON:
+    if dot_p < -1 + EPSILON:
         tmpvec3 = np.cross(xUnitVec, a)
-        if np.linalg.norm(tmpvec3) < Leap.EPSILON:
+        if np.linalg.norm(tmpvec3) < EPSILON:
             tmpvec3 = np.cross(yUnitVec, a)
         tmpvec3 = np.divide(tmpvec3, np.linalg.norm(tmpvec3))
 
@@ -148,7 +205,7 @@ def vec2quat(v1, v2):
         q[3] = tmpvec3[2]*s
         return q
 
-    if dot_p > 1 - Leap.EPSILON:
+    if dot_p > 1 - EPSILON:
         return np.array([0, 0, 0, 1])
 
     tmpvec3 = np.cross(a, b)
@@ -160,7 +217,7 @@ def rot2quat(rotmat):
     q = np.zeros(4)
 
     tr = 0.25 * (1 + np.trace(rotmat))
-    if tr > Leap.EPSILON:
+    if tr > EPSILON:
         s = np.sqrt(tr)
         q[0] = s
         s = 1.0 / (4.0 * s)
@@ -232,8 +289,8 @@ def vec2eul(v1, v2):
     return euler[0], euler[1], euler[2]
 
 
-def rot2eul(rotmat):
-    euler = _rot2eul(rotmat)
+def rot2eul(rotmat, order=None):
+    euler = _rot2eul(rotmat, order)
     return euler[0], euler[1], euler[2]
 
 
@@ -0,0 +1,120 @@
+import re
+
+import numpy as np
+
+from LeapFrame import FINGER_TYPE, NUM_BONES, NUM_FINGERS, bone_index
+
+# kinds of channels, column in the (joints, 6) array of positions and rotations of a frame
+CHANNEL_KIND = {'Xposition': 0, 'Yposition': 1, 'Zposition': 2,
+                'Xrotation': 3, 'Yrotation': 4, 'Zrotation': 5}
+
+# layout of the stacked points of a hand (see LeapData._get_points):
+# origin, elbow, wrist, prev_joint of the finger bones, next_joint of the finger bones
+POINT_ORIGIN = 0
+POINT_ELBOW = 1
+POINT_WRIST = 2
+POINT_PREV_JOINT = 3
+POINT_NEXT_JOINT = POINT_PREV_JOINT + NUM_FINGERS * NUM_BONES
+
+# layout of the stacked bases of a hand (see LeapData._get_bases):
+# root (identity), arm, hand, finger bones
+BASIS_ROOT = 0
+BASIS_ARM = 1
+BASIS_HAND = 2
+BASIS_BONE = 3
+
+_JOINT_PATTERN = re.compile(r'^(Right|Left)Hand(Thumb|Index|Middle|Ring|Pinky)(\d)(_Nub)?$')
+
+
+class JointTable:
+    """
+    Compiled lookup table of a skeleton (see config.Skeleton)
+
+    The joints are numbered in the order of the skeleton dict, all lookups by joint name are resolved
+    once, so that the per-frame code only indexes arrays:
+    parent           index of the parent joint (-1 for the root)
+    offset_head/tail the offset is points[offset_head] - points[offset_tail] (see POINT_*)
+    basis_index      index of the basis in the stacked bases (see BASIS_*)
+    parent_basis_index
+                     index of the basis of the parent joint
+    rotation_mask    joints with a rotation (not the root and not the finger tips)
+    channel_joint/channel_kind
+                     joint and kind of channel (see CHANNEL_KIND) of every motion channel (column)
+    """
+
+    def __init__(self, skeleton, root_name):
+        self.root_name = root_name
+        self.names = tuple(skeleton)
+        self.index = {joint_name: joint_index for joint_index, joint_name in enumerate(self.names)}
+
+        count = len(self.names)
+        self.parent = np.full(count, -1, dtype=np.intp)
+        self.offset_head = np.zeros(count, dtype=np.intp)
+        self.offset_tail = np.zeros(count, dtype=np.intp)
+        self.basis_index = np.zeros(count, dtype=np.intp)
+        self.rotation_mask = np.zeros(count, dtype=bool)
+
+        channel_joint = []
+        channel_kind = []
+        self.channel_names = []
+
+        for joint_index, joint_name in enumerate(self.names):
+            joint = skeleton[joint_name]
+            if joint['parent'] is not None:
+                self.parent[joint_index] = self.index[joint['parent']]
+            self.rotation_mask[joint_index] = joint_name != root_name and bool(joint['children'])
+            self._compile_joint(joint_index, joint_name)
+
+            for channel in joint.get('channels', []):
+                channel_joint.append(joint_index)
+                channel_kind.append(CHANNEL_KIND[channel])
+                self.channel_names.append((joint_name, channel))
+
+        self.channel_joint = np.array(channel_joint, dtype=np.intp)
+        self.channel_kind = np.array(channel_kind, dtype=np.intp)
+        self.parent_basis_index = np.where(self.parent >= 0, self.basis_index[self.parent], BASIS_ROOT)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _compile_joint(self, joint_index, joint_name):
+        if joint_name == self.root_name:
+            self.offset_head[joint_index] = self.offset_tail[joint_index] = POINT_ORIGIN
+            self.basis_index[joint_index] = BASIS_ROOT
+            return
+
+        if joint_name.endswith('Elbow'):
+            self.offset_head[joint_index], self.offset_tail[joint_index] = POINT_ELBOW, POINT_ORIGIN
+            self.basis_index[joint_index] = BASIS_ARM
+            return
+
+        match = _JOINT_PATTERN.match(joint_name)
+        if not match:
+            if joint_name.endswith('Hand'):
+                self.offset_head[joint_index], self.offset_tail[joint_index] = POINT_WRIST, POINT_ELBOW
+                self.basis_index[joint_index] = BASIS_HAND
+                return
+            raise Exception('Key ({}) did not match'.format(joint_name))
+
+        finger, bone_number, nub = match.group(2), int(match.group(3)), match.group(4)
+        # finger tips are numbered like the last bone, but end after it
+        if nub:
+            bone_number += 1
+        if not 1 <= bone_number <= NUM_BONES + 1:
+            raise Exception('bone number ({}) did not match'.format(bone_number))
+
+        finger_type = FINGER_TYPE[finger]
+
+        # joint 1 (thumb: 2) is at the start of its bone, the offset is the vector from the wrist (length of carpals)
+        if bone_number == 1 or (finger == 'Thumb' and bone_number == 2):
+            bone = bone_index(finger_type, bone_number - 1)
+            self.offset_head[joint_index], self.offset_tail[joint_index] = POINT_PREV_JOINT + bone, POINT_WRIST
+        # else the offset is the previous bone (metacarpal, proximal, intermediate, distal)
+        else:
+            bone = bone_index(finger_type, bone_number - 2)
+            self.offset_head[joint_index], self.offset_tail[joint_index] = \
+                POINT_NEXT_JOINT + bone, POINT_PREV_JOINT + bone
+
+        # the finger tips have no basis (no rotation)
+        if bone_number <= NUM_BONES:
+            self.basis_index[joint_index] = BASIS_BONE + bone_index(finger_type, bone_number - 1)
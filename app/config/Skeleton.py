@@ -1,11 +1,16 @@
 class Skeleton:
-    def __init__(self, channel_setting):
+    def __init__(self, channel_setting, hand='right'):
         if channel_setting not in ('rotation', 'position'):
             raise ValueError('Choose a correct channel setting:\n'
                              '-> "rotation" for using only Xrotation, Yrotation and Zrotation\n'
                              '-> "position" for using Xposition, Yposition, Zposition'
                              ' and Xrotation, Yrotation, Zrotation for all joints')
         self.channel_setting = channel_setting
+        if hand not in ('right', 'left'):
+            raise ValueError('Choose a correct hand:\n'
+                             '-> "right" for the skeleton of the right hand\n'
+                             '-> "left" for the (mirrored) skeleton of the left hand')
+        self.hand = hand
 
         self.root_name = 'Leap_Root'
         self.skeleton = \
@@ -36,3 +41,17 @@ class Skeleton:
              'RightHandThumb3': {'channels': [], 'children': ['RightHandThumb4'], 'parent': 'RightHandThumb2'},
              'RightHandThumb4': {'channels': [], 'children': ['RightHandThumb4_Nub'], 'parent': 'RightHandThumb3'},
              'RightHandThumb4_Nub': {'channels': [], 'children': [], 'parent': 'RightHandThumb4'}}
+
+        if hand == 'left':
+            self.skeleton = Skeleton._mirror(self.skeleton)
+
+    @staticmethod
+    def _mirror(skeleton):
+        """Skeleton of the left hand, the joints are named Left... instead of Right..."""
+        def left(joint_name):
+            return None if joint_name is None else joint_name.replace('Right', 'Left', 1)
+
+        return {left(joint_name): {'channels': list(joint['channels']),
+                                   'children': [left(child) for child in joint['children']],
+                                   'parent': left(joint['parent'])}
+                for joint_name, joint in skeleton.items()}
@@ -6,30 +6,235 @@ class Joint():
         self.parent = parent
         self.children = children
 
+class SkeletonTopology():
+    '''
+    Immutable compiled topology of a skeleton, shared by a MocapData and its clones until the skeleton of one
+    of them is changed (see MocapData.topology)
+
+    The joints are numbered in topological order (the order of MocapData.traverse, every parent
+    before its children), all lookups by joint name are resolved once:
+    joints      joint names by joint id
+    index       joint id of every joint name
+    parents     id of the parent joint (-1 for the root)
+    children    ids of the children of every joint, in the order of the skeleton
+    depths      depth of every joint (0 for the root)
+    levels      ids of the joints of every depth, the joints of a level only depend on the levels above
+    end_sites   joints without children (End Site)
+    offsets     (joints, 3) offsets to the parent joint
+    channels    channel names of every joint
+    The arrays are read-only.
+    '''
+    def __init__(self, skeleton, root_name):
+        joints = []
+        stack = [root_name]
+        while stack:
+            joint = stack.pop()
+            joints.append(joint)
+            stack.extend(skeleton[joint]['children'])
+        index = {joint: i for i, joint in enumerate(joints)}
+
+        parents = np.array([index[skeleton[joint]['parent']] if joint != root_name else -1 for joint in joints],
+                           dtype=np.intp)
+        depths = np.zeros(len(joints), dtype=np.intp)
+        for i in range(1, len(joints)):
+            depths[i] = depths[parents[i]] + 1
+        offsets = np.array([skeleton[joint].get('offsets', (0, 0, 0)) for joint in joints],
+                           dtype=np.float64).reshape(-1, 3)
+
+        self._set('root_name', root_name)
+        self._set('joints', tuple(joints))
+        self._set('index', index)
+        self._set('parents', parents)
+        self._set('children', tuple(tuple(index[c] for c in skeleton[joint]['children']) for joint in joints))
+        self._set('depths', depths)
+        self._set('levels', tuple(np.flatnonzero(depths == depth) for depth in range(depths.max(initial=-1) + 1)))
+        self._set('end_sites', np.array([not skeleton[joint]['children'] for joint in joints], dtype=bool))
+        self._set('offsets', offsets)
+        self._set('channels', tuple(tuple(skeleton[joint].get('channels', ())) for joint in joints))
+        for array in (parents, depths, offsets, self.end_sites) + self.levels:
+            array.setflags(write=False)
+
+    def _set(self, name, value):
+        object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('SkeletonTopology is immutable')
+
+    def __len__(self):
+        return len(self.joints)
+
+
 class MocapData():
+    '''
+    Skeleton and motion of a recording
+
+    The motion is held as contiguous (frames, channels) array (motion) with the column of every
+    (joint, channel) in channel_index, joint_values() returns the (frames, n) values of one joint.
+    values is a pandas DataFrame view of the motion, created on demand. DataFrames assigned to values,
+    or changed in place, stay the source of the motion.
+    topology is the SkeletonTopology of the skeleton, compiled again after a skeleton or root_name was
+    assigned. A skeleton changed in place needs invalidate_topology(), the topology is not compared
+    with the skeleton on every access.
+    A clone has its own copy of the skeleton and shares the topology until its skeleton is assigned or
+    invalidated.
+    A clone shares the motion array until values is used, which copies it first (copy-on-write), so that
+    changes of the DataFrame do not change the other MocapData. Until then motion is read-only.
+    '''
     def __init__(self):
+        self._topology = None
         self.skeleton = {}
-        self.values = None
         self.channel_names = []
         self.framerate = 0.0
         self.root_name = ''
-    
+        self._motion = None
+        # the motion array is shared with a clone (or the clone of this MocapData)
+        self._motion_shared = False
+        self._time_index = None
+        self._columns = None
+        self._values = None
+        self._channel_index = None
+        self._channel_index_columns = None
+
+    def __setstate__(self, state):
+        # MocapData pickled before the motion was held as array (values), before the topology
+        # or before skeleton and root_name were properties
+        state = dict(state)
+        values = state.pop('values', None)
+        for name in ('skeleton', 'root_name'):
+            if name in state:
+                state['_' + name] = state.pop(name)
+        self.__init__()
+        self.__dict__.update(state)
+        if values is not None:
+            self.values = values
+
+    @property
+    def skeleton(self):
+        return self._skeleton
+
+    @skeleton.setter
+    def skeleton(self, skeleton):
+        self._skeleton = skeleton
+        self._topology = None
+
+    @property
+    def root_name(self):
+        return self._root_name
+
+    @root_name.setter
+    def root_name(self, root_name):
+        self._root_name = root_name
+        self._topology = None
+
+    @property
+    def topology(self):
+        '''SkeletonTopology of the skeleton, compiled on first use and after the skeleton was assigned'''
+        if self._topology is None:
+            self._topology = SkeletonTopology(self.skeleton, self.root_name)
+        return self._topology
+
+    @topology.setter
+    def topology(self, topology):
+        '''Shares the topology compiled for the skeleton of this MocapData'''
+        self._topology = topology
+
+    def invalidate_topology(self):
+        '''Call after the skeleton was changed in place (i.e. a joint removed), the topology is compiled again'''
+        self._topology = None
+
+    def set_motion(self, motion, time_index, columns):
+        '''motion: (frames, channels) array, time_index: time of every frame (TimedeltaIndex), columns: channel names'''
+        self._motion = motion
+        self._motion_shared = False
+        self._time_index = time_index
+        self._columns = list(columns)
+        self._values = None
+
+    @property
+    def values(self):
+        if self._values is None and self._motion is not None:
+            import pandas as pd
+            if self._motion_shared or not self._motion.flags.writeable:
+                # the DataFrame can be changed in place, a shared or read-only motion is copied first
+                self._motion = np.array(self._motion)
+                self._motion_shared = False
+            # no copy, the DataFrame uses the motion array
+            self._values = pd.DataFrame(data=self._motion, index=self._time_index, columns=self._columns, copy=False)
+        return self._values
+
+    @values.setter
+    def values(self, values):
+        self._values = values
+        self._motion = None
+        self._motion_shared = False
+        self._time_index = None
+        self._columns = None
+
+    @property
+    def motion(self):
+        '''(frames, channels) array of the motion, read-only while it is shared with a clone'''
+        if self._values is not None:
+            return np.asarray(self._values.values)
+        if self._motion_shared:
+            motion = self._motion.view()
+            motion.flags.writeable = False
+            return motion
+        return self._motion
+
+    @property
+    def time_index(self):
+        return self._values.index if self._values is not None else self._time_index
+
+    @property
+    def columns(self):
+        '''Channel names of the columns of the motion (i.e. RightHand_Xrotation)'''
+        return list(self._values.columns) if self._values is not None else self._columns
+
+    @property
+    def channel_index(self):
+        '''Column of every (joint, channel) in the motion'''
+        columns = self._values.columns if self._values is not None else self._columns
+        if self._channel_index is None or self._channel_index_columns is not columns:
+            # the channel names do not contain "_", the joint names may (i.e. RightHandIndex4_Nub)
+            self._channel_index = {tuple(column.rsplit('_', 1)): i for i, column in enumerate(columns)}
+            self._channel_index_columns = columns
+        return self._channel_index
+
+    def has_channels(self, joint, channels):
+        channel_index = self.channel_index
+        return all((joint, channel) in channel_index for channel in channels)
+
+    def channel(self, joint, channel):
+        '''Values (frames,) of one channel of a joint'''
+        return self.motion[:, self.channel_index[(joint, channel)]]
+
+    def joint_values(self, joint, channels=('Xrotation', 'Yrotation', 'Zrotation')):
+        '''Values (frames, len(channels)) of the channels of a joint, a view if the channels are adjacent'''
+        columns = [self.channel_index[(joint, channel)] for channel in channels]
+        if columns == list(range(columns[0], columns[0] + len(columns))):
+            return self.motion[:, columns[0]:columns[-1] + 1]
+        return self.motion[:, columns]
+
     def traverse(self, j=None):
-        stack = [self.root_name]
-        while stack:
-            joint = stack.pop()
-            yield joint
-            for c in self.skeleton[joint]['children']:
-                stack.append(c)
+        return iter(self.topology.joints)
 
     def clone(self):
+        '''
+        New MocapData with a copy of the skeleton, sharing the topology and (copy-on-write) the motion
+        The deep copy of the skeleton takes O(joints), so that transformers can change the skeleton of the clone
+        '''
         import copy
         new_data = MocapData()
-        new_data.skeleton = copy.copy(self.skeleton)
-        new_data.values = copy.copy(self.values)
+        new_data.skeleton = copy.deepcopy(self.skeleton)
         new_data.channel_names = copy.copy(self.channel_names)
-        new_data.root_name = copy.copy(self.root_name)
-        new_data.framerate = copy.copy(self.framerate)
+        new_data.root_name = self.root_name
+        new_data.framerate = self.framerate
+        new_data._topology = self._topology
+        if self._values is not None:
+            new_data.values = copy.copy(self._values)
+        elif self._motion is not None:
+            new_data.set_motion(self._motion, self._time_index, self._columns)
+            new_data._motion_shared = self._motion_shared = True
         return new_data
 
     def get_all_channels(self):
@@ -0,0 +1,107 @@
+'''
+Forward Kinematics
+
+Joint positions from the Euler rotation channels of a MocapData, computed for all frames at once
+'''
+import numpy as np
+
+from pymo.rotation_tools import euler2rotmat
+
+
+class ForwardKinematics():
+    '''
+    Computes the positions (frames, joints, 3) of the joints of a track
+
+    Only the joints asked for and their ancestors are computed. The global rotations and positions
+    are cached, so that later calls for other joints reuse the chains computed before.
+    The rotation matrices of the missing joints are computed in one call and accumulated level by level
+    of the SkeletonTopology (all joints of one depth at once), one batched matmul per level.
+    '''
+    def __init__(self, track):
+        self.track = track
+        self.topology = track.topology
+        self.joints = list(self.topology.joints)
+        self.parents = self.topology.parents
+        self._channel_index = track.channel_index
+        self._values = np.asarray(track.motion, dtype=np.float64)
+        # global rotation matrices (frames, joints, 3, 3) and positions (frames, joints, 3),
+        # valid for the joints marked in _has_rotmat and _has_position
+        frames, count = len(self._values), len(self.joints)
+        self._global_rotmats = np.empty((frames, count, 3, 3))
+        self._positions = np.empty((frames, count, 3))
+        self._has_rotmat = np.zeros(count, dtype=bool)
+        self._has_position = np.zeros(count, dtype=bool)
+
+    def positions(self, joints=None):
+        '''Returns the positions of the joints (frames, joints, 3), all joints in the order of self.joints by default'''
+        if joints is None:
+            indices = np.arange(len(self.joints))
+        else:
+            indices = np.array([self.topology.index[joint] for joint in joints], dtype=np.intp)
+        self._compute(indices)
+        return self._positions[:, indices]
+
+    def position(self, joint):
+        '''Returns the positions (frames, 3) of one joint'''
+        return self.positions([joint])[:, 0]
+
+    def _compute(self, indices):
+        levels = self.topology.levels
+
+        # positions of the joints and their ancestors, global rotations of the ancestors only
+        need_position = np.zeros(len(self.joints), dtype=bool)
+        need_position[indices] = True
+        for level in reversed(levels[1:]):
+            need_position[self.parents[level[need_position[level]]]] = True
+        need_rotmat = np.zeros(len(self.joints), dtype=bool)
+        parents = self.parents[need_position]
+        need_rotmat[parents[parents >= 0]] = True
+
+        need_position &= ~self._has_position
+        need_rotmat &= ~self._has_rotmat
+        if not need_position.any() and not need_rotmat.any():
+            return
+
+        rotated = np.flatnonzero(need_rotmat)
+        rotmats = euler2rotmat(self._channels(rotated, 'Xrotation', 'Yrotation', 'Zrotation'), from_deg=True)
+        positioned = np.flatnonzero(need_position)
+        pos_values = self._channels(positioned, 'Xposition', 'Yposition', 'Zposition')
+        # column of every joint in rotmats and pos_values
+        rot_slot = np.zeros(len(self.joints), dtype=np.intp)
+        rot_slot[rotated] = np.arange(len(rotated))
+        pos_slot = np.zeros(len(self.joints), dtype=np.intp)
+        pos_slot[positioned] = np.arange(len(positioned))
+
+        # the root is positioned by its position channels, without offset
+        root = levels[0]
+        if need_rotmat[root].any():
+            self._global_rotmats[:, root] = rotmats[:, rot_slot[root]]
+        if need_position[root].any():
+            self._positions[:, root] = pos_values[:, pos_slot[root]]
+
+        # every level only depends on the global rotations and positions of the levels above
+        for level in levels[1:]:
+            joints = level[need_rotmat[level]]
+            if len(joints):
+                self._global_rotmats[:, joints] = np.matmul(rotmats[:, rot_slot[joints]],
+                                                            self._global_rotmats[:, self.parents[joints]])
+            joints = level[need_position[level]]
+            if len(joints):
+                parents = self.parents[joints]
+                # the offset (plus position channels) is rotated by the parent
+                k = pos_values[:, pos_slot[joints]] + self.topology.offsets[joints]
+                self._positions[:, joints] = \
+                    np.matmul(k[:, :, np.newaxis, :], self._global_rotmats[:, parents])[:, :, 0] + \
+                    self._positions[:, parents]
+
+        self._has_rotmat |= need_rotmat
+        self._has_position |= need_position
+
+    def _channels(self, indices, *channels):
+        '''Values (frames, joints, 3) of the given channels, 0 for joints without those channels'''
+        result = np.zeros((len(self._values), len(indices), 3))
+        for i, j in enumerate(indices):
+            keys = [(self.joints[j], channel) for channel in channels]
+            if all(key in self._channel_index for key in keys):
+                result[:, i] = self._values[:, [self._channel_index[key] for key in keys]]
+        return result
@@ -7,9 +7,17 @@ Created: June 12, 2017
 Based on: https://gist.github.com/johnfredcee/2007503
 
 '''
+import os
 import re
 import numpy as np
-from data import Joint, MocapData
+from data import Joint, MocapData, SkeletonTopology
+
+
+def frame_times(count, framerate, first=0.0):
+    '''Times of count frames starting at first, accumulated frame by frame (every path gives the same times)'''
+    if not count:
+        return np.zeros(0)
+    return np.cumsum(np.concatenate(([first], np.full(count - 1, framerate))))
 
 
 class BVHScanner:
@@ -65,7 +73,9 @@ class BVHParser():
         self.bone_context = []
         self._motion_channels = []
         self._motions = []
+        self._frame_times = []
         self.current_token = 0
+        self.frame_count = None
         self.framerate = 0.0
         self.root_name = ''
 
@@ -79,29 +89,108 @@ class BVHParser():
 
         with open(filename, 'r') as bvh_file:
             raw_contents = bvh_file.read()
-        tokens, remainder = self.scanner.scan(raw_contents)
+        # only the hierarchy and the motion header are tokenized, the motion data is parsed in bulk
+        header, motion_data = self._split_motion(raw_contents)
+        frame_count = self._parse_header(header)
+        if frame_count is not None:
+            self._parse_motion(frame_count, motion_data)
+        
+        self._set_motion()
+        return self.data
+
+    def parse_header(self, header):
+        '''Parses the hierarchy and the motion header, returns the MocapData without values'''
+        self.reset()
+        self._parse_header(header)
+        return self.data
+
+    def iter_chunks(self, filename, frames_per_chunk=1024):
+        '''
+        Parses the skeleton once and yields the motion data in blocks of frames_per_chunk frames
+
+        Every block is a MocapData, all blocks share the skeleton, topology and channel_names objects.
+        Only one block is held in memory, so files larger than the memory can be processed.
+        The frames and times are the same as those of parse(), also with a truncated last frame.
+        '''
+        import itertools
+        import pandas as pd
+        self.reset()
+
+        with open(filename, 'r') as bvh_file:
+            header = []
+            for line in bvh_file:
+                header.append(line)
+                if re.search(r'Frame\s+Time\s*:\s*\S+', line):
+                    break
+            self._parse_header(''.join(header))
+            column_names = ['%s_%s'%(c[0], c[1]) for c in self._motion_channels]
+
+            # skip empty lines (e.g. at the end of the file)
+            lines = (line for line in bvh_file if not line.isspace())
+            start = 0
+            last_time = None
+            while True:
+                chunk = list(itertools.islice(lines, frames_per_chunk))
+                if not chunk:
+                    break
+                values = np.fromstring(''.join(chunk), sep=' ')
+                frame_count = values.size // len(column_names) if column_names else len(chunk)
+                if frame_count < len(chunk):
+                    # the last frame is incomplete (i.e. an interrupted recording), as in parse() it is skipped
+                    values = values[:frame_count * len(column_names)]
+                    chunk = chunk[:frame_count]
+                    if not chunk:
+                        break
+                values = values.reshape(len(chunk), len(column_names))
+                times = frame_times(len(chunk), self.framerate,
+                                    0.0 if last_time is None else last_time + self.framerate)
+                last_time = times[-1]
+
+                data = MocapData()
+                data.skeleton = self._skeleton
+                data.channel_names = self._motion_channels
+                data.root_name = self.root_name
+                data.framerate = self.framerate
+                data.topology = self.data.topology
+                data.set_motion(values, pd.to_timedelta(times, unit='s'), column_names)
+                start += len(chunk)
+                yield data
+
+        if self.frame_count is not None and self.frame_count != start:
+            print('Expected %d frames, found %d'%(self.frame_count, start))
+
+    def _parse_header(self, header):
+        tokens, remainder = self.scanner.scan(header)
         self._parse_hierarchy(tokens)
         self.current_token = self.current_token + 1
-        self._parse_motion(tokens)
-        
+        frame_count = self._parse_motion_header(tokens)
+        self.frame_count = frame_count
+
         self.data.skeleton = self._skeleton
         self.data.channel_names = self._motion_channels
-        self.data.values = self._to_DataFrame()
         self.data.root_name = self.root_name
         self.data.framerate = self.framerate
-
-        return self.data
+        # compiled once, shared by the clones and chunks of the parsed data
+        self.data.topology = SkeletonTopology(self._skeleton, self.root_name)
+        return frame_count
     
-    def _to_DataFrame(self):
-        '''Returns all of the channels parsed from the file as a pandas DataFrame'''
+    def _set_motion(self):
+        '''Sets all of the channels parsed from the file as the motion of the MocapData'''
 
         import pandas as pd
-        time_index = pd.to_timedelta([f[0] for f in self._motions], unit='s')
-        frames = [f[1] for f in self._motions]
-        channels = np.asarray([[channel[2] for channel in frame] for frame in frames])
+        time_index = pd.to_timedelta(self._frame_times, unit='s')
         column_names = ['%s_%s'%(c[0], c[1]) for c in self._motion_channels]
 
-        return pd.DataFrame(data=channels, index=time_index, columns=column_names)
+        motions = np.asarray(self._motions, dtype=np.float64).reshape(len(time_index), len(column_names))
+        self.data.set_motion(motions, time_index, column_names)
+
+    @staticmethod
+    def _split_motion(contents):
+        '''Splits the file after the "Frame Time" of the motion header, returns (header, motion data)'''
+        match = re.search(r'Frame\s+Time\s*:\s*\S+', contents)
+        if match is None:
+            return contents, ''
+        return contents[:match.end()], contents[match.end():]
 
 
     def _new_bone(self, parent, name):
@@ -207,7 +296,8 @@ class BVHParser():
         
         self.root_name = root_name
 
-    def _parse_motion(self, bvh):
+    def _parse_motion_header(self, bvh):
+        '''Returns the number of frames of the motion header'''
         if bvh[self.current_token][0] != 'IDENT':
             print('Unexpected text')
             return None
@@ -231,13 +321,141 @@ class BVHParser():
         self.framerate = frame_rate
        
         self.current_token = self.current_token + 1
-       
-        frame_time = 0.0
-        self._motions = [()] * frame_count
-        for i in range(frame_count):
-            channel_values = []
-            for channel in self._motion_channels:
-                channel_values.append((channel[0], channel[1], float(bvh[self.current_token][1])))
-                self.current_token = self.current_token + 1
-            self._motions[i] = (frame_time, channel_values)
-            frame_time = frame_time + frame_rate
+        return frame_count
+
+    def _parse_motion(self, frame_count, motion_data):
+        # all values of the motion data as (frames, channels) array, parsed in C
+        channel_count = len(self._motion_channels)
+        values = np.fromstring(motion_data, sep=' ')
+        if channel_count and values.size < frame_count * channel_count:
+            print('Expected %d frames, found %d'%(frame_count, values.size // channel_count))
+            frame_count = values.size // channel_count
+        self._motions = values[:frame_count * channel_count].reshape(frame_count, channel_count)
+        # the frame time is accumulated frame by frame, starting at 0
+        self._frame_times = frame_times(frame_count, self.framerate)
+
+
+class BVHReader():
+    '''
+    Random access to the frames of a BVH file
+
+    Parses only the header and indexes the byte offsets of the lines of the motion data (one frame per line),
+    the frames are read from a memory map on request (read_frames, iteration).
+    persist_index = True -> the index is stored next to the BVH file (<filename>.idx) and reused,
+    as long as size and modification time of the BVH file are unchanged.
+    '''
+    # size of the chunks scanned for line breaks while indexing
+    CHUNK_SIZE = 1 << 24
+
+    def __init__(self, filename, persist_index=False):
+        import mmap
+        self.filename = filename
+        self._file = open(filename, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        match = re.search(rb'Frame\s+Time\s*:\s*\S+', self._mmap)
+        if match is None:
+            self.close()
+            raise ValueError('No motion section in "%s"'%filename)
+        header_end = self._mmap.find(b'\n', match.end())
+        header_end = len(self._mmap) if header_end < 0 else header_end + 1
+
+        parser = BVHParser()
+        self.header = parser.parse_header(self._mmap[:header_end].decode())
+        self.column_names = ['%s_%s'%(c[0], c[1]) for c in self.header.channel_names]
+
+        self._offsets = self._load_index(header_end) if persist_index else None
+        if self._offsets is None:
+            self._offsets = self._build_index(header_end)
+            if persist_index:
+                self._save_index()
+        if len(self) and self.column_names and self._read_values(len(self) - 1, len(self)).size < len(self.column_names):
+            # the last frame is incomplete (i.e. an interrupted recording), as in parse() it is skipped
+            self._offsets = self._offsets[:-1]
+        self._frame_times = None
+        if parser.frame_count is not None and parser.frame_count != len(self):
+            print('Expected %d frames, found %d'%(parser.frame_count, len(self)))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._file.close()
+            self._mmap = None
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __iter__(self):
+        '''Yields the channel values of every frame, read lazily from the memory map'''
+        for frame in range(len(self)):
+            yield self._read(frame, frame + 1)[0]
+
+    def read_frames(self, start=0, stop=None):
+        '''Returns the MocapData with the frames from start to stop (exclusive, slice semantics)'''
+        import pandas as pd
+        start, stop, _ = slice(start, stop).indices(len(self))
+        stop = max(start, stop)
+        if self._frame_times is None:
+            # accumulated like the frame times of BVHParser.parse()
+            self._frame_times = frame_times(len(self), self.header.framerate)
+
+        data = self.header.clone()
+        data.set_motion(self._read(start, stop), pd.to_timedelta(self._frame_times[start:stop], unit='s'),
+                        self.column_names)
+        return data
+
+    def _read(self, start, stop):
+        return self._read_values(start, stop).reshape(stop - start, len(self.column_names))
+
+    def _read_values(self, start, stop):
+        # the lines of the frames are contiguous, all values are parsed at once
+        return np.fromstring(self._mmap[self._offsets[start]:self._offsets[stop]].decode(), sep=' ')
+
+    def _build_index(self, header_end):
+        '''Byte offsets of the start of every frame line, followed by the end of the last line'''
+        size = len(self._mmap)
+        line_ends = [np.array([header_end - 1], dtype=np.int64)]
+        for chunk_start in range(header_end, size, BVHReader.CHUNK_SIZE):
+            chunk = np.frombuffer(self._mmap, dtype=np.uint8, offset=chunk_start,
+                                  count=min(BVHReader.CHUNK_SIZE, size - chunk_start))
+            line_ends.append(np.flatnonzero(chunk == ord('\n')) + chunk_start)
+        line_ends = np.concatenate(line_ends)
+        if line_ends[-1] != size - 1:
+            # last line without line break
+            line_ends = np.append(line_ends, size)
+
+        starts = line_ends[:-1] + 1
+        # skip empty lines (e.g. at the end of the file, also with CRLF line breaks)
+        frames = line_ends[1:] - starts > 1
+        # skipped lines between two frames are read as whitespace of the previous frame
+        return np.append(starts[frames], line_ends[1:][frames][-1] if frames.any() else header_end)
+
+    def _index_filename(self):
+        return self.filename + '.idx'
+
+    def _index_key(self):
+        stat = os.fstat(self._file.fileno())
+        return np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+    def _load_index(self, header_end):
+        try:
+            index = np.load(self._index_filename(), mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        # the first two values are size and modification time of the indexed BVH file
+        if len(index) < 3 or not np.array_equal(index[:2], self._index_key()) or index[2] < header_end:
+            return None
+        return index[2:]
+
+    def _save_index(self):
+        try:
+            with open(self._index_filename(), 'wb') as f:
+                np.save(f, np.concatenate((self._index_key(), self._offsets)))
+        except OSError as e:
+            print('Index of "%s" not saved: %s'%(self.filename, e))
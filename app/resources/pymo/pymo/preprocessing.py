@@ -9,15 +9,23 @@ import pandas as pd
 import numpy as np
 from sklearn.base import BaseEstimator, TransformerMixin
 
-from pymo.rotation_tools import Rotation
+from pymo.rotation_tools import (euler2rotmat, rotmat2euler, rotmat2expmap, expmap2rotmat,
+                                 rotmat2quat, quat2rotmat)
+from pymo.kinematics import ForwardKinematics
+
+# channels of the joint rotations as exponential map and as unit quaternion
+EXPMAP_PARAMS = ['alpha', 'beta', 'gamma']
+QUAT_PARAMS = ['qw', 'qx', 'qy', 'qz']
 
 class MocapParameterizer(BaseEstimator, TransformerMixin):
-    def __init__(self, param_type = 'euler'):
+    def __init__(self, param_type = 'euler', joints=None):
         '''
         
         param_type = {'euler', 'quat', 'expmap', 'position'}
+        joints = list of joint names -> only the positions of those joints are computed (param_type 'position')
         '''
         self.param_type = param_type
+        self.joints = joints
 
     def fit(self, X, y=None):
         return self
@@ -28,7 +36,7 @@ class MocapParameterizer(BaseEstimator, TransformerMixin):
         elif self.param_type == 'expmap':
             return self._to_expmap(X)
         elif self.param_type == 'quat':
-            return X
+            return self._to_quat(X)
         elif self.param_type == 'position':
             return self._to_pos(X)
         else:
@@ -42,7 +50,7 @@ class MocapParameterizer(BaseEstimator, TransformerMixin):
         elif self.param_type == 'expmap':
             return self._expmap_to_euler(X)
         elif self.param_type == 'quat':
-            raise 'quat2euler is not supported'
+            return self._quat_to_euler(X)
         elif self.param_type == 'position':
             # raise 'positions 2 eulers is not supported'
             print('positions 2 eulers is not supported')
@@ -55,183 +63,61 @@ class MocapParameterizer(BaseEstimator, TransformerMixin):
 
         Q = []
         for track in X:
-            channels = []
-            titles = []
-            euler_df = track.values
-
-            # Create a new DataFrame to store the exponential map rep
-            pos_df = pd.DataFrame(index=euler_df.index)
-
-            # Copy the root rotations into the new DataFrame
-            # rxp = '%s_Xrotation'%track.root_name
-            # ryp = '%s_Yrotation'%track.root_name
-            # rzp = '%s_Zrotation'%track.root_name
-            # pos_df[rxp] = pd.Series(data=euler_df[rxp], index=pos_df.index)
-            # pos_df[ryp] = pd.Series(data=euler_df[ryp], index=pos_df.index)
-            # pos_df[rzp] = pd.Series(data=euler_df[rzp], index=pos_df.index)
-
-            # List the columns that contain rotation channels
-            rot_cols = [c for c in euler_df.columns if ('rotation' in c)]
-
-            # List the columns that contain position channels
-            pos_cols = [c for c in euler_df.columns if ('position' in c)]
-
-            # List the joints that are not end sites, i.e., have channels
-            joints = (joint for joint in track.skeleton)
-            
-            tree_data = {}
-
-            for joint in track.traverse():
-                parent = track.skeleton[joint]['parent']
-
-                # Get the rotation columns that belong to this joint
-                rc = euler_df[[c for c in rot_cols if joint in c]]
-
-                # Get the position columns that belong to this joint
-                pc = euler_df[[c for c in pos_cols if joint in c]]
-
-                # Make sure the columns are organized in xyz order
-                if rc.shape[1] < 3:
-                    euler_values = [[0,0,0] for f in rc.iterrows()]
-                else:
-                    euler_values = [[f[1]['%s_Xrotation'%joint], 
-                                     f[1]['%s_Yrotation'%joint], 
-                                     f[1]['%s_Zrotation'%joint]] for f in rc.iterrows()]
-
-                if pc.shape[1] < 3:
-                    pos_values = [[0,0,0] for f in pc.iterrows()]
-                else:
-                    pos_values =[[f[1]['%s_Xposition'%joint], 
-                                  f[1]['%s_Yposition'%joint], 
-                                  f[1]['%s_Zposition'%joint]] for f in pc.iterrows()]
-
-                #euler_values = [[0,0,0] for f in rc.iterrows()] #for deugging
-                #pos_values = [[0,0,0] for f in pc.iterrows()] #for deugging
-                
-                # Convert the eulers to rotation matrices
-                rotmats = np.asarray([Rotation([f[0], f[1], f[2]], 'euler', from_deg=True).rotmat for f in euler_values])                  
-                tree_data[joint]=[
-                                    [], # to store the rotation matrix
-                                    []  # to store the calculated position
-                                 ] 
-
-                if track.root_name == joint:
-                    tree_data[joint][0] = rotmats
-                    # tree_data[joint][1] = np.add(pos_values, track.skeleton[joint]['offsets'])
-                    tree_data[joint][1] = pos_values
-                else:
-                    # for every frame i, multiply this joint's rotmat to the rotmat of its parent
-                    tree_data[joint][0] = np.asarray([np.matmul(rotmats[i], tree_data[parent][0][i]) 
-                                                      for i in range(len(tree_data[parent][0]))])
-
-                    # add the position channel to the offset and store it in k, for every frame i
-                    k = np.asarray([np.add(pos_values[i],  track.skeleton[joint]['offsets'])
-                                    for i in range(len(tree_data[parent][0]))])
-
-                    # multiply k to the rotmat of the parent for every frame i
-                    q = np.asarray([np.matmul(k[i], tree_data[parent][0][i]) 
-                                    for i in range(len(tree_data[parent][0]))])
-
-                    # add q to the position of the parent, for every frame i
-                    tree_data[joint][1] = np.asarray([np.add(q[i], tree_data[parent][1][i])
-                                                      for i in range(len(tree_data[parent][1]))])
-
-
-                # Create the corresponding columns in the new DataFrame
-                pos_df['%s_Xposition'%joint] = pd.Series(data=[e[0] for e in tree_data[joint][1]], index=pos_df.index)
-                pos_df['%s_Yposition'%joint] = pd.Series(data=[e[1] for e in tree_data[joint][1]], index=pos_df.index)
-                pos_df['%s_Zposition'%joint] = pd.Series(data=[e[2] for e in tree_data[joint][1]], index=pos_df.index)
+            fk = ForwardKinematics(track)
+            joints = fk.joints if self.joints is None else self.joints
+            positions = fk.positions(joints)
 
+            # Create the X, Y, Z position columns of every joint
+            columns = ['%s_%sposition'%(joint, axis) for joint in joints for axis in 'XYZ']
 
             new_track = track.clone()
-            new_track.values = pos_df
+            new_track.set_motion(positions.reshape(len(positions), -1), track.time_index, columns)
             Q.append(new_track)
         return Q
 
 
     def _to_expmap(self, X):
         '''Converts Euler angles to Exponential Maps'''
+        return self._from_euler(X, EXPMAP_PARAMS, lambda eulers: rotmat2expmap(euler2rotmat(eulers, from_deg=True)))
 
-        Q = []
-        for track in X:
-            channels = []
-            titles = []
-            euler_df = track.values
-
-            # Create a new DataFrame to store the exponential map rep
-            exp_df = pd.DataFrame(index=euler_df.index)
-
-            # Copy the root positions into the new DataFrame
-            rxp = '%s_Xposition'%track.root_name
-            ryp = '%s_Yposition'%track.root_name
-            rzp = '%s_Zposition'%track.root_name
-            exp_df[rxp] = pd.Series(data=euler_df[rxp], index=exp_df.index)
-            exp_df[ryp] = pd.Series(data=euler_df[ryp], index=exp_df.index)
-            exp_df[rzp] = pd.Series(data=euler_df[rzp], index=exp_df.index)
-            
-            # List the columns that contain rotation channels
-            rots = [c for c in euler_df.columns if ('rotation' in c and 'Nub' not in c)]
-
-            # List the joints that are not end sites, i.e., have channels
-            joints = (joint for joint in track.skeleton if 'Nub' not in joint)
+    def _expmap_to_euler(self, X):
+        return self._to_euler(X, EXPMAP_PARAMS, lambda expmaps: rotmat2euler(expmap2rotmat(expmaps), use_deg=True))
 
-            for joint in joints:
-                r = euler_df[[c for c in rots if joint in c]] # Get the columns that belong to this joint
-                euler = [[f[1]['%s_Xrotation'%joint], f[1]['%s_Yrotation'%joint], f[1]['%s_Zrotation'%joint]] for f in r.iterrows()] # Make sure the columsn are organized in xyz order
-                exps = [Rotation(f, 'euler', from_deg=True).to_expmap() for f in euler] # Convert the eulers to exp maps
-                
-                # Create the corresponding columns in the new DataFrame
-    
-                exp_df['%s_alpha'%joint] = pd.Series(data=[e[0] for e in exps], index=exp_df.index)
-                exp_df['%s_beta'%joint] = pd.Series(data=[e[1] for e in exps], index=exp_df.index)
-                exp_df['%s_gamma'%joint] = pd.Series(data=[e[2] for e in exps], index=exp_df.index)
+    def _to_quat(self, X):
+        '''Converts Euler angles to unit quaternions (w, x, y, z)'''
+        return self._from_euler(X, QUAT_PARAMS, lambda eulers: rotmat2quat(euler2rotmat(eulers, from_deg=True)))
 
-            new_track = track.clone()
-            new_track.values = exp_df
-            Q.append(new_track)
+    def _quat_to_euler(self, X):
+        return self._to_euler(X, QUAT_PARAMS, lambda quats: rotmat2euler(quat2rotmat(quats), use_deg=True))
 
-        return Q
+    def _from_euler(self, X, params, convert):
+        '''Converts the Euler angles of all joints and frames at once, convert: (frames, joints, 3) -> (frames, joints, params)'''
+        return [self._convert(track, ['Xrotation', 'Yrotation', 'Zrotation'], params, convert) for track in X]
 
-    def _expmap_to_euler(self, X):
-        Q = []
-        for track in X:
-            channels = []
-            titles = []
-            exp_df = track.values
+    def _to_euler(self, X, params, convert):
+        return [self._convert(track, params, ['Xrotation', 'Yrotation', 'Zrotation'], convert) for track in X]
 
-            # Create a new DataFrame to store the exponential map rep
-            euler_df = pd.DataFrame(index=exp_df.index)
+    @staticmethod
+    def _convert(track, channels, new_channels, convert):
+        motion = track.motion
+        channel_index = track.channel_index
 
-            # Copy the root positions into the new DataFrame
-            rxp = '%s_Xposition'%track.root_name
-            ryp = '%s_Yposition'%track.root_name
-            rzp = '%s_Zposition'%track.root_name
-            euler_df[rxp] = pd.Series(data=exp_df[rxp], index=euler_df.index)
-            euler_df[ryp] = pd.Series(data=exp_df[ryp], index=euler_df.index)
-            euler_df[rzp] = pd.Series(data=exp_df[rzp], index=euler_df.index)
-            
-            # List the columns that contain rotation channels
-            exp_params = [c for c in exp_df.columns if ( any(p in c for p in ['alpha', 'beta','gamma']) and 'Nub' not in c)]
+        # List the joints that are not end sites, i.e., have channels
+        joints = [joint for joint in track.skeleton if 'Nub' not in joint]
+        values = np.stack([motion[:, [channel_index[(joint, channel)] for channel in channels]] for joint in joints],
+                          axis=1)
+        converted = convert(values)
 
-            # List the joints that are not end sites, i.e., have channels
-            joints = (joint for joint in track.skeleton if 'Nub' not in joint)
+        # Copy the root positions
+        root_channels = [c for c in ['Xposition', 'Yposition', 'Zposition'] if (track.root_name, c) in channel_index]
+        root_values = motion[:, [channel_index[(track.root_name, c)] for c in root_channels]]
+        columns = ['%s_%s'%(track.root_name, c) for c in root_channels] + \
+                  ['%s_%s'%(joint, channel) for joint in joints for channel in new_channels]
 
-            for joint in joints:
-                r = exp_df[[c for c in exp_params if joint in c]] # Get the columns that belong to this joint
-                expmap = [[f[1]['%s_alpha'%joint], f[1]['%s_beta'%joint], f[1]['%s_gamma'%joint]] for f in r.iterrows()] # Make sure the columsn are organized in xyz order
-                euler_rots = [Rotation(f, 'expmap').to_euler(True)[0] for f in expmap] # Convert the eulers to exp maps
-                
-                # Create the corresponding columns in the new DataFrame
-    
-                euler_df['%s_Xrotation'%joint] = pd.Series(data=[e[0] for e in euler_rots], index=euler_df.index)
-                euler_df['%s_Yrotation'%joint] = pd.Series(data=[e[1] for e in euler_rots], index=euler_df.index)
-                euler_df['%s_Zrotation'%joint] = pd.Series(data=[e[2] for e in euler_rots], index=euler_df.index)
-
-            new_track = track.clone()
-            new_track.values = euler_df
-            Q.append(new_track)
-
-        return Q
+        new_track = track.clone()
+        new_track.set_motion(np.concatenate([root_values, converted.reshape(len(converted), -1)], axis=1),
+                             track.time_index, columns)
+        return new_track
 
 
 class JointSelector(BaseEstimator, TransformerMixin):
@@ -254,19 +140,19 @@ class JointSelector(BaseEstimator, TransformerMixin):
         
         selected_joints.extend(self.joints)
 
-        for joint_name in selected_joints:
-            selected_channels.extend([o for o in X[0].values.columns if joint_name in o])
+        # the channels of exactly the selected joints, in the order of the columns
+        selected_channels = [i for (joint, channel), i in X[0].channel_index.items() if joint in selected_joints]
             
         Q = []
 
 
         for track in X:
             t2 = track.clone()
-            
-            for key in track.skeleton.keys():
-                if key not in selected_joints:
-                    t2.skeleton.pop(key)
-            t2.values = track.values[selected_channels]
+            # only the selected joints and children, the topology of the clone is compiled again for the new skeleton
+            t2.skeleton = {key: dict(joint, children=[c for c in joint['children'] if c in selected_joints])
+                           for key, joint in t2.skeleton.items() if key in selected_joints}
+            t2.set_motion(track.motion[:, selected_channels], track.time_index,
+                          [track.columns[i] for i in selected_channels])
 
             Q.append(t2)
       
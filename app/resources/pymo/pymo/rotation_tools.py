@@ -17,6 +17,119 @@ def deg2rad(x):
 def rad2deg(x):
     return x/math.pi*180
 
+def euler2rotmat(eulers, from_deg=True):
+    '''
+    Rotation matrices of Euler angles (..., 3) -> (..., 3, 3), for any number of rotations at once
+
+    Same convention as Rotation(..., 'euler'): rotmat = Rz * Ry * Rx
+    '''
+    eulers = np.asarray(eulers, dtype=np.float64)
+    if from_deg:
+        eulers = deg2rad(eulers)
+    c = np.cos(eulers)
+    s = np.sin(eulers)
+    ones = np.ones(eulers.shape[:-1])
+    zeros = np.zeros(eulers.shape[:-1])
+
+    def matrices(rows):
+        return np.stack([np.stack(row, axis=-1) for row in rows], axis=-2)
+
+    ca, cb, cg = c[..., 0], c[..., 1], c[..., 2]
+    sa, sb, sg = s[..., 0], s[..., 1], s[..., 2]
+    Rx = matrices([[ones, zeros, zeros],
+                   [zeros, ca, sa],
+                   [zeros, -sa, ca]])
+    Ry = matrices([[cb, zeros, -sb],
+                   [zeros, ones, zeros],
+                   [sb, zeros, cb]])
+    Rz = matrices([[cg, sg, zeros],
+                   [-sg, cg, zeros],
+                   [zeros, zeros, ones]])
+    return np.matmul(Rz, np.matmul(Ry, Rx))
+
+def rotmat2euler(rotmats, use_deg=True):
+    '''
+    Euler angles of rotation matrices (..., 3, 3) -> (..., 3), the inverse of euler2rotmat
+
+    In gimbal lock (Y rotation of +-90 degrees) the Z rotation is set to 0.
+    '''
+    R = np.asarray(rotmats, dtype=np.float64)
+    beta = np.arcsin(np.clip(R[..., 2, 0], -1, 1))
+    gimbal = np.absolute(np.absolute(R[..., 2, 0]) - 1) < 1e-12
+    alpha = np.where(gimbal, np.arctan2(R[..., 1, 2], R[..., 1, 1]), np.arctan2(-R[..., 2, 1], R[..., 2, 2]))
+    gamma = np.where(gimbal, 0.0, np.arctan2(-R[..., 1, 0], R[..., 0, 0]))
+    eulers = np.stack([alpha, beta, gamma], axis=-1)
+    if use_deg:
+        eulers = rad2deg(eulers)
+    return eulers
+
+
+def rotmat2expmap(rotmats):
+    '''Exponential maps of rotation matrices (..., 3, 3) -> (..., 3), as Rotation.to_expmap'''
+    # through the quaternion, which is also stable for rotations close to 180 degrees
+    return quat2expmap(rotmat2quat(rotmats))
+
+
+def expmap2rotmat(expmaps):
+    '''Rotation matrices of exponential maps (..., 3) -> (..., 3, 3), as Rotation(..., 'expmap')'''
+    return quat2rotmat(expmap2quat(expmaps))
+
+
+def expmap2quat(expmaps):
+    '''Unit quaternions (w, x, y, z) of exponential maps (..., 3) -> (..., 4)'''
+    expmaps = np.asarray(expmaps, dtype=np.float64)
+    theta = np.linalg.norm(expmaps, axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        axis = np.where((theta > 0)[..., np.newaxis], expmaps / theta[..., np.newaxis], 0)
+    return np.concatenate([np.cos(theta / 2)[..., np.newaxis], np.sin(theta / 2)[..., np.newaxis] * axis], axis=-1)
+
+
+def quat2expmap(quats):
+    '''Exponential maps of quaternions (w, x, y, z) (..., 4) -> (..., 3)'''
+    quats = np.asarray(quats, dtype=np.float64)
+    quats = quats / np.linalg.norm(quats, axis=-1, keepdims=True)
+    s = np.linalg.norm(quats[..., 1:], axis=-1)
+    theta = 2 * np.arctan2(s, quats[..., 0])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expmaps = quats[..., 1:] * (theta / s)[..., np.newaxis]
+    expmaps[s == 0] = 0
+    return expmaps
+
+
+def quat2rotmat(quats):
+    '''Rotation matrices of quaternions (w, x, y, z) (..., 4) -> (..., 3, 3)'''
+    quats = np.asarray(quats, dtype=np.float64)
+    w, x, y, z = quats[..., 0], quats[..., 1], quats[..., 2], quats[..., 3]
+    return np.stack([
+        np.stack([1 - 2*(y**2 + z**2), 2*(x*y - z*w), 2*(x*z + y*w)], axis=-1),
+        np.stack([2*(x*y + z*w), 1 - 2*(x**2 + z**2), 2*(y*z - x*w)], axis=-1),
+        np.stack([2*(x*z - y*w), 2*(y*z + x*w), 1 - 2*(x**2 + y**2)], axis=-1)], axis=-2)
+
+
+def rotmat2quat(rotmats):
+    '''Unit quaternions (w, x, y, z) with w >= 0 of rotation matrices (..., 3, 3) -> (..., 4)'''
+    R = np.asarray(rotmats, dtype=np.float64)
+    R00, R01, R02 = R[..., 0, 0], R[..., 0, 1], R[..., 0, 2]
+    R10, R11, R12 = R[..., 1, 0], R[..., 1, 1], R[..., 1, 2]
+    R20, R21, R22 = R[..., 2, 0], R[..., 2, 1], R[..., 2, 2]
+
+    # the quaternion is computed from the largest of w, x, y, z (Shepperd's method), for numerical stability
+    diagonals = np.stack([R00 + R11 + R22, R00, R11, R22], axis=-1)
+    case = np.argmax(diagonals, axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        w = np.sqrt(np.maximum(1 + R00 + R11 + R22, 0)) / 2
+        x = np.sqrt(np.maximum(1 + R00 - R11 - R22, 0)) / 2
+        y = np.sqrt(np.maximum(1 - R00 + R11 - R22, 0)) / 2
+        z = np.sqrt(np.maximum(1 - R00 - R11 + R22, 0)) / 2
+        candidates = np.stack([
+            np.stack([w, (R21 - R12) / (4*w), (R02 - R20) / (4*w), (R10 - R01) / (4*w)], axis=-1),
+            np.stack([(R21 - R12) / (4*x), x, (R01 + R10) / (4*x), (R02 + R20) / (4*x)], axis=-1),
+            np.stack([(R02 - R20) / (4*y), (R01 + R10) / (4*y), y, (R12 + R21) / (4*y)], axis=-1),
+            np.stack([(R10 - R01) / (4*z), (R02 + R20) / (4*z), (R12 + R21) / (4*z), z], axis=-1)], axis=-2)
+    quats = np.take_along_axis(candidates, case[..., np.newaxis, np.newaxis], axis=-2)[..., 0, :]
+    return np.where(quats[..., :1] < 0, -quats, quats)
+
+
 class Rotation():
     def __init__(self,rot, param_type, **params):
         self.rotmat = []
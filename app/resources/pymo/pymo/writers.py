@@ -2,8 +2,16 @@ import numpy as np
 import pandas as pd
 
 class BVHWriter():
-    def __init__(self):
-        pass
+    '''
+    precision: None -> shortest representation that parses back to the same value (default, lossless),
+    decimal places of the motion values (i.e. 6 -> %.6f) otherwise
+    '''
+
+    # number of frames formatted and written at once
+    CHUNK_FRAMES = 1024
+
+    def __init__(self, precision=None):
+        self.precision = precision
     
     def write(self, X, ofile):
         
@@ -11,45 +19,117 @@ class BVHWriter():
         ofile.write('HIERARCHY\n')
         
         self.motions_ = []
-        self._printJoint(X, X.root_name, 0, ofile)
+        topology = X.topology
+        self._printJoint(topology, topology.index[X.root_name], 0, ofile)
 
         # Writing the motion header
         ofile.write('MOTION\n')
-        ofile.write('Frames: %d\n'%X.values.shape[0])
+        ofile.write('Frames: %d\n'%X.motion.shape[0])
         ofile.write('Frame Time: %f\n'%X.framerate)
 
         # Writing the data
-        self.motions_ = np.asarray(self.motions_).T
-        lines = [" ".join(item) for item in self.motions_.astype(str)]
-        ofile.write("".join("%s\n"%l for l in lines))
+        channel_index = X.channel_index
+        self._write_motions(X.motion[:, [channel_index[c] for c in self.motions_]], ofile)
 
-    def _printJoint(self, X, joint, tab, ofile):
-        
-        if X.skeleton[joint]['parent'] == None:
-            ofile.write('ROOT %s\n'%joint)
-        elif len(X.skeleton[joint]['children']) > 0:
-            ofile.write('%sJOINT %s\n'%('\t'*(tab), joint))
+    def _write_motions(self, motions, ofile):
+        '''Formats the (frames, channels) array in chunks, one format operation per chunk'''
+        if not motions.size:
+            return
+        value_format = '%r' if self.precision is None else '%%.%df'%self.precision
+        line_format = ' '.join([value_format]*motions.shape[1]) + '\n'
+        for start in range(0, motions.shape[0], self.CHUNK_FRAMES):
+            chunk = motions[start:start + self.CHUNK_FRAMES]
+            # tolist() -> python floats, numpy scalars would not be formatted as plain numbers by %r
+            ofile.write((line_format*chunk.shape[0])%tuple(chunk.ravel().tolist()))
+
+    def _printJoint(self, topology, joint, tab, ofile):
+        # joint: id of the joint in the topology of the written MocapData
+        name = topology.joints[joint]
+
+        if topology.parents[joint] < 0:
+            ofile.write('ROOT %s\n'%name)
+        elif not topology.end_sites[joint]:
+            ofile.write('%sJOINT %s\n'%('\t'*(tab), name))
         else:
             ofile.write('%sEnd Site\n'%('\t'*(tab)))
 
         ofile.write('%s{\n'%('\t'*(tab)))
         
-        ofile.write('%sOFFSET %3.5f %3.5f %3.5f\n'%('\t'*(tab+1),
-                                                X.skeleton[joint]['offsets'][0],
-                                                X.skeleton[joint]['offsets'][1],
-                                                X.skeleton[joint]['offsets'][2]))
-        channels = X.skeleton[joint]['channels']
+        offsets = topology.offsets[joint]
+        ofile.write('%sOFFSET %3.5f %3.5f %3.5f\n'%('\t'*(tab+1), offsets[0], offsets[1], offsets[2]))
+        channels = topology.channels[joint]
         n_channels = len(channels)
 
         if n_channels > 0:
             for ch in channels:
-                self.motions_.append(np.asarray(X.values['%s_%s'%(joint, ch)].values))
+                self.motions_.append((name, ch))
 
-        if len(X.skeleton[joint]['children']) > 0:
+        if not topology.end_sites[joint]:
             ch_str = ''.join(' %s'*n_channels%tuple(channels))
             ofile.write('%sCHANNELS %d%s\n' %('\t'*(tab+1), n_channels, ch_str)) 
 
-            for c in X.skeleton[joint]['children']:
-                self._printJoint(X, c, tab+1, ofile)
+            for c in topology.children[joint]:
+                self._printJoint(topology, c, tab+1, ofile)
 
         ofile.write('%s}\n'%('\t'*(tab)))
+
+
+class BVHStreamWriter(BVHWriter):
+    '''
+    Writes a BVH file while recording: the HIERARCHY is written with begin() once the offsets are known,
+    the frames are appended in batches and the frame count is patched with close()
+    The values are written with a fixed number of decimal places (precision, 6 by default).
+    '''
+
+    # width of the Frames: field, which is overwritten when the file is closed
+    FRAMES_WIDTH = 10
+
+    def __init__(self, filename, batch_size=256, precision=6):
+        super(BVHStreamWriter, self).__init__(precision)
+        self.filename = filename
+        self.batch_size = batch_size
+        self.frames = 0
+        self._file = None
+        self._columns = None
+        self._frames_position = None
+        self._batch = []
+
+    def begin(self, X):
+        '''X: MocapData with skeleton (including offsets), channel_names, root_name and framerate'''
+        self._file = open(self.filename, 'w')
+        self._file.write('HIERARCHY\n')
+
+        self.motions_ = []
+        topology = X.topology
+        self._printJoint(topology, topology.index[X.root_name], 0, self._file)
+        # the frames are given in the order of X.channel_names, the file needs the order of the hierarchy
+        columns = {(joint, ch): i for i, (joint, ch) in enumerate(X.channel_names)}
+        self._columns = np.asarray([columns[c] for c in self.motions_])
+
+        self._file.write('MOTION\n')
+        self._frames_position = self._file.tell()
+        self._file.write('Frames: %-*d\n'%(self.FRAMES_WIDTH, 0))
+        self._file.write('Frame Time: %f\n'%X.framerate)
+
+    def write_frame(self, values):
+        self._batch.append(values)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._batch:
+            return
+        self._write_motions(np.asarray(self._batch, dtype=np.float64)[:, self._columns], self._file)
+        self.frames += len(self._batch)
+        self._batch = []
+
+    def close(self):
+        '''Returns False if no frame was written (begin() was never called)'''
+        if self._file is None:
+            return False
+        self.flush()
+        self._file.seek(self._frames_position)
+        self._file.write('Frames: %-*d'%(self.FRAMES_WIDTH, self.frames))
+        self._file.close()
+        self._file = None
+        return True
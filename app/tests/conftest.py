@@ -0,0 +1,65 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# the modules of the app are imported as top-level modules, pymo through resources
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+import resources  # noqa: E402,F401
+
+# hand skeleton with a root position, two branches and joints without position channels
+BVH_HIERARCHY = '''HIERARCHY
+ROOT Root
+{
+  OFFSET 0.0 0.0 0.0
+  CHANNELS 6 Xposition Yposition Zposition Xrotation Yrotation Zrotation
+  JOINT Hand
+  {
+    OFFSET 0.0 1.5 0.0
+    CHANNELS 3 Xrotation Yrotation Zrotation
+    JOINT Finger1
+    {
+      OFFSET 0.5 2.0 0.25
+      CHANNELS 3 Xrotation Yrotation Zrotation
+      End Site
+      {
+        OFFSET 0.0 1.0 0.0
+      }
+    }
+    JOINT Finger2
+    {
+      OFFSET -0.5 2.0 0.0
+      CHANNELS 6 Xposition Yposition Zposition Xrotation Yrotation Zrotation
+      End Site
+      {
+        OFFSET 0.0 0.75 0.0
+      }
+    }
+  }
+}
+'''
+BVH_CHANNELS = 18
+BVH_FRAME_TIME = 0.033333
+
+
+def bvh_text(motion, frame_time=BVH_FRAME_TIME):
+    lines = ['MOTION', 'Frames: %d' % len(motion), 'Frame Time: %f' % frame_time]
+    lines += [' '.join(repr(float(value)) for value in frame) for frame in motion]
+    return BVH_HIERARCHY + '\n'.join(lines) + '\n'
+
+
+@pytest.fixture
+def motion():
+    rng = np.random.default_rng(3)
+    return rng.uniform(-90.0, 90.0, size=(40, BVH_CHANNELS))
+
+
+@pytest.fixture
+def bvh_file(tmp_path, motion):
+    filename = str(tmp_path / 'hand.bvh')
+    with open(filename, 'w') as f:
+        f.write(bvh_text(motion))
+    return filename
+
@@ -0,0 +1,88 @@
+import os
+import shutil
+import time
+
+import numpy as np
+import pytest
+
+import BVHCache as cache_module
+from BVHCache import BVHCache
+from pymo.parsers import BVHParser
+
+
+@pytest.fixture
+def other_file(bvh_file, tmp_path):
+    '''A second BVH file with a different content'''
+    other = str(tmp_path / 'other.bvh')
+    with open(bvh_file) as f:
+        contents = f.read()
+    with open(other, 'w') as f:
+        f.write(contents.replace('OFFSET 0.5 2.0 0.25', 'OFFSET 0.5 2.0 0.5'))
+    return other
+
+
+def test_cache_returns_the_parsed_file(bvh_file, tmp_path):
+    data = BVHParser().parse(bvh_file)
+    cache = BVHCache(str(tmp_path / 'cache'))
+    first = cache.parse(bvh_file)
+    cached = cache.parse(bvh_file)
+    assert isinstance(cached.motion, np.memmap)
+    for result in (first, cached):
+        assert np.array_equal(result.motion, data.motion)
+        assert np.array_equal(result.time_index.values, data.time_index.values)
+        assert result.columns == data.columns
+        assert result.skeleton == data.skeleton
+    # the entry is copy-on-write
+    cached.values.iloc[0, 0] = 1000.0
+    assert np.array_equal(cache.parse(bvh_file).motion, data.motion)
+
+
+def test_cache_evicts_and_sweeps(bvh_file, other_file, tmp_path):
+    directory = str(tmp_path / 'cache')
+    cache = BVHCache(directory, max_size=1)
+    cache.parse(bvh_file)
+    cache.parse(other_file)
+    # only the entry used last is kept
+    assert len(cache._load_index()['entries']) == 1
+    assert len(os.listdir(directory)) == 2
+
+    # a directory which is not in the index (i.e. a failed removal) is removed when the cache is used again,
+    # unless it was changed recently (i.e. an entry of another process)
+    for name in ('stale', 'recent'):
+        shutil.copytree(os.path.join(directory, next(iter(cache._load_index()['entries']))),
+                        os.path.join(directory, name))
+    old = time.time() - cache_module.SWEEP_AGE - 1
+    os.utime(os.path.join(directory, 'stale'), (old, old))
+    cache.parse(other_file)
+    assert 'stale' not in os.listdir(directory)
+    assert 'recent' in os.listdir(directory)
+
+
+def test_cache_store_fails(bvh_file, tmp_path, monkeypatch):
+    directory = str(tmp_path / 'cache')
+    cache = BVHCache(directory)
+    store = BVHCache._store
+
+    def full_disk(entry, data):
+        os.makedirs(entry)
+        open(os.path.join(entry, 'motion.npy'), 'w').close()
+        raise OSError(28, 'No space left on device')
+    monkeypatch.setattr(BVHCache, '_store', staticmethod(full_disk))
+
+    data = BVHParser().parse(bvh_file)
+    assert np.array_equal(cache.parse(bvh_file).motion, data.motion)
+    # the partial entry is removed and not in the index
+    assert cache._load_index()['entries'] == {}
+    assert os.listdir(directory) == ['index.json']
+
+    monkeypatch.setattr(BVHCache, '_store', staticmethod(store))
+    cache.parse(bvh_file)
+    assert isinstance(cache.parse(bvh_file).motion, np.memmap)
+
+
+def test_cache_directory_not_writable(bvh_file, other_file):
+    # the cache directory can not be created below a file
+    cache = BVHCache(os.path.join(other_file, 'cache'))
+    data = cache.parse(bvh_file)
+    assert np.array_equal(data.motion, BVHParser().parse(bvh_file).motion)
+    assert os.path.isfile(other_file)
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from pymo.parsers import BVHParser
+from pymo.preprocessing import JointSelector
+
+
+@pytest.fixture
+def track(bvh_file):
+    return BVHParser().parse(bvh_file)
+
+
+def test_clone_shares_the_motion_until_it_is_changed(track, motion):
+    clone = track.clone()
+    assert np.shares_memory(clone.motion, track.motion)
+    # the shared motion is read-only, changes go through values (copy-on-write)
+    with pytest.raises(ValueError):
+        clone.motion[0, 0] = 1.0
+    with pytest.raises(ValueError):
+        track.motion[0, 0] = 1.0
+
+    clone.values.iloc[0, 0] = 1000.0
+    assert clone.motion[0, 0] == 1000.0
+    assert np.array_equal(track.motion, motion)
+    track.values.iloc[1, 1] = -1000.0
+    assert clone.motion[1, 1] == motion[1, 1]
+
+
+def test_clone_of_values(track, motion):
+    track.values.iloc[0, 0] = 5.0
+    clone = track.clone()
+    clone.values.iloc[0, 0] = 6.0
+    assert track.motion[0, 0] == 5.0
+    assert np.array_equal(track.motion[1:], motion[1:])
+
+
+def test_channel_index(track, motion):
+    assert track.channel_index[('Root', 'Xposition')] == 0
+    assert track.channel_index[('Finger2', 'Zrotation')] == 17
+    assert track.has_channels('Finger2', ('Xposition', 'Yposition', 'Zposition'))
+    assert not track.has_channels('Hand', ('Xposition',))
+    assert np.array_equal(track.channel('Hand', 'Yrotation'), motion[:, 7])
+    assert np.array_equal(track.joint_values('Finger1'), motion[:, 9:12])
+
+    # the index follows the columns of new values
+    track.values = track.values.iloc[:, 3:]
+    assert track.channel_index[('Root', 'Xrotation')] == 0
+    assert ('Root', 'Xposition') not in track.channel_index
+
+
+def test_clone_has_its_own_skeleton(track):
+    clone = track.clone()
+    assert clone.topology is track.topology
+
+    # in-place changes of the skeleton of the clone, as a transformer removing a joint and moving another
+    clone.skeleton['Finger1']['children'].remove('Finger1_Nub')
+    del clone.skeleton['Finger1_Nub']
+    clone.skeleton['Finger2']['offsets'][0] = 3.0
+    clone.invalidate_topology()
+
+    assert 'Finger1_Nub' in track.skeleton
+    assert track.skeleton['Finger2']['offsets'][0] == -0.5
+    assert 'Finger1_Nub' in track.topology.index
+    assert track.topology.offsets[track.topology.index['Finger2'], 0] == -0.5
+
+    # the topology of the clone is compiled again for the changed skeleton
+    assert 'Finger1_Nub' not in clone.topology.index
+    assert clone.topology.offsets[clone.topology.index['Finger2'], 0] == 3.0
+    assert list(clone.traverse()) == list(clone.topology.joints)
+    assert len(clone.topology) == len(track.topology) - 1
+
+
+def test_topology_is_compiled_once(track):
+    topology = track.topology
+    assert track.topology is topology
+    # the topology is only compiled again when a skeleton or root is assigned
+    track.skeleton = dict(track.skeleton)
+    assert track.topology is not topology
+    assert track.topology.joints == topology.joints
+    track.root_name = 'Hand'
+    assert track.topology.joints == ('Hand', 'Finger2', 'Finger2_Nub', 'Finger1', 'Finger1_Nub')
+
+
+def test_joint_selector(track):
+    selected = JointSelector(['Hand', 'Finger1'], include_root=True).fit_transform([track])[0]
+    assert set(selected.skeleton) == {'Root', 'Hand', 'Finger1'}
+    assert set(selected.topology.joints) == {'Root', 'Hand', 'Finger1'}
+    assert selected.columns == [column for column in track.columns if column.rsplit('_', 1)[0] != 'Finger2']
+    assert len(track.topology) == 6
@@ -0,0 +1,85 @@
+import numpy as np
+
+from FrameGate import FrameGate
+from LeapFrame import FRAME_DTYPE, RecordedFrame
+
+# 100 frames per second from the device, 30 frames per second recorded
+DEVICE_INTERVAL = 10000
+
+
+def records(hands):
+    '''Frames of the device, hands: True for every frame with a right hand'''
+    frames = np.zeros(len(hands), dtype=FRAME_DTYPE)
+    frames['id'] = np.arange(len(hands))
+    frames['timestamp'] = 1000000 + np.arange(len(hands)) * DEVICE_INTERVAL
+    frames['hands'] = hands
+    frames['right']['is_valid'] = hands
+    frames['right']['is_right'] = hands
+    frames['right']['fingers'] = np.where(hands, 5, 0)
+    return frames
+
+
+class Controller:
+    '''The frames of the device up to index, with the history of the SDK'''
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.index = -1
+
+    def frame(self, history=0):
+        index = self.index - history
+        if index < 0 or history >= 60:
+            return RecordedFrame.invalid()
+        return RecordedFrame(self.frames[index])
+
+
+def received(frames):
+    '''Ids of the frames passed when every frame is received (LeapRecord.on_frame)'''
+    gate = FrameGate(30, ['right'])
+    passed = []
+    for record in frames:
+        if gate.due(int(record['timestamp'])):
+            gate.passed(record)
+            passed.append(int(record['id']))
+    return passed
+
+
+def polled(frames, every):
+    '''Ids of the frames passed when the controller is polled after every n-th frame (LeapRecord.poll_frame)'''
+    gate = FrameGate(30, ['right'])
+    controller = Controller(frames)
+    passed = []
+    for index in range(len(frames)):
+        controller.index = index
+        if index % every != every - 1 and index != len(frames) - 1:
+            continue
+        # all frames of the history which are due, one per poll
+        frame = gate.history_frame(controller)
+        while frame:
+            gate.passed(frame.record)
+            passed.append(frame.id)
+            frame = gate.history_frame(controller)
+    return passed
+
+
+def test_received_frames_are_decimated():
+    assert received(records([True] * 12)) == [0, 4, 8]
+
+
+def test_frames_without_hand_do_not_take_the_slot():
+    # frame 4 without hand is passed for the status messages, the hand of frame 5 is not discarded
+    hands = [True, False, False, False, False, True, True, True, True, True, True]
+    assert received(records(hands)) == [0, 4, 5, 9]
+
+
+def test_polled_frames_are_the_received_frames():
+    rng = np.random.default_rng(5)
+    frames = records(np.repeat(rng.random(40) < 0.7, 5))
+    for every in (1, 2, 3, 7):
+        assert polled(frames, every) == received(frames), every
+
+
+def test_polled_frames_are_passed_once():
+    frames = records([False] * 20)
+    assert polled(frames, 4) == list(range(20))
+    assert polled(frames, 1) == list(range(20))
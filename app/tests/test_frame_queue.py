@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+from FrameQueue import FrameQueue
+
+
+def drain(queue):
+    frames = []
+    while len(queue):
+        frames.append(queue.get(timeout=1))
+    return frames
+
+
+def test_queue_drop_oldest():
+    queue = FrameQueue(maxsize=3, overflow=FrameQueue.DROP_OLDEST)
+    assert all(queue.put(i) for i in range(5))
+    assert queue.dropped == 2
+    assert drain(queue) == [2, 3, 4]
+    assert queue.processed == 3
+
+
+def test_queue_drop_newest():
+    queue = FrameQueue(maxsize=3, overflow=FrameQueue.DROP_NEWEST)
+    assert [queue.put(i) for i in range(5)] == [True, True, True, False, False]
+    assert queue.dropped == 2
+    assert drain(queue) == [0, 1, 2]
+
+
+def test_queue_block_waits_for_the_consumer():
+    queue = FrameQueue(maxsize=2, overflow=FrameQueue.BLOCK)
+    producer = threading.Thread(target=lambda: [queue.put(i) for i in range(50)])
+    producer.start()
+    frames = [queue.get(timeout=5) for _ in range(50)]
+    producer.join(5)
+    assert frames == list(range(50))
+    assert queue.dropped == 0
+
+
+def test_queue_close_drains_and_wakes_up():
+    queue = FrameQueue(maxsize=4)
+    queue.put(1)
+    queue.close()
+    assert not queue.put(2)
+    assert queue.get() == 1
+    assert queue.get() is None
+
+    # a blocked producer is woken up by close() and its frame is not queued
+    queue = FrameQueue(maxsize=1, overflow=FrameQueue.BLOCK)
+    queue.put(1)
+    results = []
+    producer = threading.Thread(target=lambda: results.append(queue.put(2)))
+    producer.start()
+    queue.close()
+    producer.join(5)
+    assert results == [False]
+    assert queue.get() == 1
+    assert queue.get() is None
+
+
+def test_queue_get_timeout():
+    assert FrameQueue().get(timeout=0.01) is None
+
+
+def test_queue_invalid_arguments():
+    with pytest.raises(ValueError):
+        FrameQueue(overflow='drop_all')
+    with pytest.raises(ValueError):
+        FrameQueue(maxsize=0)
@@ -0,0 +1,104 @@
+import copy
+import threading
+
+import numpy as np
+import pytest
+
+from FrameQueue import FrameQueue
+from FrameRing import FrameRing
+from LeapFrame import FRAME_DTYPE
+
+
+def record(frame_id):
+    frame = np.zeros((), dtype=FRAME_DTYPE)
+    frame['id'] = frame_id
+    return frame
+
+
+def drain(queue):
+    frames = []
+    while len(queue):
+        frames.append(queue.get(timeout=1))
+    return frames
+
+
+def test_ring_invalid_arguments():
+    # frames in shared memory can not be dropped by the producer once they are written
+    with pytest.raises(ValueError):
+        FrameRing(overflow=FrameQueue.DROP_OLDEST)
+    with pytest.raises(ValueError):
+        FrameRing(capacity=0)
+
+
+@pytest.fixture
+def ring():
+    """Creates a ring and the consumer side of it, which keeps its own slot position as the converter process"""
+    rings = []
+    consumers = []
+
+    def create(*args, **kwargs):
+        rings.append(FrameRing(*args, **kwargs))
+        # attached again by name (see FrameRing.__setstate__), without owning the shared memory
+        consumers.append(copy.copy(rings[-1]))
+        consumers[-1]._owner_pid = None
+        return rings[-1], consumers[-1]
+    yield create
+    for r in consumers + rings:
+        r.release()
+
+
+def test_ring_drop_newest(ring):
+    frames, consumer = ring(capacity=3, overflow=FrameRing.DROP_NEWEST)
+    assert [frames.put(record(i)) for i in range(5)] == [True, True, True, False, False]
+    assert frames.dropped == 2
+    assert len(consumer) == 3
+    assert [int(frame['id']) for frame in drain(consumer)] == [0, 1, 2]
+    # the slots are reused after the frames were consumed
+    assert frames.put(record(5))
+    assert frames.put(record(6))
+    assert [int(frame['id']) for frame in drain(consumer)] == [5, 6]
+    assert frames.processed == frames.written == 5
+
+
+def test_ring_block_waits_for_the_consumer(ring):
+    frames, consumer = ring(capacity=2, overflow=FrameRing.BLOCK)
+    producer = threading.Thread(target=lambda: [frames.put(record(i)) for i in range(50)])
+    producer.start()
+    ids = [int(consumer.get(timeout=5)['id']) for _ in range(50)]
+    producer.join(5)
+    assert ids == list(range(50))
+    assert frames.dropped == 0
+
+
+def test_ring_close_drains_and_wakes_up(ring):
+    frames, consumer = ring(capacity=4)
+    frames.put(record(1))
+    frames.put(record(2))
+    frames.close()
+    frames.close()
+    assert consumer.closed
+    assert not frames.put(record(3))
+    assert [int(frame['id']) for frame in drain(consumer)] == [1, 2]
+    # the permit of close() is kept, every later call returns None without waiting
+    assert consumer.get() is None
+    assert consumer.get() is None
+
+    frames, consumer = ring(capacity=1, overflow=FrameRing.BLOCK)
+    frames.put(record(1))
+    results = []
+    producer = threading.Thread(target=lambda: results.append(frames.put(record(2))))
+    producer.start()
+    frames.close()
+    producer.join(5)
+    assert results == [False]
+    assert int(consumer.get(timeout=1)['id']) == 1
+    assert consumer.get() is None
+
+
+def test_ring_release_keeps_the_counters(ring):
+    frames, consumer = ring(capacity=2)
+    frames.put(record(1))
+    consumer.get(timeout=1)
+    frames.put(record(2))
+    frames.release()
+    assert (frames.processed, frames.written) == (1, 2)
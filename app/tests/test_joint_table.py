@@ -0,0 +1,77 @@
+import re
+
+import pytest
+
+from config.JointTable import BASIS_ARM, BASIS_BONE, BASIS_HAND, BASIS_ROOT, CHANNEL_KIND, POINT_ELBOW, \
+    POINT_NEXT_JOINT, POINT_ORIGIN, POINT_PREV_JOINT, POINT_WRIST, JointTable
+from config.Skeleton import Skeleton
+from LeapFrame import FINGER_TYPE, bone_index
+
+
+def expected_basis(joint_name, root_name):
+    '''Index of the basis of a joint in the stacked bases, None for the finger tips (no rotation)'''
+    if joint_name == root_name:
+        return BASIS_ROOT
+    if joint_name.endswith('Elbow'):
+        return BASIS_ARM
+    if joint_name.endswith('Hand'):
+        return BASIS_HAND
+    finger, number, nub = re.match(r'^(?:Right|Left)Hand([A-Za-z]+)(\d)(_Nub)?$', joint_name).groups()
+    return None if nub else BASIS_BONE + bone_index(FINGER_TYPE[finger], int(number) - 1)
+
+
+@pytest.mark.parametrize('hand', ['right', 'left'])
+@pytest.mark.parametrize('channel_setting', ['rotation', 'position'])
+def test_table_of_the_skeleton(hand, channel_setting):
+    setting = Skeleton(channel_setting, hand)
+    skeleton = setting.skeleton
+    for joint in skeleton.values():
+        joint['channels'] = [] if not joint['children'] else ['Xrotation', 'Yrotation', 'Zrotation']
+    table = JointTable(skeleton, setting.root_name)
+
+    assert table.names == tuple(skeleton)
+    assert len(table) == len(skeleton)
+    for joint_index, joint_name in enumerate(table.names):
+        parent_name = skeleton[joint_name]['parent']
+        assert table.parent[joint_index] == (-1 if parent_name is None else table.index[parent_name])
+
+        basis = expected_basis(joint_name, setting.root_name)
+        has_rotation = joint_name != setting.root_name and bool(skeleton[joint_name]['children'])
+        assert table.rotation_mask[joint_index] == has_rotation, joint_name
+        if basis is not None:
+            assert table.basis_index[joint_index] == basis, joint_name
+        if has_rotation:
+            # the basis of the parent is the one of the parent joint (the identity for the root)
+            assert table.parent_basis_index[joint_index] == expected_basis(parent_name, setting.root_name), joint_name
+
+    assert [table.channel_names[i] for i in range(len(table.channel_joint))] == \
+        [(joint_name, channel) for joint_name, joint in skeleton.items() for channel in joint['channels']]
+    assert list(table.channel_kind) == [CHANNEL_KIND[channel] for _, channel in table.channel_names]
+
+
+def test_offsets_of_the_right_hand():
+    setting = Skeleton('rotation')
+    table = JointTable(setting.skeleton, setting.root_name)
+
+    def offset(joint_name):
+        joint_index = table.index[joint_name]
+        return table.offset_head[joint_index], table.offset_tail[joint_index]
+
+    index = FINGER_TYPE['Index']
+    thumb = FINGER_TYPE['Thumb']
+    assert offset('Leap_Root') == (POINT_ORIGIN, POINT_ORIGIN)
+    assert offset('RightElbow') == (POINT_ELBOW, POINT_ORIGIN)
+    assert offset('RightHand') == (POINT_WRIST, POINT_ELBOW)
+    # the first joint of a finger (thumb: the second) is the vector from the wrist, the others the previous bone
+    assert offset('RightHandIndex1') == (POINT_PREV_JOINT + bone_index(index, 0), POINT_WRIST)
+    assert offset('RightHandThumb2') == (POINT_PREV_JOINT + bone_index(thumb, 1), POINT_WRIST)
+    assert offset('RightHandIndex3') == \
+        (POINT_NEXT_JOINT + bone_index(index, 1), POINT_PREV_JOINT + bone_index(index, 1))
+    assert offset('RightHandIndex4_Nub') == \
+        (POINT_NEXT_JOINT + bone_index(index, 3), POINT_PREV_JOINT + bone_index(index, 3))
+
+
+def test_unknown_joint():
+    with pytest.raises(Exception):
+        JointTable({'Root': {'parent': None, 'children': ['RightHandSixth1']},
+                    'RightHandSixth1': {'parent': 'Root', 'children': []}}, 'Root')
@@ -0,0 +1,137 @@
+import numpy as np
+import pytest
+
+from pymo.kinematics import ForwardKinematics
+from pymo.parsers import BVHParser
+from pymo.preprocessing import MocapParameterizer
+from pymo.rotation_tools import (Rotation, euler2rotmat, expmap2quat, expmap2rotmat, quat2expmap, quat2rotmat,
+                                 rotmat2euler, rotmat2expmap, rotmat2quat)
+
+
+def reference_positions(track):
+    '''Positions of every joint, frame by frame and joint by joint (as the former MocapParameterizer._to_pos)'''
+    values = track.values
+    rotmats, positions = {}, {}
+    for joint in track.traverse():
+        parent = track.skeleton[joint]['parent']
+
+        def channels(kind):
+            names = ['%s_%s%s' % (joint, axis, kind) for axis in 'XYZ']
+            if all(name in values.columns for name in names):
+                return values[names].values
+            return np.zeros((len(values), 3))
+        eulers, offsets = channels('rotation'), channels('position')
+        joint_rotmats = [Rotation(euler, 'euler', from_deg=True).rotmat for euler in eulers]
+        if joint == track.root_name:
+            rotmats[joint] = joint_rotmats
+            positions[joint] = offsets
+        else:
+            rotmats[joint] = [np.matmul(joint_rotmats[i], rotmats[parent][i]) for i in range(len(values))]
+            k = offsets + track.skeleton[joint]['offsets']
+            positions[joint] = np.asarray([np.matmul(k[i], rotmats[parent][i]) + positions[parent][i]
+                                           for i in range(len(values))])
+    return positions
+
+
+def test_forward_kinematics_matches_the_per_joint_loop(bvh_file):
+    track = BVHParser().parse(bvh_file)
+    expected = reference_positions(track)
+
+    fk = ForwardKinematics(track)
+    positions = fk.positions()
+    assert positions.shape == (len(track.motion), len(fk.joints), 3)
+    for i, joint in enumerate(fk.joints):
+        assert np.allclose(positions[:, i], expected[joint], rtol=0, atol=1e-10), joint
+
+
+def test_positions_of_a_subset(bvh_file):
+    track = BVHParser().parse(bvh_file)
+    expected = reference_positions(track)
+    fk = ForwardKinematics(track)
+    positions = fk.positions(['Finger1_Nub', 'Hand'])
+    assert np.allclose(positions[:, 0], expected['Finger1_Nub'], rtol=0, atol=1e-10)
+    assert np.allclose(positions[:, 1], expected['Hand'], rtol=0, atol=1e-10)
+    # only the joints and their ancestors are computed
+    computed = [joint for joint, has_position in zip(fk.joints, fk._has_position) if has_position]
+    assert sorted(computed) == ['Finger1', 'Finger1_Nub', 'Hand', 'Root']
+
+    # joints computed one after the other reuse the chains computed before
+    for joint in ('Finger2_Nub', 'Hand', 'Finger2', 'Root'):
+        assert np.allclose(fk.position(joint), expected[joint], rtol=0, atol=1e-10), joint
+    assert fk._has_position.all()
+
+
+def test_position_parameterizer(bvh_file):
+    track = BVHParser().parse(bvh_file)
+    expected = reference_positions(track)
+    positions = MocapParameterizer('position').fit_transform([track])[0]
+    for joint in track.traverse():
+        columns = ['%s_%sposition' % (joint, axis) for axis in 'XYZ']
+        assert np.allclose(positions.values[columns].values, expected[joint], rtol=0, atol=1e-10), joint
+
+
+def test_position_parameterizer_joints(bvh_file):
+    track = BVHParser().parse(bvh_file)
+    expected = reference_positions(track)
+    positions = MocapParameterizer('position', joints=['Finger2_Nub', 'Hand']).fit_transform([track])[0]
+    assert positions.columns == ['Finger2_Nub_Xposition', 'Finger2_Nub_Yposition', 'Finger2_Nub_Zposition',
+                                 'Hand_Xposition', 'Hand_Yposition', 'Hand_Zposition']
+    assert np.allclose(positions.motion[:, :3], expected['Finger2_Nub'], rtol=0, atol=1e-10)
+    assert np.allclose(positions.motion[:, 3:], expected['Hand'], rtol=0, atol=1e-10)
+
+
+@pytest.fixture
+def eulers():
+    rng = np.random.default_rng(11)
+    return rng.uniform(-89.0, 89.0, size=(200, 3))
+
+
+def test_euler_rotmat(eulers):
+    rotmats = euler2rotmat(eulers, from_deg=True)
+    expected = np.array([Rotation(euler, 'euler', from_deg=True).rotmat for euler in eulers])
+    assert np.allclose(rotmats, expected, rtol=0, atol=1e-12)
+    assert np.allclose(rotmat2euler(rotmats, use_deg=True), eulers, rtol=0, atol=1e-9)
+    assert euler2rotmat(eulers.reshape(20, 10, 3)).shape == (20, 10, 3, 3)
+
+
+def test_expmap_quat_round_trip(eulers):
+    rotmats = euler2rotmat(eulers)
+    expmaps = rotmat2expmap(rotmats)
+    expected = np.array([Rotation(euler, 'euler', from_deg=True).to_expmap() for euler in eulers])
+    assert np.allclose(expmaps, expected, rtol=0, atol=1e-9)
+
+    quats = expmap2quat(expmaps)
+    assert np.allclose(np.linalg.norm(quats, axis=-1), 1)
+    assert np.allclose(quat2expmap(quats), expmaps, rtol=0, atol=1e-12)
+    assert np.allclose(quat2rotmat(quats), rotmats, rtol=0, atol=1e-12)
+    assert np.allclose(expmap2rotmat(expmaps), rotmats, rtol=0, atol=1e-12)
+    expected = np.array([Rotation(expmap, 'expmap').rotmat for expmap in expmaps])
+    assert np.allclose(expmap2rotmat(expmaps), expected, rtol=0, atol=1e-12)
+
+    # w >= 0, q and -q are the same rotation
+    quats = rotmat2quat(rotmats)
+    assert (quats[:, 0] >= 0).all()
+    assert np.allclose(quat2rotmat(quats), rotmats, rtol=0, atol=1e-12)
+    assert np.allclose(rotmat2quat(quat2rotmat(-quats)), quats, rtol=0, atol=1e-12)
+
+
+def test_zero_and_half_turn_rotations():
+    expmaps = np.array([[0.0, 0.0, 0.0], [np.pi, 0.0, 0.0], [0.0, 0.0, -np.pi + 1e-9]])
+    rotmats = expmap2rotmat(expmaps)
+    assert np.allclose(rotmats[0], np.eye(3))
+    assert np.allclose(expmap2rotmat(rotmat2expmap(rotmats)), rotmats, rtol=0, atol=1e-7)
+    assert np.array_equal(quat2expmap(expmap2quat(expmaps[:1])), expmaps[:1])
+
+
+def test_expmap_parameterizer_round_trip(bvh_file):
+    track = BVHParser().parse(bvh_file)
+    parameterizer = MocapParameterizer('expmap')
+    expmaps = parameterizer.fit_transform([track])
+    eulers = parameterizer.inverse_transform(expmaps)[0]
+    # the Euler angles may differ, the rotations and the root position are the same
+    for joint in ('Root', 'Hand', 'Finger1'):
+        columns = ['%s_%srotation' % (joint, axis) for axis in 'XYZ']
+        assert np.allclose(euler2rotmat(eulers.values[columns].values), euler2rotmat(track.values[columns].values),
+                           rtol=0, atol=1e-10)
+    columns = ['Root_%sposition' % axis for axis in 'XYZ']
+    assert np.allclose(eulers.values[columns].values, track.values[columns].values)
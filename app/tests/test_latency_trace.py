@@ -0,0 +1,89 @@
+import json
+import time
+
+import numpy as np
+import pytest
+
+from LatencyTrace import LatencyTrace
+
+# 100 enqueued frames, one per millisecond, with a capture latency of id * 0.1 ms
+IDS = np.arange(1, 101)
+
+
+@pytest.fixture
+def trace(monkeypatch):
+    '''Trace of the listener with the enqueued frames, enqueued at id milliseconds'''
+    clock = iter(IDS * 1000000)
+    monkeypatch.setattr(time, 'perf_counter_ns', lambda: next(clock))
+    trace = LatencyTrace(capacity=4)
+    for frame_id in IDS:
+        timestamp = 1000000 + frame_id * 10000
+        trace.enqueue(frame_id, timestamp, timestamp + frame_id * 100, frame_id % 4)
+    monkeypatch.undo()
+    return trace
+
+
+def pipeline(ids, hand, queue_ms, conversion_ms):
+    '''Trace of a conversion pipeline, every frame waits queue_ms in the queue and takes conversion_ms'''
+    trace = LatencyTrace(capacity=4)
+    for frame_id in ids:
+        started = frame_id * 1000000 + int(queue_ms * 1e6)
+        trace.convert(frame_id, hand, started, started + int(conversion_ms * 1e6))
+    return trace
+
+
+def test_enqueued_frames(trace):
+    assert len(trace.enqueued) == 100
+    assert list(trace.enqueued['capture_us'][:3]) == [100, 200, 300]
+    assert list(trace.enqueued['enqueued_ns'][:3]) == [1000000, 2000000, 3000000]
+    assert not len(trace.converted)
+
+
+def test_summary_of_the_merged_pipelines(trace, tmp_path):
+    trace.discard()
+    trace.discard(3)
+    trace.merge(pipeline(IDS[1::2], 'right', 2, 0.5))
+    # a frame of the left hand which was never enqueued is not matched
+    trace.merge(pipeline(np.append(IDS, 1000), 'left', 1, 0.25))
+    assert len(trace.converted) == 50 + 101
+
+    filename = str(tmp_path / 'trace' / 'latency.json')
+    trace.write(filename)
+    with open(filename) as f:
+        summary = json.load(f)
+    assert summary == json.loads(json.dumps(trace.summary()))
+
+    assert summary['frames'] == {'enqueued': 100, 'discarded_by_fps_gate': 4,
+                                 'converted': {'right': 50, 'left': 100}}
+    latency = summary['latency_ms']
+    assert latency['capture'] == pytest.approx({'p50': 5.05, 'p95': 9.505, 'p99': 9.901, 'mean': 5.05, 'max': 10})
+    assert latency['queue']['right'] == pytest.approx(dict.fromkeys(['p50', 'p95', 'p99', 'mean', 'max'], 2))
+    assert latency['queue']['left'] == pytest.approx(dict.fromkeys(['p50', 'p95', 'p99', 'mean', 'max'], 1))
+    assert latency['conversion']['right']['max'] == pytest.approx(0.5)
+    assert latency['conversion']['left']['max'] == pytest.approx(0.25)
+    # capture (even ids) + queue + conversion
+    assert latency['total']['right'] == pytest.approx({'p50': 7.6, 'p95': 12.01, 'p99': 12.402,
+                                                       'mean': 7.6, 'max': 12.5})
+    assert latency['total']['left']['max'] == pytest.approx(11.25)
+
+    histogram = summary['histogram_ms']
+    assert histogram['edges'][-1] is None
+    assert histogram['capture'] == [4, 5, 10, 30, 50, 1, 0, 0, 0, 0, 0, 0]
+    assert histogram['queue'] == {'right': [0, 0, 0, 50, 0, 0, 0, 0, 0, 0, 0, 0],
+                                  'left': [0, 0, 100, 0, 0, 0, 0, 0, 0, 0, 0, 0]}
+    assert sum(histogram['total']['left']) == 100
+
+    depth = summary['queue_depth']
+    assert (depth['p50'], depth['max']) == (1.5, 3)
+    assert depth['series'][0] == [0.0, 1]
+    assert depth['series'][-1] == pytest.approx([0.099, 0])
+
+
+def test_summary_without_frames():
+    trace = LatencyTrace()
+    trace.discard(2)
+    trace.merge(pipeline([1, 2], 'right', 1, 1))
+    summary = trace.summary()
+    assert summary['frames'] == {'enqueued': 0, 'discarded_by_fps_gate': 2, 'converted': {}}
+    assert summary['latency_ms'] == {'capture': None}
+    assert summary['queue_depth'] is None
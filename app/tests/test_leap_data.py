@@ -0,0 +1,216 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from config.AnybodyFirstFrame import AnybodyFirstFrame
+from LeapData import LeapData
+from LeapFrame import FRAME_DTYPE, bone_index
+from RotationUtil import RAD_TO_DEG, _rot2eul
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FINGERS = ['Thumb', 'Index', 'Middle', 'Ring', 'Pinky']
+# channels which change their sign when mirroring at the yz-plane (see LeapData.MIRROR_COLUMNS)
+MIRROR_CHANNELS = ['Xposition', 'Yrotation', 'Zrotation']
+
+
+@pytest.fixture(autouse=True)
+def app_directory(monkeypatch):
+    # the reference values are loaded from config/*.json
+    monkeypatch.chdir(APP_DIR)
+
+
+def rotations(rng, count):
+    quats = rng.normal(size=(count, 4))
+    quats /= np.linalg.norm(quats, axis=-1, keepdims=True)
+    w, x, y, z = quats.T
+    return np.stack([
+        np.stack([1 - 2*(y**2 + z**2), 2*(x*y - z*w), 2*(x*z + y*w)], axis=-1),
+        np.stack([2*(x*y + z*w), 1 - 2*(x**2 + z**2), 2*(y*z - x*w)], axis=-1),
+        np.stack([2*(x*z - y*w), 2*(y*z + x*w), 1 - 2*(x**2 + y**2)], axis=-1)], axis=-2)
+
+
+def frames(count, seed=4, hand='right'):
+    '''Snapshot records of a hand with random bases and joint positions, 100 frames per second'''
+    rng = np.random.default_rng(seed)
+    records = np.zeros(count, dtype=FRAME_DTYPE)
+    records['id'] = np.arange(count) + 1
+    records['timestamp'] = 1000000 + np.arange(count) * 10000
+    records['hands'] = 1
+    records[hand]['is_valid'] = True
+    records[hand]['is_' + hand] = True
+    records[hand]['fingers'] = 5
+    records[hand]['elbow_position'] = rng.normal(scale=100, size=(count, 3))
+    records[hand]['wrist_position'] = rng.normal(scale=100, size=(count, 3))
+    records[hand]['prev_joint'] = rng.normal(scale=100, size=(count, 20, 3))
+    records[hand]['next_joint'] = rng.normal(scale=100, size=(count, 20, 3))
+    records[hand]['arm_basis'] = rotations(rng, count)
+    records[hand]['basis'] = rotations(rng, count)
+    records[hand]['bone_basis'] = rotations(rng, count * 20).reshape(count, 20, 3, 3)
+    return records
+
+
+def split_key(joint_name):
+    '''Finger and joint number (5 for the finger tip) of a finger joint, i.e. RightHandIndex4_Nub -> Index, 5'''
+    key = re.split(r'(\d)', joint_name)
+    return key[0].replace('RightHand', ''), 5 if key[-1] == '_Nub' else int(key[1])
+
+
+def basis(hand, joint_name, root_name):
+    if joint_name == root_name:
+        return np.identity(3)
+    if joint_name == 'RightElbow':
+        return hand['arm_basis'].astype(np.float64)
+    if joint_name == 'RightHand':
+        return hand['basis'].astype(np.float64)
+    finger, number = split_key(joint_name)
+    return hand['bone_basis'][bone_index(FINGERS.index(finger), number - 1)].astype(np.float64)
+
+
+def offset(hand, joint_name, root_name):
+    if joint_name == root_name:
+        return np.zeros(3)
+    if joint_name == 'RightElbow':
+        return hand['elbow_position'].astype(np.float64)
+    if joint_name == 'RightHand':
+        return hand['wrist_position'].astype(np.float64) - hand['elbow_position']
+    finger, number = split_key(joint_name)
+    if number == 1 or (finger == 'Thumb' and number == 2):
+        return hand['prev_joint'][bone_index(FINGERS.index(finger), number - 1)].astype(np.float64) - \
+            hand['wrist_position']
+    bone = bone_index(FINGERS.index(finger), number - 2)
+    return hand['next_joint'][bone].astype(np.float64) - hand['prev_joint'][bone]
+
+
+def reference_values(leap_data, hand, first_hand, firstframe=False):
+    '''Channel values of a frame of the right hand, joint by joint (as LeapData before the batched conversion)'''
+    skeleton = leap_data._skeleton
+    root_name = leap_data._root_name
+    anybody = AnybodyFirstFrame()
+
+    def initial_basis(joint_name):
+        if not leap_data.anybody_basis:
+            return basis(first_hand, joint_name, root_name)
+        return np.identity(3) if joint_name == root_name else anybody.get_basis(joint_name)
+
+    values = []
+    for joint_name, joint in skeleton.items():
+        position = offset(hand, joint_name, root_name)
+        if firstframe and leap_data.anybody_basis and joint_name != root_name:
+            parent_name = joint['parent']
+            parent = np.zeros(3) if parent_name == root_name else anybody.get_position(parent_name)
+            direction = anybody.get_position(joint_name) - parent
+            position = direction / np.linalg.norm(direction) * np.linalg.norm(position)
+        elif firstframe and joint_name == root_name:
+            position = np.zeros(3)
+
+        rotation = np.zeros(3)
+        if joint_name != root_name and joint['children']:
+            parent_name = joint['parent']
+            rot = np.matmul(np.matmul(initial_basis(joint_name), np.transpose(basis(hand, joint_name, root_name))),
+                            np.transpose(np.matmul(initial_basis(parent_name),
+                                                   np.transpose(basis(hand, parent_name, root_name)))))
+            rotation = _rot2eul(rot) * RAD_TO_DEG
+
+        for channel in joint['channels']:
+            axis = 'XYZ'.index(channel[0])
+            values.append(position[axis] if 'position' in channel else rotation[axis])
+    return np.array(values)
+
+
+def convert(records, **kwargs):
+    leap_data = LeapData(**kwargs)
+    for record in records:
+        leap_data.add_frame(record)
+    return leap_data, leap_data.parse()
+
+
+@pytest.mark.parametrize('anybody_basis', [False, True])
+@pytest.mark.parametrize('channel_setting', ['rotation', 'position'])
+def test_conversion_matches_the_per_joint_computation(anybody_basis, channel_setting):
+    records = frames(6)
+    leap_data, data = convert(records, channel_setting=channel_setting, anybody_basis=anybody_basis)
+
+    assert data.motion.shape == (6, len(leap_data._motion_channels))
+    # the time index holds the timestamp deltas of the device
+    assert list(data.time_index) == list(pd.to_timedelta(np.arange(6) * 10000, unit='s'))
+    for i, record in enumerate(records):
+        expected = reference_values(leap_data, record['right'], records[0]['right'], firstframe=i == 0)
+        assert np.allclose(data.motion[i], expected, rtol=0, atol=1e-9), i
+    # the offsets of the skeleton are those of the first frame
+    for joint_name, joint in data.skeleton.items():
+        channels = [j for j, (name, _) in enumerate(leap_data._motion_channels) if name == joint_name]
+        if 'Xposition' in joint['channels']:
+            assert np.allclose(joint['offsets'], data.motion[0, channels[:3]]), joint_name
+
+
+@pytest.mark.parametrize('anybody_basis', [False, True])
+def test_initial_bases_are_taken_once(anybody_basis):
+    records = frames(5)
+    leap_data = LeapData(anybody_basis=anybody_basis)
+    leap_data.add_frame(records[0])
+
+    # later frames neither read the first frame nor the reference bases again
+    calls = []
+    get_basis = leap_data.anybody_first_frame.get_basis
+    leap_data.anybody_first_frame.get_basis = lambda joint_name: calls.append(joint_name) or get_basis(joint_name)
+    first_hand = records[0]['right'].copy()
+    leap_data.first_frame['right']['basis'] = np.identity(3)
+    leap_data.first_frame['right']['bone_basis'] = np.identity(3)
+    for record in records[1:]:
+        leap_data.add_frame(record)
+    data = leap_data.parse()
+
+    assert calls == []
+    for i, record in enumerate(records[1:], 1):
+        assert np.allclose(data.motion[i], reference_values(leap_data, record['right'], first_hand),
+                           rtol=0, atol=1e-9), i
+
+
+def mirrored(records):
+    '''Left hand records of the mirror image (x -> -x) of the right hand records'''
+    left = np.zeros(len(records), dtype=FRAME_DTYPE)
+    for name in ('id', 'timestamp', 'hands'):
+        left[name] = records[name]
+    left['left'] = records['right']
+    hand = left['left']
+    hand['is_right'] = False
+    hand['is_left'] = True
+    for name in ('elbow_position', 'wrist_position', 'prev_joint', 'next_joint'):
+        hand[name][..., 0] *= -1
+    # the bases of the left hand are left-handed, the x-axis is turned round
+    for name in ('arm_basis', 'basis', 'bone_basis'):
+        hand[name][..., 0, :] *= -1
+    left['left'] = hand
+    return left
+
+
+@pytest.mark.parametrize('anybody_basis', [False, True])
+def test_left_hand_is_the_mirrored_right_hand(anybody_basis):
+    records = frames(6)
+    right_data, right = convert(records, anybody_basis=anybody_basis)
+    left_data, left = convert(mirrored(records), anybody_basis=anybody_basis, hand='left')
+
+    assert left_data.first_frame is not None
+    assert [name.replace('Left', 'Right', 1) for name, _ in left_data._motion_channels] == \
+        [name for name, _ in right_data._motion_channels]
+    assert all(name.startswith('Left') for name in left.skeleton if name != left.root_name)
+    sign = np.array([-1 if channel in MIRROR_CHANNELS else 1 for _, channel in left_data._motion_channels])
+    assert np.allclose(left.motion, right.motion * sign, rtol=0, atol=1e-9)
+
+
+def test_only_valid_hands_of_the_recorded_side_are_converted():
+    records = frames(4)
+    records['right']['is_valid'][1] = False
+    records['right']['fingers'][2] = 0
+    leap_data, data = convert(records)
+    # the first and the last frame
+    assert data.motion.shape[0] == 2
+    assert list(data.time_index) == list(pd.to_timedelta([0, 30000], unit='s'))
+
+    # a right hand is not recorded as a left hand
+    leap_data = LeapData(hand='left')
+    assert [leap_data.add_frame(record) for record in records] == [None] * 4
+    assert leap_data.first_frame is None
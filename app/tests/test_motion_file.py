@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from MotionFile import MotionFile
+from pymo.parsers import BVHParser
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_motion_file_round_trip(bvh_file, tmp_path, compress):
+    data = BVHParser().parse(bvh_file)
+    filename = str(tmp_path / 'hand.motion')
+    MotionFile.write(filename, data, dtype='float64', compress=compress, metadata={'hand': 'right'},
+                     chunk_frames=16)
+    assert MotionFile.is_motion_file(filename)
+    assert MotionFile.read_header(filename)['metadata'] == {'hand': 'right'}
+
+    motion = MotionFile.read(filename)
+    assert np.array_equal(motion.motion, data.motion)
+    assert np.array_equal(motion.time_index.values, data.time_index.values)
+    assert motion.columns == data.columns
+    assert motion.channel_names == data.channel_names
+    assert motion.skeleton == data.skeleton
+    assert motion.root_name == data.root_name
+    assert motion.framerate == data.framerate
+
+
+def test_motion_file_float32(bvh_file, tmp_path):
+    data = BVHParser().parse(bvh_file)
+    filename = str(tmp_path / 'hand.motion')
+    MotionFile.write(filename, data)
+    motion = MotionFile.read(filename)
+    assert motion.motion.dtype == np.float32
+    assert np.allclose(motion.motion, data.motion, rtol=1e-6, atol=0)
+
+
+def test_not_a_motion_file(bvh_file):
+    assert not MotionFile.is_motion_file(bvh_file)
+    with pytest.raises(ValueError):
+        MotionFile.read(bvh_file)
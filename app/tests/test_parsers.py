@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+import pytest
+
+from pymo.parsers import BVHParser, BVHReader
+
+
+def truncate(filename):
+    '''Cuts the last frame in half, as an interrupted recording'''
+    with open(filename) as f:
+        contents = f.read().rstrip('\n')
+    last = contents.rindex('\n')
+    with open(filename, 'w') as f:
+        f.write(contents[:last + 1 + (len(contents) - last) // 2])
+
+
+@pytest.mark.parametrize('truncated', [False, True])
+def test_parse(bvh_file, motion, truncated):
+    if truncated:
+        truncate(bvh_file)
+        motion = motion[:-1]
+    data = BVHParser().parse(bvh_file)
+    assert np.array_equal(data.motion, motion)
+    assert data.columns[:4] == ['Root_Xposition', 'Root_Yposition', 'Root_Zposition', 'Root_Xrotation']
+    assert len(data.columns) == motion.shape[1]
+    assert data.framerate == pytest.approx(0.033333)
+    assert np.allclose(data.time_index.total_seconds(), np.arange(len(motion)) * 0.033333)
+
+    assert data.root_name == 'Root'
+    assert data.skeleton['Finger1']['parent'] == 'Hand'
+    assert data.skeleton['Hand']['children'] == ['Finger1', 'Finger2']
+    assert data.skeleton['Finger1']['offsets'] == [0.5, 2.0, 0.25]
+    assert data.skeleton['Finger2']['channels'][0] == 'Xposition'
+
+
+def chunks(filename, frames_per_chunk):
+    blocks = list(BVHParser().iter_chunks(filename, frames_per_chunk=frames_per_chunk))
+    return (np.concatenate([block.motion for block in blocks]),
+            np.concatenate([block.time_index.values for block in blocks]), blocks)
+
+
+@pytest.mark.parametrize('truncated', [False, True])
+def test_iter_chunks(bvh_file, motion, truncated):
+    if truncated:
+        truncate(bvh_file)
+        motion = motion[:-1]
+    data = BVHParser().parse(bvh_file)
+    for frames_per_chunk in (7, len(motion), 1000):
+        values, times, blocks = chunks(bvh_file, frames_per_chunk)
+        assert [len(block.motion) for block in blocks[:-1]] == [frames_per_chunk] * (len(blocks) - 1)
+        assert np.array_equal(values, data.motion)
+        # the time index continues from block to block
+        assert np.array_equal(times, data.time_index.values)
+        assert all(block.columns == data.columns for block in blocks)
+        assert all(block.skeleton == data.skeleton for block in blocks)
+
+
+@pytest.mark.parametrize('truncated', [False, True])
+def test_reader(bvh_file, motion, truncated):
+    if truncated:
+        truncate(bvh_file)
+        motion = motion[:-1]
+    data = BVHParser().parse(bvh_file)
+    with BVHReader(bvh_file) as reader:
+        assert len(reader) == len(motion)
+        frames = reader.read_frames()
+        assert np.array_equal(frames.motion, data.motion)
+        assert np.array_equal(frames.time_index.values, data.time_index.values)
+        assert frames.columns == data.columns
+        part = reader.read_frames(5, 12)
+        assert np.array_equal(part.motion, data.motion[5:12])
+        assert np.array_equal(part.time_index.values, data.time_index.values[5:12])
+        assert np.array_equal(np.array(list(reader)), data.motion)
+
+
+def test_reader_persisted_index(bvh_file, motion):
+    with BVHReader(bvh_file, persist_index=True) as reader:
+        first = reader.read_frames(-3)
+    # the second reader loads the index stored next to the file
+    with BVHReader(bvh_file, persist_index=True) as reader:
+        assert np.array_equal(reader.read_frames(-3).motion, first.motion)
+    assert np.array_equal(first.motion, motion[-3:])
+    assert os.path.exists(bvh_file + '.idx')
+
+    # the index of a changed file is built again
+    truncate(bvh_file)
+    with BVHReader(bvh_file, persist_index=True) as reader:
+        assert len(reader) == len(motion) - 1
+        assert np.array_equal(reader.read_frames(-3).motion, motion[-4:-1])
@@ -0,0 +1,97 @@
+import json
+
+import numpy as np
+import pytest
+
+from LeapFrame import FRAME_DTYPE, HAND_DTYPE
+from RawLog import MAGIC, RawLogReader, RawLogWriter, _PREFIX, _V1_FRAME_DTYPE
+
+
+def records(count):
+    rng = np.random.default_rng(7)
+    frames = np.zeros(count, dtype=FRAME_DTYPE)
+    frames['id'] = np.arange(count) + 100
+    frames['timestamp'] = np.arange(count) * 16667
+    frames['hands'] = 2
+    for hand in ('right', 'left'):
+        frames[hand]['is_valid'] = True
+        frames[hand]['is_' + hand] = True
+        frames[hand]['fingers'] = 5
+        frames[hand]['prev_joint'] = rng.normal(size=frames[hand]['prev_joint'].shape)
+        frames[hand]['bone_basis'] = rng.normal(size=frames[hand]['bone_basis'].shape)
+    return frames
+
+
+def write(filename, frames, metadata=None):
+    with RawLogWriter(filename, metadata=metadata) as writer:
+        for frame in frames:
+            writer.write(frame)
+    return writer
+
+
+def test_round_trip(tmp_path):
+    filename = str(tmp_path / 'capture.rawlog')
+    frames = records(10)
+    writer = write(filename, frames, metadata={'hands': ['right', 'left']})
+    assert writer.frames == 10
+
+    reader = RawLogReader(filename)
+    assert reader.version == 2
+    assert reader.metadata == {'hands': ['right', 'left']}
+    assert len(reader) == 10
+    assert np.array_equal(np.asarray(reader[:]), frames)
+    assert np.array_equal(np.array(list(reader)), frames)
+    assert reader[3]['id'] == 103
+
+
+def test_empty_log(tmp_path):
+    filename = str(tmp_path / 'empty.rawlog')
+    write(filename, [])
+    reader = RawLogReader(filename)
+    assert len(reader) == 0
+    assert list(reader) == []
+
+
+def test_truncated_tail_is_ignored(tmp_path):
+    filename = str(tmp_path / 'interrupted.rawlog')
+    frames = records(5)
+    write(filename, frames)
+    # an interrupted recording leaves a part of the last record
+    with open(filename, 'ab') as f:
+        f.write(frames[0].tobytes()[:FRAME_DTYPE.itemsize // 2])
+
+    reader = RawLogReader(filename)
+    assert len(reader) == 5
+    assert np.array_equal(np.asarray(reader[:]), frames)
+
+
+def test_version_1_hand_in_the_right_slot(tmp_path):
+    filename = str(tmp_path / 'v1.rawlog')
+    frames = records(3)
+    old = np.zeros(3, dtype=_V1_FRAME_DTYPE)
+    old['id'] = frames['id']
+    old['timestamp'] = frames['timestamp']
+    old['hands'] = 1
+    old['hand'] = frames['right']
+    header = json.dumps({'version': 1, 'dtype': _V1_FRAME_DTYPE.newbyteorder('<').descr, 'metadata': {}}).encode()
+    with open(filename, 'wb') as f:
+        f.write(_PREFIX.pack(MAGIC, 1, _PREFIX.size + len(header)))
+        f.write(header)
+        f.write(old.tobytes())
+
+    reader = RawLogReader(filename)
+    assert reader.version == 1
+    assert reader[1]['right'] == frames[1]['right']
+    upgraded = np.array(list(reader))
+    assert upgraded.dtype == FRAME_DTYPE
+    assert np.array_equal(upgraded['right'], frames['right'])
+    assert np.array_equal(upgraded['left'], np.zeros(3, dtype=HAND_DTYPE))
+    assert np.array_equal(upgraded['id'], frames['id'])
+
+
+def test_not_a_raw_log(tmp_path):
+    filename = str(tmp_path / 'other.rawlog')
+    with open(filename, 'wb') as f:
+        f.write(b'HIERARCHY\nROOT Root\n')
+    with pytest.raises(ValueError):
+        RawLogReader(filename)
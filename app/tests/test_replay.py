@@ -0,0 +1,115 @@
+import threading
+import time
+
+import numpy as np
+
+from FrameGate import FrameGate
+from LeapFrame import FRAME_DTYPE
+from LeapReplay import ReplayController
+from RawLog import RawLogWriter
+
+# 100 frames per second in the log
+DEVICE_INTERVAL = 10000
+
+
+class LeapData:
+    '''Collects the converted frames'''
+
+    def __init__(self):
+        self.frames = []
+
+    def add_frame(self, frame):
+        self.frames.append(frame)
+
+
+class Listener:
+    '''Decimates the replayed frames like LeapRecord.on_frame'''
+
+    def __init__(self, frames_per_second):
+        self.gate = FrameGate(frames_per_second, ['right'])
+        self.leap_data = LeapData()
+        self.calls = []
+        self.histories = []
+
+    def on_init(self, controller):
+        self.calls.append('init')
+
+    def on_connect(self, controller):
+        self.calls.append('connect')
+
+    def on_exit(self, controller):
+        self.calls.append('exit')
+
+    def on_frame(self, controller):
+        frame = controller.frame()
+        self.histories.append((frame.id, controller.frame(1).id, controller.now()))
+        if self.gate.due(frame.timestamp):
+            self.gate.passed(frame.record)
+            self.leap_data.add_frame(frame.record)
+
+
+def raw_log(filename, count):
+    frames = np.zeros(count, dtype=FRAME_DTYPE)
+    frames['id'] = np.arange(count) + 1
+    frames['timestamp'] = 5000000 + np.arange(count) * DEVICE_INTERVAL
+    frames['hands'] = 1
+    frames['right']['is_valid'] = True
+    frames['right']['is_right'] = True
+    frames['right']['fingers'] = 5
+    with RawLogWriter(filename) as writer:
+        for frame in frames:
+            writer.write(frame)
+    return filename
+
+
+def replay(controller, listener):
+    controller.add_listener(listener)
+    assert controller.wait(10)
+    controller.remove_listener(listener)
+
+
+def test_replay_decimates_every_frame(tmp_path):
+    controller = ReplayController(raw_log(str(tmp_path / 'hand.rawlog'), 30))
+    listener = Listener(frames_per_second=30)
+    replay(controller, listener)
+
+    assert listener.calls == ['init', 'connect', 'exit']
+    # every frame of the log is delivered, every 4th frame (more than 1/30 s apart) is converted
+    assert len(listener.histories) == 30
+    assert [int(frame['id']) for frame in listener.leap_data.frames] == list(range(1, 31, 4))
+    # the history of the SDK and the clock of the recording
+    assert listener.histories[0] == (1, 0, 5000000)
+    assert listener.histories[5] == (6, 5, 5050000)
+
+
+def test_replay_in_real_time(tmp_path):
+    # 0.2 s of recording
+    controller = ReplayController(raw_log(str(tmp_path / 'hand.rawlog'), 21), realtime=True)
+    listener = Listener(frames_per_second=50)
+    started = time.perf_counter()
+    replay(controller, listener)
+
+    assert time.perf_counter() - started >= 0.19
+    assert len(listener.histories) == 21
+    assert [int(frame['id']) for frame in listener.leap_data.frames] == list(range(1, 22, 3))
+
+
+def test_replay_stops_when_the_listener_is_removed(tmp_path):
+    controller = ReplayController(raw_log(str(tmp_path / 'hand.rawlog'), 1000), realtime=True)
+    listener = Listener(frames_per_second=30)
+    controller.add_listener(listener)
+    threading.Event().wait(0.05)
+    controller.remove_listener(listener)
+
+    assert controller.finished.is_set()
+    assert 0 < len(listener.histories) < 1000
+    assert listener.calls[-1] == 'exit'
+
+
+def test_replay_of_an_empty_log(tmp_path):
+    controller = ReplayController(raw_log(str(tmp_path / 'empty.rawlog'), 0))
+    listener = Listener(frames_per_second=30)
+    replay(controller, listener)
+    assert listener.histories == []
+    assert not controller.frame().is_valid
+    assert controller.now() == 0
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+import RotationUtil
+from RotationUtil import ORDERS, _rot2eul, quat2mat, rot2eul_array
+
+
+def random_rotations(count, seed=2):
+    quats = np.random.default_rng(seed).normal(size=(count, 4))
+    quats /= np.linalg.norm(quats, axis=-1, keepdims=True)
+    return np.array([quat2mat(quat) for quat in quats])
+
+
+def gimbal_rotations(order):
+    '''Rotations in gimbal lock for the order (the row of the last axis is a unit vector of the first axis)'''
+    i, j, k = int(order[2]), int(order[1]), int(order[0])
+    rotations = []
+    for sign in (1.0, -1.0):
+        for angle in np.linspace(-np.pi, np.pi, 7):
+            rotmat = np.zeros((3, 3))
+            rotmat[i, k] = sign
+            rotmat[j, i], rotmat[j, j] = np.cos(angle), np.sin(angle)
+            rotmat[k, i], rotmat[k, j] = -np.sin(angle), np.cos(angle)
+            if np.linalg.det(rotmat) < 0:
+                rotmat[k] *= -1
+            rotations.append(rotmat)
+    return np.array(rotations)
+
+
+def special_rotations():
+    '''Identity and half turns around the axes'''
+    return np.array([np.eye(3), np.diag([1.0, -1.0, -1.0]), np.diag([-1.0, 1.0, -1.0]), np.diag([-1.0, -1.0, 1.0])])
+
+
+@pytest.mark.parametrize('name', sorted(ORDERS))
+def test_batched_euler_angles_match_the_scalar_conversion(name):
+    order = ORDERS[name]
+    rotmats = np.concatenate([random_rotations(500), gimbal_rotations(order), special_rotations()])
+    expected = np.array([_rot2eul(rotmat, order) for rotmat in rotmats])
+    assert np.allclose(rot2eul_array(rotmats, order), expected, rtol=0, atol=1e-12)
+    # any shape of the stack
+    assert np.allclose(rot2eul_array(rotmats[:500].reshape(25, 20, 3, 3), order), expected[:500].reshape(25, 20, 3),
+                       rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize('name', sorted(ORDERS))
+def test_gimbal_lock_is_detected(name):
+    order = ORDERS[name]
+    rotmats = gimbal_rotations(order)
+    i, j = int(order[2]), int(order[1])
+    assert (np.hypot(rotmats[:, i, i], rotmats[:, i, j]) <= RotationUtil.EPSILON).all()
+    # the angle of the first axis is 0 in gimbal lock
+    assert np.array_equal(rot2eul_array(rotmats, order)[:, int(order[0])], np.zeros(len(rotmats)))
+
+
+def test_default_order():
+    rotmats = random_rotations(10)
+    assert np.array_equal(rot2eul_array(rotmats), rot2eul_array(rotmats, RotationUtil.get_order()))
@@ -0,0 +1,49 @@
+import numpy as np
+
+from pymo.parsers import BVHParser
+from pymo.writers import BVHStreamWriter, BVHWriter
+
+
+def test_writer_round_trip(bvh_file, tmp_path):
+    data = BVHParser().parse(bvh_file)
+    filename = str(tmp_path / 'written.bvh')
+    with open(filename, 'w') as f:
+        BVHWriter().write(data, f)
+    written = BVHParser().parse(filename)
+    # the shortest exact representation is written by default
+    assert np.array_equal(written.motion, data.motion)
+    assert written.skeleton == data.skeleton
+    assert written.columns == data.columns
+    assert written.framerate == data.framerate
+
+
+def test_writer_precision(bvh_file, tmp_path):
+    data = BVHParser().parse(bvh_file)
+    filename = str(tmp_path / 'rounded.bvh')
+    with open(filename, 'w') as f:
+        BVHWriter(precision=2).write(data, f)
+    with open(filename) as f:
+        assert '%.2f' % data.motion[0, 0] in f.read()
+    assert np.array_equal(BVHParser().parse(filename).motion, np.round(data.motion, 2))
+def test_stream_writer_patches_the_frame_count(bvh_file, tmp_path):
+    data = BVHParser().parse(bvh_file)
+    filename = str(tmp_path / 'stream.bvh')
+    writer = BVHStreamWriter(filename, batch_size=8)
+    writer.begin(data)
+    # the frames are given in the order of the channel names, here the order of the file
+    for frame in data.motion[:21]:
+        writer.write_frame(frame)
+    assert writer.close()
+    assert writer.frames == 21
+
+    with open(filename) as f:
+        assert 'Frames: 21' in f.read()
+    parser = BVHParser()
+    written = parser.parse(filename)
+    assert parser.frame_count == 21
+    assert np.allclose(written.motion, data.motion[:21], atol=1e-6)
+    assert written.framerate == data.framerate
+
+
+def test_stream_writer_without_frames(tmp_path):
+    assert not BVHStreamWriter(str(tmp_path / 'never.bvh')).close()